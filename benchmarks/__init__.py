@@ -0,0 +1,10 @@
+"""Benchmarks of orbtools for airspeed velocity (asv).
+
+Each routine is timed (``time_*``) and the peak of the memory that it allocates is tracked
+(``track_peak_bytes``) for synthetic systems of 100 to 8000 atomic basis functions and different
+numbers of atoms (see `benchmarks.common`).
+
+Run the benchmarks of the current commit with ``asv run``, compare two commits with
+``asv continuous master HEAD``, or run a subset with ``asv run --bench Quao``.
+
+"""
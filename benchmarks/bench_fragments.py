@@ -0,0 +1,111 @@
+"""Benchmarks of orbtools.fragments."""
+from orbtools.fragments import (
+    find_fragments,
+    lowdin_populations_fragments,
+    power_symmetric_fragments,
+    quao_fragments,
+)
+from orbtools.mulliken import lowdin_populations
+from orbtools.orthogonalization import power_symmetric
+from orbtools.quasi import quao
+
+from .common import disable_cache, enable_cache, FRAGMENT_SIZES, make_system, peak_bytes, SIZES
+
+
+class _Fragments:
+    """Benchmarks of the analyses of systems made of fragments that do not overlap."""
+
+    params = [SIZES, FRAGMENT_SIZES, ["dense", "fragments"]]
+    param_names = ["num_ab", "fragment_size", "method"]
+    timeout = 3600
+
+    def setup(self, num_ab, fragment_size, method):
+        """Make the system."""
+        self.system = make_system(num_ab, fragment_size=fragment_size)
+        disable_cache()
+
+    def teardown(self, num_ab, fragment_size, method):
+        """Enable the factorization cache."""
+        enable_cache()
+
+    def time_run(self, num_ab, fragment_size, method):
+        """Time the analysis."""
+        self._run(method)
+
+    def track_peak_bytes(self, num_ab, fragment_size, method):
+        """Track the peak memory of the analysis."""
+        return peak_bytes(self._run, method)
+
+    track_peak_bytes.unit = "bytes"
+
+
+class FindFragments:
+    """Connected components of the overlaps of the atoms."""
+
+    params = [SIZES, FRAGMENT_SIZES]
+    param_names = ["num_ab", "fragment_size"]
+    timeout = 3600
+
+    def setup(self, num_ab, fragment_size):
+        """Make the system."""
+        self.system = make_system(num_ab, fragment_size=fragment_size)
+
+    def time_find_fragments(self, num_ab, fragment_size):
+        """Time orbtools.fragments.find_fragments."""
+        find_fragments(
+            self.system["olp_ab_ab"], self.system["ab_atom_indices"], self.system["num_atoms"]
+        )
+
+
+class PowerSymmetricFragments(_Fragments):
+    """Inverse square root of the overlap of the atomic basis functions."""
+
+    def _run(self, method):
+        if method == "dense":
+            power_symmetric(self.system["olp_ab_ab"], -0.5)
+        else:
+            power_symmetric_fragments(
+                self.system["olp_ab_ab"],
+                -0.5,
+                self.system["ab_atom_indices"],
+                self.system["num_atoms"],
+            )
+
+
+class LowdinPopulationsFragments(_Fragments):
+    """Lowdin populations."""
+
+    def _run(self, method):
+        args = [
+            self.system["coeff_ab_mo"],
+            self.system["occupations"],
+            self.system["olp_ab_ab"],
+            self.system["num_atoms"],
+            self.system["ab_atom_indices"],
+        ]
+        if method == "dense":
+            lowdin_populations(*args)
+        else:
+            lowdin_populations_fragments(*args)
+
+
+class QuaoFragments(_Fragments):
+    """QUAO's."""
+
+    def _run(self, method):
+        args = [
+            self.system["olp_ab_ab"],
+            self.system["olp_aao_ab"],
+            self.system["olp_aao_aao"],
+            self.system["coeff_ab_mo"],
+            self.system["indices_span"],
+        ]
+        if method == "dense":
+            quao(*args)
+        else:
+            quao_fragments(
+                *args,
+                self.system["ab_atom_indices"],
+                self.system["aao_atom_indices"],
+                self.system["num_atoms"],
+            )
@@ -0,0 +1,89 @@
+"""Benchmarks of orbtools.mulliken."""
+from orbtools.mulliken import (
+    lowdin_populations,
+    mulliken_populations,
+    mulliken_populations_newbasis,
+)
+from orbtools.quasi import quambo
+
+from .common import AB_PER_ATOM, disable_cache, enable_cache, make_system, peak_bytes, SIZES
+
+
+class _Populations:
+    """Benchmarks of the populations of the atoms of synthetic systems."""
+
+    params = [SIZES, AB_PER_ATOM]
+    param_names = ["num_ab", "ab_per_atom"]
+    timeout = 3600
+
+    def setup(self, num_ab, ab_per_atom):
+        """Make the system."""
+        self.system = make_system(num_ab, ab_per_atom)
+        disable_cache()
+
+    def teardown(self, num_ab, ab_per_atom):
+        """Enable the factorization cache."""
+        enable_cache()
+
+    def time_run(self, num_ab, ab_per_atom):
+        """Time the analysis."""
+        self._run()
+
+    def track_peak_bytes(self, num_ab, ab_per_atom):
+        """Track the peak memory of the analysis."""
+        return peak_bytes(self._run)
+
+    track_peak_bytes.unit = "bytes"
+
+
+class MullikenPopulations(_Populations):
+    """Mulliken populations."""
+
+    def _run(self):
+        mulliken_populations(
+            self.system["coeff_ab_mo"],
+            self.system["occupations"],
+            self.system["olp_ab_ab"],
+            self.system["num_atoms"],
+            self.system["ab_atom_indices"],
+        )
+
+
+class MullikenPopulationsNewbasis(_Populations):
+    """Mulliken populations of the occupied orbitals in the basis of the QUAMBO's."""
+
+    def setup(self, num_ab, ab_per_atom):
+        """Make the system and the new basis."""
+        super().setup(num_ab, ab_per_atom)
+        system = self.system
+        self.coeff_ab_new = quambo(
+            system["olp_ab_ab"],
+            system["olp_aao_ab"],
+            system["coeff_ab_mo"],
+            system["indices_span"],
+        )
+        self.coeff_ab_occ = system["coeff_ab_mo"][:, system["indices_span"]]
+        self.occupations = system["occupations"][system["indices_span"]]
+
+    def _run(self):
+        mulliken_populations_newbasis(
+            self.coeff_ab_occ,
+            self.occupations,
+            self.system["olp_ab_ab"],
+            self.system["num_atoms"],
+            self.coeff_ab_new,
+            self.system["aao_atom_indices"],
+        )
+
+
+class LowdinPopulations(_Populations):
+    """Lowdin populations."""
+
+    def _run(self):
+        lowdin_populations(
+            self.system["coeff_ab_mo"],
+            self.system["occupations"],
+            self.system["olp_ab_ab"],
+            self.system["num_atoms"],
+            self.system["ab_atom_indices"],
+        )
@@ -0,0 +1,85 @@
+"""Benchmarks of orbtools.orthogonalization."""
+import numpy as np
+from orbtools.orthogonalization import eigh, power_symmetric, POWER_METHODS, svd
+
+from .common import disable_cache, enable_cache, make_system, peak_bytes, SIZES
+
+
+class Eigh:
+    """Eigendecomposition of the overlap of the atomic basis functions."""
+
+    params = [SIZES]
+    param_names = ["num_ab"]
+    timeout = 3600
+
+    def setup(self, num_ab):
+        """Make the overlap."""
+        self.olp_ab_ab = make_system(num_ab)["olp_ab_ab"]
+        disable_cache()
+
+    def teardown(self, num_ab):
+        """Enable the factorization cache."""
+        enable_cache()
+
+    def time_eigh(self, num_ab):
+        """Time orbtools.orthogonalization.eigh."""
+        eigh(self.olp_ab_ab)
+
+    def track_peak_bytes(self, num_ab):
+        """Track the peak memory of orbtools.orthogonalization.eigh."""
+        return peak_bytes(eigh, self.olp_ab_ab)
+
+    track_peak_bytes.unit = "bytes"
+
+
+class Svd:
+    """SVD of the overlap of the reference basis functions with the virtual orbitals."""
+
+    params = [SIZES]
+    param_names = ["num_ab"]
+    timeout = 3600
+
+    def setup(self, num_ab):
+        """Make the overlap."""
+        system = make_system(num_ab)
+        olp_aao_mo = system["olp_aao_ab"].dot(system["coeff_ab_mo"])
+        self.olp_aao_virmo = olp_aao_mo[:, ~system["indices_span"]]
+        # as in orbtools.quasi.make_mmo
+        self.num_top = olp_aao_mo.shape[0] - np.sum(system["indices_span"])
+
+    def time_svd(self, num_ab):
+        """Time orbtools.orthogonalization.svd."""
+        svd(self.olp_aao_virmo, num_top=self.num_top)
+
+    def track_peak_bytes(self, num_ab):
+        """Track the peak memory of orbtools.orthogonalization.svd."""
+        return peak_bytes(svd, self.olp_aao_virmo, num_top=self.num_top)
+
+    track_peak_bytes.unit = "bytes"
+
+
+class PowerSymmetric:
+    """Powers of the overlap of the atomic basis functions."""
+
+    params = [SIZES, [-1, -0.5, 0.5], list(POWER_METHODS)]
+    param_names = ["num_ab", "k", "method"]
+    timeout = 3600
+
+    def setup(self, num_ab, k, method):
+        """Make the overlap."""
+        self.olp_ab_ab = make_system(num_ab)["olp_ab_ab"]
+        disable_cache()
+
+    def teardown(self, num_ab, k, method):
+        """Enable the factorization cache."""
+        enable_cache()
+
+    def time_power_symmetric(self, num_ab, k, method):
+        """Time orbtools.orthogonalization.power_symmetric."""
+        power_symmetric(self.olp_ab_ab, k, method=method)
+
+    def track_peak_bytes(self, num_ab, k, method):
+        """Track the peak memory of orbtools.orthogonalization.power_symmetric."""
+        return peak_bytes(power_symmetric, self.olp_ab_ab, k, method=method)
+
+    track_peak_bytes.unit = "bytes"
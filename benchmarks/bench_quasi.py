@@ -0,0 +1,70 @@
+"""Benchmarks of orbtools.quasi."""
+from orbtools.quasi import make_mmo, project, quambo, quao
+
+from .common import AB_PER_ATOM, disable_cache, enable_cache, make_system, peak_bytes, SIZES
+
+
+class _Quasi:
+    """Benchmarks of the construction of the quasiatomic orbitals of synthetic systems."""
+
+    params = [SIZES, AB_PER_ATOM]
+    param_names = ["num_ab", "ab_per_atom"]
+    timeout = 3600
+
+    def setup(self, num_ab, ab_per_atom):
+        """Make the system."""
+        self.system = make_system(num_ab, ab_per_atom)
+        disable_cache()
+
+    def teardown(self, num_ab, ab_per_atom):
+        """Enable the factorization cache."""
+        enable_cache()
+
+    def time_run(self, num_ab, ab_per_atom):
+        """Time the analysis."""
+        self._run()
+
+    def track_peak_bytes(self, num_ab, ab_per_atom):
+        """Track the peak memory of the analysis."""
+        return peak_bytes(self._run)
+
+    track_peak_bytes.unit = "bytes"
+
+
+class Project(_Quasi):
+    """Projection of the reference basis functions onto the atomic basis functions."""
+
+    def _run(self):
+        project(self.system["olp_ab_ab"], self.system["olp_aao_ab"].T)
+
+
+class MakeMMO(_Quasi):
+    """Minimal molecular orbitals."""
+
+    def _run(self):
+        make_mmo(self.system["olp_aao_ab"], self.system["coeff_ab_mo"], self.system["indices_span"])
+
+
+class Quambo(_Quasi):
+    """Quasiatomic minimal basis set orbitals."""
+
+    def _run(self):
+        quambo(
+            self.system["olp_ab_ab"],
+            self.system["olp_aao_ab"],
+            self.system["coeff_ab_mo"],
+            self.system["indices_span"],
+        )
+
+
+class Quao(_Quasi):
+    """Quasiatomic orbitals."""
+
+    def _run(self):
+        quao(
+            self.system["olp_ab_ab"],
+            self.system["olp_aao_ab"],
+            self.system["olp_aao_aao"],
+            self.system["coeff_ab_mo"],
+            self.system["indices_span"],
+        )
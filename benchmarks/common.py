@@ -0,0 +1,171 @@
+"""Inputs and helpers shared by the benchmarks.
+
+Systems are made with `orbtools.synthetic.make_system` (atoms on a lattice with s-type Gaussian
+basis functions and Wolfsberg-Helmholz molecular orbitals). Since the molecular orbitals of the
+largest systems take minutes to compute, and asv runs each benchmark in a new process, the systems
+are stored in `CACHE_DIR` (set with the environment variable ORBTOOLS_BENCHMARK_CACHE) and made only
+once. The names of the stored systems include a hash of the code that makes them, so that systems
+made by an older version of the generator are not used.
+
+"""
+import hashlib
+import inspect
+import os
+import tempfile
+import tracemalloc
+
+import numpy as np
+from orbtools.cache import clear_cache, set_cache_limits
+import orbtools.synthetic
+from orbtools.synthetic import make_system as make_synthetic_system
+
+# Numbers of atomic basis functions (K)
+SIZES = [100, 500, 1000, 2000, 4000, 8000]
+# Numbers of atomic basis functions of each atom (e.g. double and triple zeta)
+AB_PER_ATOM = [10, 25]
+# Number of reference (minimal basis) functions of each atom
+AAO_PER_ATOM = 5
+# Numbers of atoms of each fragment of the fragmented systems
+FRAGMENT_SIZES = [10, 50]
+# Distance (in bohr) between the closest atoms of neighbouring fragments, beyond which the overlaps
+# of the most diffuse basis functions are less than 1e-15
+FRAGMENT_SPACING = 16.0
+# Directory of the stored systems
+CACHE_DIR = os.environ.get(
+    "ORBTOOLS_BENCHMARK_CACHE", os.path.join(tempfile.gettempdir(), "orbtools-benchmarks")
+)
+
+
+def _fragment_coords(num_atoms, fragment_size):
+    """Return the positions of the atoms of fragments that are placed along a line.
+
+    Parameters
+    ----------
+    num_atoms : int
+        Number of atoms.
+    fragment_size : int
+        Number of atoms of each fragment.
+
+    Returns
+    -------
+    atom_coords : np.ndarray(A, 3)
+        Positions of the atoms, on a simple cubic lattice within each fragment.
+
+    """
+    side = int(np.ceil(fragment_size ** (1 / 3) - 1e-9))
+    lattice = np.indices((side, side, side)).reshape(3, -1).T[:fragment_size] * 2.5
+    atoms = np.arange(num_atoms)
+    offsets = (np.max(lattice[:, 0]) + FRAGMENT_SPACING) * (atoms // fragment_size)
+    return lattice[atoms % fragment_size] + offsets[:, None] * np.array([1.0, 0.0, 0.0])
+
+
+def _generator_hash():
+    """Return the hash of the code and the constants that make the systems.
+
+    Returns
+    -------
+    hash : str
+        Hexadecimal digest of the source of `orbtools.synthetic` and of the layout of the fragments.
+
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for source in [
+        inspect.getsource(orbtools.synthetic),
+        inspect.getsource(_fragment_coords),
+        repr(FRAGMENT_SPACING),
+    ]:
+        digest.update(source.encode())
+    return digest.hexdigest()
+
+
+def make_system(num_ab, ab_per_atom=10, seed=0, fragment_size=None):
+    """Return the inputs of the analyses of a synthetic system.
+
+    Parameters
+    ----------
+    num_ab : int
+        Number of atomic basis functions.
+    ab_per_atom : {10, int}
+        Number of atomic basis functions of each atom.
+    seed : {0, int}
+        Seed of the system.
+    fragment_size : {int, None}
+        Number of atoms of each of the fragments that do not overlap one another.
+        Default places all of the atoms on one lattice.
+
+    Returns
+    -------
+    system : dict
+        Inputs of the analyses (see `orbtools.synthetic.make_system`).
+
+    """
+    filename = os.path.join(
+        CACHE_DIR,
+        "system_{0}_{1}_{2}_{3}_{4}.npz".format(
+            num_ab, ab_per_atom, AAO_PER_ATOM, seed, _generator_hash()
+        ),
+    )
+    if fragment_size is not None:
+        filename = "{0}_fragments_{1}.npz".format(filename[:-4], fragment_size)
+    if os.path.isfile(filename):
+        with np.load(filename) as data:
+            system = dict(data)
+        system["num_atoms"] = int(system["num_atoms"])
+        return system
+    num_atoms = max(num_ab // ab_per_atom, 1)
+    system = make_synthetic_system(
+        num_atoms,
+        ab_per_atom=ab_per_atom,
+        aao_per_atom=AAO_PER_ATOM,
+        seed=seed,
+        atom_coords=None if fragment_size is None else _fragment_coords(num_atoms, fragment_size),
+    )
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # NOTE: written under a temporary name so that concurrent benchmarks never read a partial file
+    temp_filename = "{0}.{1}.npz".format(filename[:-4], os.getpid())
+    np.savez(temp_filename, **system)
+    os.replace(temp_filename, filename)
+    return system
+
+
+def disable_cache():
+    """Disable the factorization cache so that each call is timed from scratch."""
+    clear_cache()
+    set_cache_limits(enabled=False)
+
+
+def enable_cache():
+    """Enable the factorization cache again."""
+    clear_cache()
+    set_cache_limits(enabled=True)
+
+
+def peak_bytes(func, *args, **kwargs):
+    """Return the peak of the memory allocated by a call of the given function.
+
+    Unlike the `peakmem` benchmarks of asv, which report the largest resident memory of the whole
+    process (including the inputs made in `setup`), only the allocations made during the call are
+    counted.
+
+    Parameters
+    ----------
+    func : callable
+        Function that is called.
+    args : tuple
+        Positional arguments of the function.
+    kwargs : dict
+        Keyword arguments of the function.
+
+    Returns
+    -------
+    peak_bytes : int
+        Peak of the memory allocated during the call (in addition to the memory allocated before).
+
+    """
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        func(*args, **kwargs)
+        return tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
@@ -0,0 +1,307 @@
+"""Batch runner of the analyses of many independent systems on a pool of processes or threads.
+
+Each system is a dictionary of the arguments of the analysis (arrays or paths to `.npy` files), or
+the path to a `.npz` file that contains them. Inputs that are shared by all of the systems (e.g. the
+overlap of the reference AAO's) are placed once in shared memory and viewed (not copied) by the
+workers.
+
+By default, workers are processes started with the "spawn" method, and the number of threads used
+by BLAS/OpenMP in each worker is capped so that the workers do not oversubscribe the processors.
+Since the workers are spawned, the batch must be run from an importable module or under
+``if __name__ == "__main__":`` in a script.
+
+Workers can also be threads of the current process (`mode="thread"`), since numpy releases the GIL
+in BLAS/LAPACK. Threads have no start-up cost and share the inputs directly, but the limit on the
+number of BLAS threads is then global to the process (see `orbtools.threads`). Few workers with
+many BLAS threads suit large systems, and many workers with one BLAS thread suit many small
+systems.
+
+Examples
+--------
+>>> systems = ["mol{}.npz".format(i) for i in range(1000)]
+>>> for result in run_batch("quao", systems, shared={"olp_aao_aao": olp_aao_aao}):
+...     print(result.index, result.time)
+
+"""
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from contextlib import ExitStack
+import itertools
+import multiprocessing
+from multiprocessing import shared_memory
+import os
+import time
+
+import numpy as np
+from orbtools import threads
+from orbtools.blocking import load_array
+from orbtools.mulliken import lowdin_populations, mulliken_populations
+from orbtools.quasi import quambo, quao
+
+ANALYSES = {
+    "quao": quao,
+    "quambo": quambo,
+    "mulliken_populations": mulliken_populations,
+    "lowdin_populations": lowdin_populations,
+}
+MODES = ("process", "thread")
+# Number of analyses that are submitted (queued or running) for each worker at any time
+SUBMITTED_PER_WORKER = 2
+
+BatchResult = namedtuple("BatchResult", ["index", "result", "time"])
+BatchResult.__doc__ = """Result of the analysis of one system of a batch.
+
+Attributes
+----------
+index : int
+    Position of the system in the batch.
+result : object
+    Output of the analysis (or the exception it raised, if `return_exceptions` is True).
+time : float
+    Wall time (in seconds) of the analysis in the worker, excluding the loading of the inputs.
+
+"""
+
+# shared arrays attached by the worker
+_shared_arrays = {}
+_shared_blocks = []
+
+
+def _share(arrays):
+    """Copy the given arrays into shared memory.
+
+    Parameters
+    ----------
+    arrays : dict of str to np.ndarray
+        Arrays that are shared.
+
+    Returns
+    -------
+    blocks : list of shared_memory.SharedMemory
+        Blocks of shared memory that hold the arrays.
+    specs : dict of str to tuple
+        Name of the block of shared memory, shape, and data type of each array.
+
+    """
+    blocks = []
+    specs = {}
+    for name, array in arrays.items():
+        array = np.asarray(array)
+        block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+        blocks.append(block)
+        np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+        specs[name] = (block.name, array.shape, array.dtype.str)
+    return blocks, specs
+
+
+def _initialize(specs, blas_threads):
+    """Attach the worker process to the shared arrays and limit its number of BLAS threads.
+
+    Parameters
+    ----------
+    specs : dict of str to tuple
+        Name of the block of shared memory, shape, and data type of each array.
+    blas_threads : int
+        Number of threads used by BLAS/OpenMP in the worker.
+
+    """
+    # NOTE: the limit is set in the worker itself, rather than through the environment of the
+    # parent process, so that other threads of the parent (e.g. other batches) are not affected
+    threads.set_blas_threads(blas_threads)
+    for name, (block_name, shape, dtype) in specs.items():
+        # NOTE: spawned workers share the resource tracker of the parent process, which unlinks
+        # the block, so attaching to it here does not register it twice
+        block = shared_memory.SharedMemory(name=block_name)
+        _shared_blocks.append(block)
+        array = np.ndarray(shape, dtype=dtype, buffer=block.buf)
+        array.flags.writeable = False
+        _shared_arrays[name] = array
+
+
+def _load_system(system):
+    """Return the arguments of the analysis of the given system.
+
+    Parameters
+    ----------
+    system : {dict, str}
+        Arguments of the analysis (arrays or paths to `.npy` files), or the path to a `.npz` file
+        that contains them.
+
+    Returns
+    -------
+    arguments : dict
+        Arguments of the analysis.
+
+    Raises
+    ------
+    TypeError
+        If `system` is not a dictionary or a path to a `.npz` file.
+
+    """
+    if isinstance(system, (str, os.PathLike)) and str(system).endswith(".npz"):
+        with np.load(system) as data:
+            return dict(data)
+    if not isinstance(system, dict):
+        raise TypeError("Each system must be a dictionary of arguments or the path to a .npz file.")
+    return {
+        name: (
+            load_array(value)
+            if isinstance(value, (str, os.PathLike)) and str(value).endswith(".npy")
+            else value
+        )
+        for name, value in system.items()
+    }
+
+
+def _run_system(index, analysis, system, kwargs, shared=None):
+    """Run the analysis of one system.
+
+    Parameters
+    ----------
+    index : int
+        Position of the system in the batch.
+    analysis : {str, callable}
+        Analysis (name in `ANALYSES` or function).
+    system : {dict, str}
+        Arguments of the analysis (see `_load_system`).
+    kwargs : dict
+        Other keyword arguments of the analysis.
+    shared : {dict of str to np.ndarray, None}
+        Keyword arguments that are shared by all of the systems.
+        Default is the arrays in shared memory that are attached to the worker process.
+
+    Returns
+    -------
+    result : BatchResult
+        Result of the analysis.
+
+    """
+    func = ANALYSES[analysis] if isinstance(analysis, str) else analysis
+    arguments = dict(_shared_arrays if shared is None else shared)
+    arguments.update(_load_system(system))
+    arguments.update(kwargs)
+    start = time.perf_counter()
+    result = func(**arguments)
+    return BatchResult(index, result, time.perf_counter() - start)
+
+
+def run_batch(
+    analysis,
+    systems,
+    shared=None,
+    max_workers=None,
+    blas_threads=None,
+    return_exceptions=False,
+    mode="process",
+    **kwargs
+):
+    """Run the analysis of each system on a pool of processes (or threads).
+
+    Parameters
+    ----------
+    analysis : {"quao", "quambo", "mulliken_populations", "lowdin_populations", callable}
+        Analysis that is run for each system.
+        A function must be defined at the top level of a module so that it can be sent to the
+        worker processes.
+    systems : iterable of {dict, str}
+        Arguments of the analysis of each system, as a dictionary of keyword arguments (arrays or
+        paths to `.npy` files, which are memory-mapped) or as the path to a `.npz` file.
+        Systems are read from the iterable as the workers become free (at most
+        `SUBMITTED_PER_WORKER` systems per worker are submitted at once), so a generator can
+        stream a batch that does not fit in memory.
+    shared : dict of str to np.ndarray
+        Keyword arguments that are the same for all of the systems.
+        Worker processes are given read-only views of a copy in shared memory, and worker threads
+        are given the arrays themselves.
+    max_workers : {int, None}
+        Number of workers.
+        Default is the number of processors.
+    blas_threads : {int, None}
+        Number of threads used by BLAS/OpenMP in each worker.
+        Default is the number of processors divided by the number of workers (at least 1).
+        For worker threads, the limit is set for the whole process while the batch runs.
+    return_exceptions : {False, True}
+        If True, an exception raised by the analysis of a system is returned as its result.
+        Otherwise, it is raised.
+    mode : {"process", "thread"}
+        Whether the workers are processes or threads.
+    kwargs : dict
+        Other keyword arguments of the analysis (e.g. `validate`).
+
+    Yields
+    ------
+    result : BatchResult
+        Index of the system, output of the analysis, and its wall time, in the order in which
+        the analyses are completed.
+
+    Raises
+    ------
+    TypeError
+        If `analysis` is not the name of an analysis or a callable.
+        If `max_workers` or `blas_threads` is not a positive integer (or None).
+    ValueError
+        If `analysis` is not one of the names in `ANALYSES`.
+        If `mode` is not "process" or "thread".
+
+    """
+    if isinstance(analysis, str):
+        if analysis not in ANALYSES:
+            raise ValueError(
+                "Analysis must be one of {0} or a function.".format(", ".join(ANALYSES))
+            )
+    elif not callable(analysis):
+        raise TypeError("Analysis must be the name of an analysis or a function.")
+    if mode not in MODES:
+        raise ValueError("Mode must be one of {0}.".format(", ".join(MODES)))
+    num_cpus = os.cpu_count() or 1
+    if max_workers is None:
+        max_workers = num_cpus
+    if not (isinstance(max_workers, int) and max_workers > 0):
+        raise TypeError("Number of workers must be a positive integer.")
+    if blas_threads is None:
+        blas_threads = max(num_cpus // max_workers, 1)
+    if not (isinstance(blas_threads, int) and blas_threads > 0):
+        raise TypeError("Number of BLAS threads must be a positive integer.")
+
+    blocks = []
+    with ExitStack() as stack:
+        if mode == "process":
+            blocks, specs = _share(shared or {})
+            shared = None
+            executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_initialize,
+                initargs=(specs, blas_threads),
+            )
+        else:
+            shared = shared or {}
+            stack.enter_context(threads.blas_threads(blas_threads))
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+        systems = enumerate(systems)
+        futures = {}
+
+        def submit(num_systems):
+            """Submit the analyses of the next systems."""
+            for index, system in itertools.islice(systems, num_systems):
+                future = executor.submit(_run_system, index, analysis, system, kwargs, shared)
+                futures[future] = index
+
+        try:
+            submit(SUBMITTED_PER_WORKER * max_workers)
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = futures.pop(future)
+                    submit(1)
+                    try:
+                        yield future.result()
+                    except Exception as error:  # pylint: disable=W0703
+                        if not return_exceptions:
+                            raise
+                        yield BatchResult(index, error, np.nan)
+        finally:
+            executor.shutdown(cancel_futures=True)
+            for block in blocks:
+                block.close()
+                block.unlink()
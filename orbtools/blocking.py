@@ -0,0 +1,228 @@
+"""Blocks of rows that fit in a memory budget.
+
+Analyses of large basis sets (e.g. periodic supercells) cannot hold several K x K temporaries at
+once. Functions that accept a `memory_budget` (in bytes) stream over blocks of rows of their
+inputs instead, so that only a few tiles of shape (block size, K) are held at any time.
+
+Arrays that are memory-mapped from disk (e.g. `load_array("olp_ab_ab.npy")`) are always read in
+blocks of contiguous rows, with `MEMMAP_MEMORY_BUDGET` if no budget is given, so that matrices
+larger than the memory can be analyzed and the page cache of the operating system is used.
+
+"""
+import numpy as np
+
+MEMMAP_MEMORY_BUDGET = 2 ** 28
+
+_global_budget = None
+
+
+def check_memory_budget(memory_budget):
+    """Check the given memory budget.
+
+    Parameters
+    ----------
+    memory_budget : {int, None}
+        Number of bytes that the temporary arrays may use.
+        If None, the arrays are not split into blocks.
+
+    Raises
+    ------
+    TypeError
+        If `memory_budget` is not an integer or None.
+    ValueError
+        If `memory_budget` is not positive.
+
+    """
+    if memory_budget is None:
+        return
+    if not isinstance(memory_budget, (int, np.integer)) or isinstance(memory_budget, bool):
+        raise TypeError("Memory budget must be an integer (number of bytes) or None.")
+    if memory_budget <= 0:
+        raise ValueError("Memory budget must be a positive number of bytes.")
+
+
+def row_blocks(num_rows, row_nbytes, memory_budget=None):
+    """Return the blocks of rows whose temporary arrays fit in the memory budget.
+
+    Parameters
+    ----------
+    num_rows : int
+        Number of rows.
+    row_nbytes : int
+        Number of bytes of the temporary arrays needed for each row.
+    memory_budget : {int, None}
+        Number of bytes that the temporary arrays may use.
+        If None, all rows are in one block.
+
+    Returns
+    -------
+    blocks : list of slice
+        Consecutive blocks of rows.
+        At least one row is in each block, even if a single row does not fit in the budget.
+
+    Raises
+    ------
+    TypeError
+        If `memory_budget` is not an integer or None.
+    ValueError
+        If `memory_budget` is not positive.
+
+    """
+    check_memory_budget(memory_budget)
+    if memory_budget is None:
+        block_size = max(num_rows, 1)
+    else:
+        block_size = max(int(memory_budget // max(row_nbytes, 1)), 1)
+    return [
+        slice(start, min(start + block_size, num_rows)) for start in range(0, num_rows, block_size)
+    ]
+
+
+def get_memory_budget():
+    """Return the memory budget used by orbtools.
+
+    Returns
+    -------
+    memory_budget : {int, None}
+        Number of bytes that the temporary arrays may use.
+        If None, arrays in memory are not split into blocks.
+
+    """
+    return _global_budget
+
+
+def set_memory_budget(memory_budget):
+    """Set the memory budget used by orbtools.
+
+    Parameters
+    ----------
+    memory_budget : {int, None}
+        Number of bytes that the temporary arrays may use.
+        If None, arrays in memory are not split into blocks.
+
+    Raises
+    ------
+    TypeError
+        If `memory_budget` is not an integer or None.
+    ValueError
+        If `memory_budget` is not positive.
+
+    """
+    global _global_budget  # pylint: disable=W0603
+    check_memory_budget(memory_budget)
+    _global_budget = memory_budget
+
+
+def resolve_memory_budget(memory_budget, *arrays):
+    """Return the memory budget for a call.
+
+    Parameters
+    ----------
+    memory_budget : {int, None}
+        Memory budget given to the call.
+        If None, the memory budget set for the package is used. If that is also None and any of
+        the arrays is memory-mapped, `MEMMAP_MEMORY_BUDGET` is used.
+    arrays : np.ndarray
+        Inputs of the call.
+
+    Returns
+    -------
+    memory_budget : {int, None}
+        Number of bytes that the temporary arrays may use.
+
+    Raises
+    ------
+    TypeError
+        If `memory_budget` is not an integer or None.
+    ValueError
+        If `memory_budget` is not positive.
+
+    """
+    check_memory_budget(memory_budget)
+    if memory_budget is not None:
+        return memory_budget
+    if _global_budget is not None:
+        return _global_budget
+    if any(isinstance(array, np.memmap) for array in arrays):
+        return MEMMAP_MEMORY_BUDGET
+    return None
+
+
+def load_array(filename, mmap=True):
+    """Load an array from a `.npy` file.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the `.npy` file.
+    mmap : {True, False}
+        If True, the array is memory-mapped (read-only) instead of read into memory, so that the
+        functions of orbtools read it in blocks.
+
+    Returns
+    -------
+    array : {np.memmap, np.ndarray}
+        Array stored in the file.
+
+    """
+    return np.load(filename, mmap_mode="r" if mmap else None)
+
+
+def dot(left, right, memory_budget=None):
+    """Return the product of two matrices, reading the left matrix in blocks of rows.
+
+    Parameters
+    ----------
+    left : np.ndarray(N, K)
+        Left matrix.
+    right : np.ndarray(K, M)
+        Right matrix.
+    memory_budget : {int, None}
+        Number of bytes that the blocks of the left matrix and of the product may use.
+        If None, the product is computed at once.
+
+    Returns
+    -------
+    product : np.ndarray(N, M)
+        Product of the matrices.
+
+    """
+    if memory_budget is None:
+        return np.asarray(left.dot(right))
+    output = np.empty((left.shape[0], right.shape[1]), dtype=np.result_type(left, right))
+    row_nbytes = (left.shape[1] + right.shape[1]) * output.itemsize
+    for rows in row_blocks(left.shape[0], row_nbytes, memory_budget):
+        output[rows] = np.asarray(left[rows]).dot(right)
+    return output
+
+
+def congruence(coeff, matrix, memory_budget=None):
+    r"""Return the congruence transformation of a symmetric matrix, reading it in blocks of rows.
+
+    .. math::
+
+        C^T M C = \sum_{\text{blocks } B} C_{B:}^T (M_{B:} C)
+
+    Parameters
+    ----------
+    coeff : np.ndarray(K, N)
+        Transformation matrix.
+    matrix : np.ndarray(K, K)
+        Matrix that is transformed.
+    memory_budget : {int, None}
+        Number of bytes that the blocks of the matrix and of the intermediates may use.
+        If None, the transformation is computed at once.
+
+    Returns
+    -------
+    transformed : np.ndarray(N, N)
+        Transformed matrix.
+
+    """
+    if memory_budget is None:
+        return np.asarray(coeff.T.dot(matrix).dot(coeff))
+    output = np.zeros((coeff.shape[1], coeff.shape[1]), dtype=np.result_type(coeff, matrix))
+    row_nbytes = (matrix.shape[1] + 2 * coeff.shape[1]) * output.itemsize
+    for rows in row_blocks(matrix.shape[0], row_nbytes, memory_budget):
+        output += np.asarray(coeff[rows]).T.dot(np.asarray(matrix[rows]).dot(coeff))
+    return output
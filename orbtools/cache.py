@@ -0,0 +1,280 @@
+"""Cache of the factorizations of symmetric matrices."""
+from collections import OrderedDict
+import hashlib
+import threading
+
+import numpy as np
+
+
+def fingerprint(array):
+    """Return the fingerprint of the content of the given array.
+
+    Parameters
+    ----------
+    array : np.ndarray
+        Array.
+
+    Returns
+    -------
+    fingerprint : tuple
+        Shape, data type, and hash of the values of the array.
+
+    """
+    digest = hashlib.blake2b(np.ascontiguousarray(array).view(np.uint8), digest_size=16)
+    return (array.shape, array.dtype.str, digest.hexdigest())
+
+
+class FactorizationCache:
+    """Least recently used cache of the eigendecompositions of symmetric matrices.
+
+    The eigenvalues and eigenvectors of a matrix, as well as the powers of the matrix derived from
+    them (e.g. :math:`S^{-1}`, :math:`S^{-1/2}`, and :math:`S^{1/2}`), are stored so that each
+    distinct matrix is decomposed only once.
+
+    Matrices are identified by a hash of their content (shape, data type, and values), so an array
+    that is modified in place will not be mistaken for its old self.
+
+    The stored factorizations are guarded by a lock, so the cache can be shared by threads.
+
+    Attributes
+    ----------
+    max_entries : int
+        Maximum number of matrices whose factorizations are stored.
+    max_bytes : int
+        Maximum number of bytes used by the stored arrays.
+    enabled : bool
+        Whether the cache is used.
+    hits : int
+        Number of lookups that found a stored factorization.
+    misses : int
+        Number of lookups that did not find a stored factorization.
+
+    """
+
+    def __init__(self, max_entries=16, max_bytes=2 ** 29):
+        """Initialize.
+
+        Parameters
+        ----------
+        max_entries : {16, int}
+            Maximum number of matrices whose factorizations are stored.
+        max_bytes : {2 ** 29, int}
+            Maximum number of bytes used by the stored arrays.
+
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._num_bytes = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def num_bytes(self):
+        """Return the number of bytes used by the stored arrays.
+
+        Returns
+        -------
+        num_bytes : int
+            Number of bytes used by the stored arrays.
+
+        """
+        with self._lock:
+            return sum(self._num_bytes.values())
+
+    def key(self, matrix, threshold):
+        """Return the key of the given matrix.
+
+        Parameters
+        ----------
+        matrix : np.ndarray
+            Matrix that is factorized.
+        threshold : float
+            Threshold used to discard the eigenvalues in the factorization.
+
+        Returns
+        -------
+        key : {tuple, None}
+            Key that identifies the factorizations of the matrix.
+            None if the cache is disabled or if the matrix is not a numpy array.
+
+        """
+        if not (self.enabled and isinstance(matrix, np.ndarray)):
+            return None
+        return fingerprint(matrix) + (threshold,)
+
+    def lookup(self, key, name):
+        """Return the stored factorization of the given name.
+
+        Parameters
+        ----------
+        key : {tuple, None}
+            Key of the matrix (see `key`).
+        name : hashable
+            Name of the factorization (e.g. "eigh" or ("power", -0.5)).
+
+        Returns
+        -------
+        value : {tuple of np.ndarray, np.ndarray, None}
+            Copy of the stored arrays.
+            None if nothing is stored.
+
+        """
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or name not in entry:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            self._num_bytes.move_to_end(key)
+            value = entry[name]
+        if isinstance(value, tuple):
+            return tuple(array.copy() for array in value)
+        return value.copy()
+
+    def store(self, key, name, value):
+        """Store the factorization of the given name.
+
+        Least recently used matrices are evicted until the limits of the cache are satisfied.
+
+        Parameters
+        ----------
+        key : {tuple, None}
+            Key of the matrix (see `key`).
+            If None, nothing is stored.
+        name : hashable
+            Name of the factorization (e.g. "eigh" or ("power", -0.5)).
+        value : {tuple of np.ndarray, np.ndarray}
+            Arrays of the factorization.
+
+        """
+        if key is None:
+            return
+        arrays = value if isinstance(value, tuple) else (value,)
+        num_bytes = sum(array.nbytes for array in arrays)
+        if num_bytes > self.max_bytes:
+            return
+        arrays = tuple(array.copy() for array in arrays)
+        for array in arrays:
+            array.flags.writeable = False
+        with self._lock:
+            entry = self._entries.setdefault(key, {})
+            # factorization may already be stored (e.g. by another thread)
+            old_value = entry.get(name, ())
+            old_arrays = old_value if isinstance(old_value, tuple) else (old_value,)
+            entry[name] = arrays if isinstance(value, tuple) else arrays[0]
+            self._num_bytes[key] = (
+                self._num_bytes.get(key, 0) + num_bytes - sum(array.nbytes for array in old_arrays)
+            )
+            self._entries.move_to_end(key)
+            self._num_bytes.move_to_end(key)
+            self._evict()
+
+    def _evict(self):
+        """Remove the least recently used matrices while the lock is held."""
+        while (
+            len(self._entries) > self.max_entries or sum(self._num_bytes.values()) > self.max_bytes
+        ):
+            self._entries.popitem(last=False)
+            self._num_bytes.popitem(last=False)
+
+    def evict(self):
+        """Remove the least recently used matrices until the limits of the cache are satisfied."""
+        with self._lock:
+            self._evict()
+
+    def clear(self):
+        """Remove all stored factorizations and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self._num_bytes.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """Return the statistics of the cache.
+
+        Returns
+        -------
+        info : dict
+            Number of hits, misses, stored matrices, and stored bytes, and the limits of the cache.
+
+        """
+        with self._lock:
+            num_entries = len(self._entries)
+            num_bytes = sum(self._num_bytes.values())
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": num_entries,
+            "num_bytes": num_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "enabled": self.enabled,
+        }
+
+
+factorizations = FactorizationCache()
+
+
+def cache_info():
+    """Return the statistics of the factorization cache used by orbtools.
+
+    Returns
+    -------
+    info : dict
+        Number of hits, misses, stored matrices, and stored bytes, and the limits of the cache.
+
+    """
+    return factorizations.info()
+
+
+def clear_cache():
+    """Remove all factorizations stored by orbtools and reset the counters."""
+    factorizations.clear()
+
+
+def set_cache_limits(max_entries=None, max_bytes=None, enabled=None):
+    """Set the limits of the factorization cache used by orbtools.
+
+    Parameters
+    ----------
+    max_entries : {int, None}
+        Maximum number of matrices whose factorizations are stored.
+        Default does not change the limit.
+    max_bytes : {int, None}
+        Maximum number of bytes used by the stored arrays.
+        Default does not change the limit.
+    enabled : {bool, None}
+        Whether the cache is used.
+        Default does not change the setting.
+
+    Raises
+    ------
+    TypeError
+        If `max_entries` or `max_bytes` is not an integer (or None).
+    ValueError
+        If `max_entries` or `max_bytes` is negative.
+
+    """
+    for limit in [max_entries, max_bytes]:
+        if limit is None:
+            continue
+        if not isinstance(limit, int):
+            raise TypeError("Limits of the cache must be integers.")
+        if limit < 0:
+            raise ValueError("Limits of the cache must be greater than or equal to zero.")
+    if max_entries is not None:
+        factorizations.max_entries = max_entries
+    if max_bytes is not None:
+        factorizations.max_bytes = max_bytes
+    if enabled is not None:
+        factorizations.enabled = bool(enabled)
+        if not factorizations.enabled:
+            factorizations.clear()
+    factorizations.evict()
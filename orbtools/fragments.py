@@ -0,0 +1,735 @@
+r"""Analyses of systems made of fragments that do not overlap one another.
+
+For solvated clusters, molecular crystals, and other systems of weakly interacting molecules, the
+overlap of the atomic basis functions is block diagonal once the negligible overlaps are discarded.
+The fragments are the connected components of the graph whose vertices are the atoms and whose
+edges join the atoms with overlapping basis functions (`find_fragments`). Each fragment is then
+decomposed and analyzed on its own, so that the cost falls from :math:`O(K^3)` to
+:math:`\sum_i O(k_i^3)`, where :math:`k_i` is the number of basis functions of the ith fragment.
+
+Fragments are independent, so they can be analyzed by a pool of threads (`max_workers`), since
+numpy releases the GIL in BLAS/LAPACK. The number of threads used by BLAS in each worker can be set
+with `orbtools.threads.blas_threads`. The workers share the decompositions of the blocks through
+`orbtools.cache.factorizations`, which is guarded by a lock.
+
+Overlaps that are less than or equal to `olp_threshold` (in absolute value) are treated as zero, so
+the results are those of the analyses of the block diagonal overlap. If there is only one fragment,
+the usual analysis of the whole system is returned.
+
+Examples
+--------
+>>> atom_fragments = find_fragments(olp_ab_ab, ab_atom_indices, num_atoms)
+>>> pops = lowdin_populations_fragments(
+...     coeff_ab_mo, occupations, olp_ab_ab, num_atoms, ab_atom_indices, max_workers=4
+... )
+
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from orbtools import blocking, tracing, validation
+from orbtools.mulliken import lowdin_populations
+import orbtools.orthogonalization as orth
+from orbtools.quasi import normalize_projections, project, quao, solve_projection
+from orbtools.weights import sum_by_atom
+import scipy.linalg
+import scipy.sparse
+import scipy.sparse.csgraph
+
+# Largest overlap (in absolute value) between the basis functions of different fragments
+OLP_THRESHOLD = 1e-10
+# Smallest (squared) singular value of the restriction of the molecular orbitals to a fragment that
+# is accepted as a molecular orbital of the fragment; the others must be less than 1 minus it
+MO_SEPARATION = 0.9
+
+
+def _check_atom_indices(atom_indices, num_basis, num_atoms, name):
+    """Check the atom of each basis function.
+
+    Parameters
+    ----------
+    atom_indices : np.ndarray(K,)
+        Index of the atom to which each basis function belongs.
+    num_basis : int
+        Number of basis functions.
+    num_atoms : int
+        Number of atoms.
+    name : str
+        Name of the argument in the error messages.
+
+    Raises
+    ------
+    TypeError
+        If `num_atoms` is not a positive integer.
+        If `atom_indices` is not a one-dimensional numpy array of ints.
+    ValueError
+        If `atom_indices` does not have one entry for each basis function.
+        If `atom_indices` contains indices that are less than 0 or greater than or equal to the
+        number of atoms.
+
+    """
+    if not (isinstance(num_atoms, int) and not isinstance(num_atoms, bool) and num_atoms > 0):
+        raise TypeError("Number of atoms must be a positive integer.")
+    if not (
+        isinstance(atom_indices, np.ndarray)
+        and atom_indices.ndim == 1
+        and np.issubdtype(atom_indices.dtype, np.integer)
+    ):
+        raise TypeError("`{0}` must be a one-dimensional numpy array of ints.".format(name))
+    if atom_indices.size != num_basis:
+        raise ValueError(
+            "`{0}` must have one entry for each basis function, {1}.".format(name, num_basis)
+        )
+    if atom_indices.size > 0 and (np.min(atom_indices) < 0 or np.max(atom_indices) >= num_atoms):
+        raise ValueError(
+            "`{0}` must contain indices from 0 to the number of atoms minus 1.".format(name)
+        )
+
+
+def _check_square(matrix, name):
+    """Check that the given matrix is a two-dimensional square numpy array.
+
+    Parameters
+    ----------
+    matrix : np.ndarray(K, K)
+        Matrix.
+    name : str
+        Name of the argument in the error messages.
+
+    Raises
+    ------
+    TypeError
+        If `matrix` is not a two-dimensional square numpy array.
+
+    """
+    if not (
+        isinstance(matrix, np.ndarray) and matrix.ndim == 2 and matrix.shape[0] == matrix.shape[1]
+    ):
+        raise TypeError("`{0}` must be a two-dimensional square numpy array.".format(name))
+
+
+def _check_olp_threshold(olp_threshold):
+    """Check the threshold of the overlaps between fragments.
+
+    Parameters
+    ----------
+    olp_threshold : float
+        Largest overlap between the basis functions of different fragments.
+
+    Raises
+    ------
+    TypeError
+        If `olp_threshold` is not a float.
+    ValueError
+        If `olp_threshold` is negative.
+
+    """
+    if not isinstance(olp_threshold, float):
+        raise TypeError("Overlap threshold must be a float.")
+    if olp_threshold < 0:
+        raise ValueError("Overlap threshold must be greater than or equal to zero.")
+
+
+def _map(func, args, max_workers):
+    """Apply the given function to each of the given arguments.
+
+    Parameters
+    ----------
+    func : callable
+        Function that is called with each item of `args`.
+    args : list
+        Arguments of each call.
+    max_workers : int
+        Number of threads that make the calls.
+        If 1, the calls are made in the current thread.
+
+    Returns
+    -------
+    results : list
+        Output of each call, in the order of `args`.
+
+    Raises
+    ------
+    TypeError
+        If `max_workers` is not a positive integer.
+
+    """
+    if not (isinstance(max_workers, int) and not isinstance(max_workers, bool) and max_workers > 0):
+        raise TypeError("Number of workers must be a positive integer.")
+    if max_workers == 1 or len(args) < 2:
+        return [func(arg) for arg in args]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(args))) as executor:
+        return list(executor.map(func, args))
+
+
+@tracing.traced("find_fragments")
+def find_fragments(olp_ab_ab, ab_atom_indices, num_atoms, olp_threshold=OLP_THRESHOLD):
+    """Return the fragment of each atom.
+
+    Two atoms are in the same fragment if they are connected by a chain of atoms whose basis
+    functions overlap, i.e. fragments are the connected components of the graph of the atoms whose
+    edges are the overlaps that are greater than `olp_threshold` (in absolute value).
+
+    Parameters
+    ----------
+    olp_ab_ab : np.ndarray(K, K)
+        Overlaps of the atomic basis functions.
+    ab_atom_indices : np.ndarray(K,)
+        Index of the atom to which each atomic basis function belongs.
+    num_atoms : int
+        Number of atoms.
+    olp_threshold : {1e-10, float}
+        Largest overlap between the basis functions of different fragments.
+
+    Returns
+    -------
+    atom_fragments : np.ndarray(A,)
+        Index of the fragment of each atom.
+        Fragments are numbered in the order of their first atom.
+
+    Raises
+    ------
+    TypeError
+        If `olp_ab_ab` is not a two-dimensional square numpy array.
+        If `ab_atom_indices` is not a one-dimensional numpy array of ints.
+        If `num_atoms` is not a positive integer.
+        If `olp_threshold` is not a float.
+    ValueError
+        If `ab_atom_indices` does not have one entry for each atomic basis function.
+        If `ab_atom_indices` contains indices that are less than 0 or greater than or equal to the
+        number of atoms.
+        If `olp_threshold` is negative.
+
+    Note
+    ----
+    The overlap is read in blocks of rows that fit in the memory budget of `orbtools.blocking`.
+
+    """
+    _check_square(olp_ab_ab, "olp_ab_ab")
+    num_ab = olp_ab_ab.shape[0]
+    _check_atom_indices(ab_atom_indices, num_ab, num_atoms, "ab_atom_indices")
+    _check_olp_threshold(olp_threshold)
+
+    # number of overlapping pairs of basis functions of each pair of atoms, P^T [|S| > t] P, where P
+    # is the indicator of the atom of each basis function
+    indicator = scipy.sparse.csr_matrix(
+        (np.ones(num_ab), (np.arange(num_ab), ab_atom_indices)), shape=(num_ab, num_atoms)
+    )
+    num_pairs = np.zeros((num_atoms, num_atoms))
+    memory_budget = blocking.resolve_memory_budget(None, olp_ab_ab)
+    # NOTE: each row needs two float rows: the indicator of the overlapping pairs, which is computed
+    # in place in a buffer that is reused for every block, and its copy in the product with the
+    # sparse indicator of the atoms
+    blocks = blocking.row_blocks(num_ab, 2 * num_ab * np.dtype(float).itemsize, memory_budget)
+    buffer = np.empty((max((rows.stop - rows.start for rows in blocks), default=0), num_ab))
+    for rows in blocks:
+        overlapping = buffer[: rows.stop - rows.start]
+        np.abs(olp_ab_ab[rows], out=overlapping)
+        np.greater(overlapping, olp_threshold, out=overlapping)
+        num_pairs += indicator[rows].T @ (overlapping @ indicator)
+    _, atom_fragments = scipy.sparse.csgraph.connected_components(
+        scipy.sparse.csr_matrix(num_pairs), directed=False
+    )
+    return atom_fragments
+
+
+def fragment_indices(atom_fragments, atom_indices):
+    """Return the indices of the basis functions of each fragment.
+
+    Parameters
+    ----------
+    atom_fragments : np.ndarray(A,)
+        Index of the fragment of each atom (see `find_fragments`).
+    atom_indices : np.ndarray(K,)
+        Index of the atom to which each basis function belongs.
+
+    Returns
+    -------
+    indices : list of np.ndarray
+        Indices of the basis functions of each fragment, in increasing order.
+        Fragments without basis functions are given empty arrays.
+
+    """
+    basis_fragments = atom_fragments[atom_indices]
+    order = np.argsort(basis_fragments, kind="stable")
+    bounds = np.searchsorted(
+        basis_fragments[order], np.arange(np.max(atom_fragments, initial=-1) + 2)
+    )
+    return [order[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+def _fragment_blocks(olp_ab_ab, ab_atom_indices, num_atoms, olp_threshold):
+    """Return the indices of the atomic basis functions of each nonempty fragment."""
+    atom_fragments = find_fragments(olp_ab_ab, ab_atom_indices, num_atoms, olp_threshold)
+    return [
+        indices for indices in fragment_indices(atom_fragments, ab_atom_indices) if indices.size
+    ]
+
+
+@tracing.traced("power_symmetric_fragments")
+def power_symmetric_fragments(
+    matrix,
+    k,
+    atom_indices,
+    num_atoms,
+    olp_threshold=OLP_THRESHOLD,
+    threshold=1e-9,
+    validate=None,
+    max_workers=1,
+):
+    """Return the kth power of the given symmetric matrix, one fragment at a time.
+
+    Parameters
+    ----------
+    matrix : np.ndarray(K, K)
+        Symmetric matrix (e.g. overlap of the atomic basis functions).
+    k : float
+        Power.
+    atom_indices : np.ndarray(K,)
+        Index of the atom to which each basis function belongs.
+    num_atoms : int
+        Number of atoms.
+    olp_threshold : {1e-10, float}
+        Largest entry (in absolute value) between the basis functions of different fragments.
+    threshold : {1e-9, float}
+        Threshold of the eigenvalues of each block (see `orthogonalization.power_symmetric`).
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks of each block.
+        Default is the level set in `orbtools.validation`.
+    max_workers : {1, int}
+        Number of threads that decompose the fragments.
+
+    Returns
+    -------
+    answer : np.ndarray(K, K)
+        Block diagonal matrix to the power of `k`.
+        Entries between the basis functions of different fragments are zero.
+
+    Raises
+    ------
+    TypeError
+        If `matrix` is not a two-dimensional square numpy array.
+        If `max_workers` is not a positive integer.
+    ValueError
+        If any block has negative eigenvalues and `k` is not an integer.
+
+    See Also
+    --------
+    orbtools.orthogonalization.power_symmetric
+
+    """
+    blocks = _fragment_blocks(matrix, atom_indices, num_atoms, olp_threshold)
+    if len(blocks) == 1:
+        return orth.power_symmetric(matrix, k, threshold=threshold, validate=validate)
+
+    def power_block(indices):
+        """Return the power of the block of the fragment."""
+        block = matrix[np.ix_(indices, indices)]
+        return orth.power_symmetric(block, k, threshold=threshold, validate=validate)
+
+    output = np.zeros(matrix.shape)
+    for indices, block in zip(blocks, _map(power_block, blocks, max_workers)):
+        output[np.ix_(indices, indices)] = block
+    return output
+
+
+@tracing.traced("project_fragments")
+def project_fragments(
+    olp_one_one,
+    olp_one_two,
+    atom_indices,
+    num_atoms,
+    olp_threshold=OLP_THRESHOLD,
+    validate=None,
+    max_workers=1,
+):
+    r"""Project one basis set onto another basis set, one fragment of set 1 at a time.
+
+    Since the overlap of set 1 is block diagonal, the projection of each function of set 2 is the
+    sum of its projections onto the fragments,
+
+    .. math::
+
+        C_{F,i} = (S_{A})_{FF}^{-1} (S_{A,B})_{F,i}
+
+    where :math:`F` are the basis functions of a fragment. Projections are then normalized, as in
+    `orbtools.quasi.project`.
+
+    Parameters
+    ----------
+    olp_one_one : np.ndarray(N, N)
+        Overlap of the basis functions in set 1 with basis functions from set 1.
+    olp_one_two : np.ndarray(N, M)
+        Overlap of the basis functions in set 1 with basis functions from set 2.
+    atom_indices : np.ndarray(N,)
+        Index of the atom to which each basis function of set 1 belongs.
+    num_atoms : int
+        Number of atoms.
+    olp_threshold : {1e-10, float}
+        Largest overlap between the basis functions of different fragments.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks.
+        If "full" or "cheap", the linear dependence of the projections is checked.
+        Default is the level set in `orbtools.validation`.
+    max_workers : {1, int}
+        Number of threads that solve the linear equations of the fragments.
+
+    Returns
+    -------
+    coeff : np.ndarray(N, M)
+        Transformation matrix from basis functions in set 1 to the projection of basis set 2 onto
+        basis set 1.
+
+    Raises
+    ------
+    TypeError
+        If `olp_one_one` is not a two-dimensional square numpy array.
+        If `olp_one_two` is not a two-dimensional numpy array.
+        If `max_workers` is not a positive integer.
+    ValueError
+        If the number of rows of `olp_one_two` is not equal to the number of rows of `olp_one_one`.
+        If `olp_one_one` is not symmetric.
+
+    See Also
+    --------
+    orbtools.quasi.project
+
+    """
+    _check_square(olp_one_one, "olp_one_one")
+    if not (isinstance(olp_one_two, np.ndarray) and olp_one_two.ndim == 2):
+        raise TypeError("`olp_one_two` must be a two-dimensional numpy array.")
+    if olp_one_one.shape[0] != olp_one_two.shape[0]:
+        raise ValueError(
+            "Number of rows/columns of `olp_one_one` must be equal to the number of rows in "
+            "`olp_one_two`."
+        )
+    blocks = _fragment_blocks(olp_one_one, atom_indices, num_atoms, olp_threshold)
+    if len(blocks) == 1:
+        return project(olp_one_one, olp_one_two, validate=validate)
+    level = validation.resolve_level(validate)
+
+    def project_block(indices):
+        """Return the projections onto the fragment and their overlap."""
+        block = olp_one_one[np.ix_(indices, indices)]
+        if not validation.is_hermitian(block, level):
+            raise ValueError("`olp_one_one` must be symmetric.")
+        coeff = solve_projection(block, olp_one_two[indices])
+        return coeff, coeff.T.dot(block).dot(coeff)
+
+    coeff_one_proj = np.zeros(olp_one_two.shape)
+    olp_proj_proj = 0
+    for indices, (coeff, olp) in zip(blocks, _map(project_block, blocks, max_workers)):
+        coeff_one_proj[indices] = coeff
+        olp_proj_proj += olp
+    return normalize_projections(coeff_one_proj, olp_proj_proj, validate=level)
+
+
+@tracing.traced("lowdin_populations_fragments")
+def lowdin_populations_fragments(
+    coeff_ab_mo,
+    occupations,
+    olp_ab_ab,
+    num_atoms,
+    ab_atom_indices,
+    olp_threshold=OLP_THRESHOLD,
+    validate=None,
+    max_workers=1,
+):
+    r"""Return the Lowdin populations of the given molecular orbitals, one fragment at a time.
+
+    Since the square root of the block diagonal overlap is block diagonal, the rows of the molecular
+    orbitals in the orthogonalized basis, :math:`S^{1/2} C`, are obtained for each fragment,
+
+    .. math::
+
+        (S^{1/2} C)_{F,i} = (S)_{FF}^{1/2} C_{F,i}
+
+    where :math:`F` are the basis functions of the fragment. Molecular orbitals may be delocalized
+    over several fragments.
+
+    Parameters
+    ----------
+    coeff_ab_mo : np.ndarray(K, M)
+        Transformation matrix from the atomic basis to molecular orbitals.
+    occupations : np.ndarray(M,)
+        Occupation numbers of each molecular orbital.
+    olp_ab_ab : np.ndarray(K, K)
+        Overlap between atomic basis functions.
+    num_atoms : int
+        Number of atoms.
+    ab_atom_indices : np.ndarray(K,)
+        Index of the atom to which each atomic basis function belongs.
+    olp_threshold : {1e-10, float}
+        Largest overlap between the basis functions of different fragments.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks of the inputs.
+        Default is the level set in `orbtools.validation`.
+    max_workers : {1, int}
+        Number of threads that analyze the fragments.
+
+    Returns
+    -------
+    population : np.ndarray(A,)
+        Number of electrons associated with each atom.
+
+    Raises
+    ------
+    TypeError
+        If `coeff_ab_mo` is not a two-dimensional numpy array.
+        If `occupations` is not a one-dimensional numpy array.
+        If `max_workers` is not a positive integer.
+    ValueError
+        If the number of rows of `coeff_ab_mo` is not equal to the number of atomic basis
+        functions.
+        If the number of columns of `coeff_ab_mo` is not equal to the number of occupations.
+        If `olp_ab_ab` is not symmetric.
+        If the molecular orbitals are not normalized.
+
+    See Also
+    --------
+    orbtools.mulliken.lowdin_populations
+
+    """
+    blocks = _fragment_blocks(olp_ab_ab, ab_atom_indices, num_atoms, olp_threshold)
+    if len(blocks) == 1:
+        return lowdin_populations(
+            coeff_ab_mo, occupations, olp_ab_ab, num_atoms, ab_atom_indices, validate=validate
+        )
+    if not (isinstance(coeff_ab_mo, np.ndarray) and coeff_ab_mo.ndim == 2):
+        raise TypeError("`coeff_ab_mo` must be a two-dimensional numpy array.")
+    if not (isinstance(occupations, np.ndarray) and occupations.ndim == 1):
+        raise TypeError("`occupations` must be a one-dimensional numpy array.")
+    if coeff_ab_mo.shape[0] != olp_ab_ab.shape[0]:
+        raise ValueError(
+            "Number of rows of `coeff_ab_mo` must be equal to the number of atomic basis functions."
+        )
+    if coeff_ab_mo.shape[1] != occupations.size:
+        raise ValueError(
+            "Number of columns of `coeff_ab_mo` must be equal to the number of occupations."
+        )
+    level = validation.resolve_level(validate)
+
+    def orthogonalize_block(indices):
+        """Return the rows of the fragment of the orbitals in the orthogonalized basis."""
+        block = olp_ab_ab[np.ix_(indices, indices)]
+        return orth.power_symmetric(block, 0.5, validate=level).dot(coeff_ab_mo[indices])
+
+    raw_pops = np.zeros(olp_ab_ab.shape[0])
+    norms = 0
+    for indices, coeff_oab_mo in zip(blocks, _map(orthogonalize_block, blocks, max_workers)):
+        coeff_oab_mo **= 2
+        raw_pops[indices] = coeff_oab_mo.dot(occupations)
+        norms += np.sum(coeff_oab_mo, axis=0)
+    # NOTE: the norms of the molecular orbitals are the sums of the columns of (S^{1/2} C)^2
+    if level != "off" and not np.allclose(norms, 1):
+        raise ValueError(
+            "The overlap of the molecular orbitals, calculated from `coeff_ab_mo` and `olp_ab_ab` "
+            "is not normalized."
+        )
+    return sum_by_atom(raw_pops, ab_atom_indices, num_atoms)
+
+
+def _fragment_orbitals(olp_ab_ab, coeff_ab_mo, indices_span, complete):
+    r"""Return the orthonormal orbitals of a fragment that span the restrictions of the given ones.
+
+    The restriction of orthonormal orbitals to the basis functions of a fragment, :math:`C_F`, spans
+    a subspace of the fragment if the orbitals are linear combinations of the orbitals of the
+    separate fragments. The projector onto this subspace in the orthogonalized basis of the fragment
+    is then :math:`S_{FF}^{1/2} C_F C_F^T S_{FF}^{1/2}`, whose eigenvalues are 0 or 1.
+
+    Parameters
+    ----------
+    olp_ab_ab : np.ndarray(k, k)
+        Overlaps of the atomic basis functions of the fragment.
+    coeff_ab_mo : np.ndarray(k, M)
+        Rows of the fragment of the orthonormal orbitals.
+    indices_span : np.ndarray(M)
+        Boolean indices of the orbitals that are spanned.
+    complete : bool
+        Whether the orbitals span the atomic basis functions of the whole system.
+        If True, the other orbitals of the fragment are the complement of the spanned ones, and are
+        obtained from the same projector.
+
+    Returns
+    -------
+    coeffs_ab_fmo : {list of np.ndarray(k, m), None}
+        Orthonormal orbitals of the fragment that span the restrictions of the spanned orbitals and
+        of the others.
+        None if the orbitals are not combinations of the orbitals of the fragments.
+
+    """
+    eigval, eigvec = orth.eigh(olp_ab_ab, validate="off")
+    olp_sqrt = (eigvec * eigval ** 0.5).dot(eigvec.T)
+    coeff_ab_oab = eigvec * eigval ** (-0.5)
+    output = []
+    for indices in [indices_span, ~indices_span]:
+        coeff_oab_mo = olp_sqrt.dot(coeff_ab_mo[:, indices])
+        # NOTE: the eigenvalues of the projector that are zero are not discarded with warnings (as
+        # in `orthogonalization.eigh`), since they are expected
+        proj_val, proj_vec = scipy.linalg.eigh(coeff_oab_mo.dot(coeff_oab_mo.T), check_finite=False)
+        kept = proj_val > MO_SEPARATION
+        if np.any((proj_val > 1 - MO_SEPARATION) & ~kept):
+            return None
+        # eigenvectors are in the basis of the eigenvectors of the overlap
+        proj_vec = eigvec.T.dot(proj_vec)
+        output.append(coeff_ab_oab.dot(proj_vec[:, kept]))
+        if complete:
+            output.append(coeff_ab_oab.dot(proj_vec[:, ~kept]))
+            return output
+    return output
+
+
+@tracing.traced("quao_fragments")
+def quao_fragments(
+    olp_ab_ab,
+    olp_aao_ab,
+    olp_aao_aao,
+    coeff_ab_mo,
+    indices_span,
+    ab_atom_indices,
+    aao_atom_indices,
+    num_atoms,
+    olp_threshold=OLP_THRESHOLD,
+    validate=None,
+    svd_method=None,
+    max_workers=1,
+):
+    r"""Return transformation matrix from atomic basis functions to QUAO's, one fragment at a time.
+
+    The molecular orbitals that are spanned and the others are each split into the orbitals of the
+    fragments (which are unique up to a rotation, even if the orbitals of different fragments are
+    degenerate), and the QUAO's of each fragment are made from the reference basis functions of its
+    atoms with `orbtools.quasi.quao`. The MMO space of each fragment then has the dimension of the
+    reference basis functions of the fragment.
+
+    Parameters
+    ----------
+    olp_ab_ab : np.ndarray(K, K)
+        Overlaps of the atomic basis functions.
+    olp_aao_ab : np.ndarray(L, K)
+        Overlaps of the reference basis functions (aao) with the atomic basis functions.
+    olp_aao_aao : np.ndarray(L, L)
+        Overlaps of the reference basis functions.
+    coeff_ab_mo : np.ndarray(K, M)
+        Transformation matrix from the atomic basis functions to molecular orbitals.
+    indices_span : np.ndarray(M)
+        Molecular orbitals that will be spanned exactly by the QUAO's.
+    ab_atom_indices : np.ndarray(K,)
+        Index of the atom to which each atomic basis function belongs.
+    aao_atom_indices : np.ndarray(L,)
+        Index of the atom to which each reference basis function belongs.
+    num_atoms : int
+        Number of atoms.
+    olp_threshold : {1e-10, float}
+        Largest overlap between the atomic basis functions of different fragments.
+        Overlaps of the reference basis functions with the atomic basis functions of other
+        fragments are neglected as well.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks.
+        Default is the level set in `orbtools.validation`.
+    svd_method : {None, "randomized", "lanczos"}
+        Algorithm used to compute the right singular vectors (see `orbtools.quasi.make_mmo`).
+    max_workers : {1, int}
+        Number of threads that analyze the fragments.
+
+    Returns
+    -------
+    coeff_ab_quao : np.ndarray(K, L)
+        Transformation matrix from atomic basis functions to QUAO's.
+        QUAO's are in the order of the reference basis functions, and have no components on the
+        atomic basis functions of the other fragments.
+
+    Raises
+    ------
+    TypeError
+        If `coeff_ab_mo` is not a two-dimensional numpy array.
+        If `olp_aao_ab` is not a two-dimensional numpy array.
+        If `olp_aao_aao` is not a two-dimensional square numpy array.
+        If `indices_span` is not a one-dimensional numpy array of dtype bool.
+        If `aao_atom_indices` is not a one-dimensional numpy array of ints.
+        If `max_workers` is not a positive integer.
+    ValueError
+        If the numbers of atomic or reference basis functions are not consistent.
+        If the number of entries of `indices_span` is not equal to the number of molecular
+        orbitals.
+        If a fragment has more orbitals to span than reference basis functions.
+
+    Warns
+    -----
+    If the molecular orbitals are not combinations of the orbitals of the separate fragments (e.g.
+    degenerate orbitals of different fragments are split between the spanned orbitals and the
+    others). QUAO's of the whole system are then returned.
+
+    See Also
+    --------
+    orbtools.quasi.quao
+
+    """
+    atom_fragments = find_fragments(olp_ab_ab, ab_atom_indices, num_atoms, olp_threshold)
+    ab_blocks = fragment_indices(atom_fragments, ab_atom_indices)
+    args = (olp_ab_ab, olp_aao_ab, olp_aao_aao, coeff_ab_mo, indices_span)
+    if sum(indices.size > 0 for indices in ab_blocks) == 1:
+        return quao(*args, validate=validate, svd_method=svd_method)
+    if not (isinstance(coeff_ab_mo, np.ndarray) and coeff_ab_mo.ndim == 2):
+        raise TypeError("`coeff_ab_mo` must be a two-dimensional numpy array.")
+    if not (isinstance(olp_aao_ab, np.ndarray) and olp_aao_ab.ndim == 2):
+        raise TypeError("`olp_aao_ab` must be a two-dimensional numpy array.")
+    _check_square(olp_aao_aao, "olp_aao_aao")
+    if not (
+        isinstance(indices_span, np.ndarray)
+        and indices_span.ndim == 1
+        and indices_span.dtype == bool
+    ):
+        raise TypeError("`indices_span` must be a one-dimensional numpy array of dtype bool.")
+    num_ab = olp_ab_ab.shape[0]
+    num_aao = olp_aao_aao.shape[0]
+    if coeff_ab_mo.shape[0] != num_ab or olp_aao_ab.shape != (num_aao, num_ab):
+        raise ValueError("Numbers of atomic or reference basis functions are not consistent.")
+    if indices_span.size != coeff_ab_mo.shape[1]:
+        raise ValueError(
+            "`indices_span` must have as many entries as there are columns in the `coeff_ab_mo`."
+        )
+    _check_atom_indices(aao_atom_indices, num_aao, num_atoms, "aao_atom_indices")
+    aao_blocks = fragment_indices(atom_fragments, aao_atom_indices)
+    # NOTE: fragments without reference basis functions have no QUAO's (and must have no orbitals
+    # to span)
+    blocks = [(ab, aao) for ab, aao in zip(ab_blocks, aao_blocks) if ab.size and aao.size]
+
+    def split_block(block):
+        """Return the spanned and other orbitals of the fragment."""
+        ab_indices = block[0]
+        return _fragment_orbitals(
+            olp_ab_ab[np.ix_(ab_indices, ab_indices)],
+            coeff_ab_mo[ab_indices],
+            indices_span,
+            coeff_ab_mo.shape[1] == num_ab,
+        )
+
+    orbitals = _map(split_block, blocks, max_workers)
+    if any(pair is None for pair in orbitals) or sum(
+        pair[0].shape[1] for pair in orbitals
+    ) != np.sum(indices_span):
+        print(
+            "WARNING: Molecular orbitals are not combinations of the orbitals of the separate "
+            "fragments. QUAO's of the whole system are returned instead."
+        )
+        return quao(*args, validate=validate, svd_method=svd_method)
+
+    def quao_block(item):
+        """Return the QUAO's of the fragment."""
+        (ab_indices, aao_indices), (coeff_span, coeff_other) = item
+        return quao(
+            olp_ab_ab[np.ix_(ab_indices, ab_indices)],
+            olp_aao_ab[np.ix_(aao_indices, ab_indices)],
+            olp_aao_aao[np.ix_(aao_indices, aao_indices)],
+            np.hstack([coeff_span, coeff_other]),
+            np.arange(coeff_span.shape[1] + coeff_other.shape[1]) < coeff_span.shape[1],
+            validate=validate,
+            svd_method=svd_method,
+        )
+
+    coeff_ab_quao = np.zeros((num_ab, num_aao))
+    items = list(zip(blocks, orbitals))
+    for (ab_indices, aao_indices), block in zip(blocks, _map(quao_block, items, max_workers)):
+        coeff_ab_quao[np.ix_(ab_indices, aao_indices)] = block
+    return coeff_ab_quao
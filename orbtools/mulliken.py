@@ -1,12 +1,373 @@
 """Mulliken population analysis."""
 import numpy as np
+from orbtools import tracing, validation
+from orbtools.blocking import resolve_memory_budget, row_blocks
 from orbtools.orthogonalization import power_symmetric
 from orbtools.quasi import project
+from orbtools.weights import as_weight_scheme, sum_by_atom
+import scipy.sparse
+
+# Number of (block size, K) temporary arrays held at once by the blocked population kernels
+NUM_TILES = 4
+
+
+def _sum_by_atom_pairs(values, ab_atom_indices, num_atoms, memory_budget=None):
+    """Sum the last two axes of the given values over the basis functions of each pair of atoms.
+
+    Values are reduced with `np.add.reduceat` over the basis functions sorted by atom, one block of
+    rows at a time, so that only the sums of each block of rows over the atoms are held at once (as
+    well as the sorted copy of the block if the basis functions are not already sorted by atom).
+
+    Parameters
+    ----------
+    values : np.ndarray(..., K, K)
+        Values associated with each pair of atomic basis functions.
+        `K` is the number of atomic orbitals.
+    ab_atom_indices : np.ndarray(K,)
+        Index of the atom to which each atomic basis function belongs.
+    num_atoms : int
+        Number of atoms.
+    memory_budget : {int, None}
+        Number of bytes that the sorted copies of the blocks of rows may use.
+        Default is to reduce all of the rows at once.
+
+    Returns
+    -------
+    pair_values : np.ndarray(..., A, A)
+        Sum of the values of the pairs of basis functions that belong to each pair of atoms.
+        `A` is the number of atoms.
+
+    """
+    lead_shape = values.shape[:-2]
+    num_ab = values.shape[-1]
+    values = values.reshape((-1, num_ab, num_ab))
+    order = np.argsort(ab_atom_indices, kind="stable")
+    is_sorted = np.array_equal(order, np.arange(num_ab))
+    sorted_atoms = ab_atom_indices[order]
+    atoms, starts = np.unique(sorted_atoms, return_index=True)
+    output = np.zeros((values.shape[0], num_atoms, num_atoms))
+    row_nbytes = values.shape[0] * num_ab * values.itemsize
+    for rows in row_blocks(num_ab, row_nbytes, memory_budget):
+        if is_sorted:
+            block = values[:, rows]
+        else:
+            block = values[:, order[rows, None], order[None, :]]
+        row_atoms, row_starts = np.unique(sorted_atoms[rows], return_index=True)
+        output[:, row_atoms[:, None], atoms[None, :]] += np.add.reduceat(
+            np.add.reduceat(block, starts, axis=-1), row_starts, axis=-2
+        )
+    return output.reshape(lead_shape + (num_atoms, num_atoms))
+
+
+def _drop_small(matrix, drop_tol):
+    """Return the given atom-pair matrix (or stack of matrices) as sparse matrices.
+
+    Parameters
+    ----------
+    matrix : np.ndarray(..., A, A)
+        Atom-pair matrix or a stack of atom-pair matrices.
+    drop_tol : {float, None}
+        Entries whose absolute values are less than or equal to the tolerance are dropped.
+        If None, the dense matrix is returned.
+
+    Returns
+    -------
+    matrix : {np.ndarray(A, A), scipy.sparse.csr_matrix, list of scipy.sparse.csr_matrix}
+        Dense matrix if `drop_tol` is None.
+        Sparse matrix (or a list of sparse matrices for a stack) otherwise.
+
+    Raises
+    ------
+    TypeError
+        If `drop_tol` is not an integer or a float (or None).
+    ValueError
+        If `drop_tol` is negative.
+
+    """
+    if drop_tol is None:
+        return matrix
+    if not isinstance(drop_tol, (int, float)):
+        raise TypeError("Drop tolerance must be an integer or a float (or None).")
+    if drop_tol < 0:
+        raise ValueError("Drop tolerance must be greater than or equal to zero.")
+    if matrix.ndim > 2:
+        return [_drop_small(i, drop_tol) for i in matrix]
+    return scipy.sparse.csr_matrix(np.where(np.abs(matrix) > drop_tol, matrix, 0))
+
+
+def _check_mo_input(
+    coeff_ab_mo, occupations, olp_ab_ab, num_atoms, ab_atom_indices, level, memory_budget=None
+):
+    """Check the inputs of the population analyses that use molecular orbitals.
+
+    Parameters
+    ----------
+    coeff_ab_mo : np.ndarray(K, M)
+        Transformation matrix from the atomic basis to molecular orbitals.
+    occupations : {np.ndarray(M,), None}
+        Occupation numbers of each molecular orbital.
+        If None, the occupation numbers are not checked.
+    olp_ab_ab : np.ndarray(K, K)
+        Overlap between atomic basis functions.
+    num_atoms : int
+        Number of atoms.
+    ab_atom_indices : np.ndarray(K,)
+        Index of the atom to which each atomic basis function belongs.
+    level : {"full", "cheap", "off"}
+        Level of the numerical checks.
+    memory_budget : {int, None}
+        Number of bytes that the temporary arrays of the numerical checks may use.
+        Default is to check the whole matrices at once.
+
+    Raises
+    ------
+    TypeError
+        If `coeff_ab_mo` is not a two-dimensional numpy array of floats.
+        If `occupations` is not a one-dimensional numpy array of ints/floats.
+        If `olp_ab_ab` is not a two-dimensional numpy array of floats.
+        If `num_atoms` is not an integer.
+        If `ab_atom_indices` is not a a one-dimensional numpy array of ints.
+    ValueError
+        If `olp_ab_ab` is not square.
+        If the number of rows in `coeff_ab_mo` is not equal to the number of rows in
+        `olp_ab_ab`.
+        If the number of columns in `coeff_ab_mo` is not equal to the number of entries in
+        `occupations`.
+        If `olp_ab_ab` is not symmetric.
+        If `olp_ab_ab` does not have diagonals of 1.
+        If molecular orbitals are not normalized.
+        If `occupations` has any negative numbers.
+        If `ab_atom_indices` does not have the same number of entries as there are atomic basis
+        functions (i.e. number of rows in `olp_ab_ab`).
+        If `ab_atom_indices` contains indices that are less than 0 or greater than or equal to the
+        number of atoms.
+
+    Warns
+    -----
+    If there are any occupation numbers of the molecular orbitals that is greater than 2.
+
+    """
+    # pylint: disable=R0912
+    if not (
+        isinstance(coeff_ab_mo, np.ndarray) and coeff_ab_mo.ndim == 2 and coeff_ab_mo.dtype == float
+    ):
+        raise TypeError(
+            "Transformation matrix from atomic basis functions to molecular orbitals must be a "
+            "two-dimensional numpy array of floats."
+        )
+    if occupations is not None and not (
+        isinstance(occupations, np.ndarray)
+        and occupations.ndim == 1
+        and occupations.dtype in [float, int]
+    ):
+        raise TypeError(
+            "Molecular orbital occupation numbers must be not a one-dimensional numpy array of "
+            "floats or ints."
+        )
+    if not (isinstance(olp_ab_ab, np.ndarray) and olp_ab_ab.ndim == 2 and olp_ab_ab.dtype == float):
+        raise TypeError(
+            "Overlap of the atomic basis functions must be a two-dimensional numpy array of floats."
+        )
+    if not isinstance(num_atoms, int):
+        raise TypeError("Number of atoms must be an integer.")
+    if not (
+        isinstance(ab_atom_indices, np.ndarray)
+        and ab_atom_indices.ndim == 1
+        and ab_atom_indices.dtype == int
+    ):
+        raise TypeError(
+            "Atom indices of each atomic basis function must be a one-dimensional numpy array of "
+            "integers with size equal to the number of atomic basis functions."
+        )
+
+    if not olp_ab_ab.shape[0] == olp_ab_ab.shape[1]:
+        raise ValueError("Overlap matrix is not square.")
+    if not coeff_ab_mo.shape[0] == olp_ab_ab.shape[0]:
+        raise ValueError(
+            "Number of atomic orbitals in the transformation matrix and overlap matrix are not "
+            "equal."
+        )
+    if occupations is not None and not coeff_ab_mo.shape[1] == occupations.size:
+        raise ValueError(
+            "Number of molecular orbitals in the transformation matrix and occupations are not "
+            "equal."
+        )
+
+    if not validation.is_hermitian(olp_ab_ab, level, memory_budget=memory_budget):
+        raise ValueError("Overlap of the atomic basis functions must be symmetric.")
+    if level != "off" and not np.allclose(np.diag(olp_ab_ab), 1):
+        raise ValueError("Overlap of the atomic basis functions must be normalized.")
+    if not validation.is_normalized(coeff_ab_mo, olp_ab_ab, level, memory_budget=memory_budget):
+        raise ValueError(
+            "Molecular orbitals (and the corresponding transformation matrix) must be normalized."
+        )
+
+    if occupations is not None and not np.all(occupations >= 0):
+        raise ValueError("Occupation numbers must be greater than or equal to 0.")
+    if occupations is not None and np.any(occupations > 2):
+        print("WARNING: Atleast one occupation number exceeds 2.")
+
+    # Check basis mapping
+    if ab_atom_indices.size != olp_ab_ab.shape[0]:
+        raise ValueError(
+            "Number of indices in `ab_atom_indices` must be equal to the number of atomic basis "
+            "functions."
+        )
+    if not (np.all(ab_atom_indices >= 0) and np.all(ab_atom_indices < num_atoms)):
+        raise ValueError(
+            "Atom indices of each atomic basis function must be greater than or equal to zero and "
+            " less than the number of atoms"
+        )
+
+
+def _check_atom_weights(atom_weights, num_atoms, num_ab, level):
+    """Check the weights of the atomic orbital pairs for the atoms.
+
+    Parameters
+    ----------
+    atom_weights : {np.ndarray(A, K, K), orbtools.weights.WeightScheme}
+        Weights of the atomic orbital pairs for the atoms.
+    num_atoms : int
+        Number of atoms.
+    num_ab : int
+        Number of atomic orbitals.
+    level : {"full", "cheap", "off"}
+        Level of the numerical checks.
+
+    Raises
+    ------
+    TypeError
+        If `atom_weights` is not a WeightScheme or a 3-dimensional numpy array of ints/floats.
+    ValueError
+        If `atom_weights` is not consistent with the number of atoms and atomic orbitals.
+        If `atom_weights` is not symmetric or not normalized.
+
+    """
+    as_weight_scheme(atom_weights).check(num_atoms, num_ab, level)
+
+
+def _populations_from_rows(
+    olp_rows, density_rows, num_atoms, ab_atom_indices, atom_weights=None, rows=None
+):
+    """Return the contributions of the given rows to the populations of the atoms.
+
+    Inputs are assumed to have been checked.
+
+    Parameters
+    ----------
+    olp_rows : np.ndarray(..., R, K)
+        Rows of the overlap between atomic basis functions.
+    density_rows : np.ndarray(..., R, K)
+        Same rows of the transpose of the density matrices. Since the density matrices are
+        symmetric, these are also the rows of the density matrices.
+    num_atoms : int
+        Number of atoms.
+    ab_atom_indices : np.ndarray(K,)
+        Index of the atom to which each atomic basis function belongs.
+    atom_weights : {np.ndarray(A, K, K), orbtools.weights.WeightScheme}
+        Weights of the atomic orbital pairs for the atoms.
+        Default is the Mulliken partitioning scheme.
+    rows : {slice, None}
+        Rows that are given.
+        Default is all of the rows.
+
+    Returns
+    -------
+    population : np.ndarray(..., A)
+        Contributions of the rows to the number of electrons associated with each atom.
+
+    """
+    rows = slice(None) if rows is None else rows
+    if atom_weights is None:
+        # In the Mulliken partitioning, half of the population of the pair of atomic orbitals is
+        # given to the atom of each orbital. Since both the overlap and the density matrices are
+        # symmetric, the population of an atom is the sum of the rows of the elementwise product
+        # of the overlap and density that belong to the atom. This avoids building the (A, K, K)
+        # weights array.
+        # This is equivalent to the following:
+        # output = np.zeros(num_atoms)
+        # for i in range(num_atoms):
+        #     weights = np.zeros(num_ab)
+        #     weights[ab_atom_indices == i] = 0.5
+        #     weights = weights[:, None] + weights[None, :]
+        #     output[i] = np.sum(olp_ab_ab * density.T * weights)
+        raw_pops = np.einsum("...jk,...jk->...j", olp_rows, density_rows)
+        return sum_by_atom(raw_pops, ab_atom_indices[rows], num_atoms)
+    return as_weight_scheme(atom_weights).reduce(
+        olp_rows * density_rows, ab_atom_indices, num_atoms, rows=rows
+    )
+
+
+@tracing.traced(
+    "populations.reduce",
+    flops=lambda density, *args, **kwargs: 2 * density.size,
+)
+def _populations_from_density(
+    density, olp_ab_ab, num_atoms, ab_atom_indices, atom_weights=None, memory_budget=None
+):
+    """Return the populations of the atoms from the given density matrices.
+
+    Inputs are assumed to have been checked.
+
+    Parameters
+    ----------
+    density : np.ndarray(..., K, K)
+        Density matrices in the atomic orbital basis.
+    olp_ab_ab : np.ndarray(..., K, K)
+        Overlap between atomic basis functions.
+        Leading dimensions are broadcasted against those of `density`.
+    num_atoms : int
+        Number of atoms.
+    ab_atom_indices : np.ndarray(K,)
+        Index of the atom to which each atomic basis function belongs.
+    atom_weights : {np.ndarray(A, K, K), orbtools.weights.WeightScheme}
+        Weights of the atomic orbital pairs for the atoms.
+        Default is the Mulliken partitioning scheme.
+    memory_budget : {int, None}
+        Number of bytes that the temporary arrays may use.
+        Default is to use the whole matrices at once.
+
+    Returns
+    -------
+    population : np.ndarray(..., A)
+        Number of electrons associated with each atom.
+
+    """
+    # NOTE: broadcasting a shared overlap does not copy it
+    olp_ab_ab = np.broadcast_to(olp_ab_ab, density.shape)
+    num_ab = density.shape[-1]
+    row_nbytes = NUM_TILES * int(np.prod(density.shape[:-2])) * num_ab * density.itemsize
+    output = 0
+    for rows in row_blocks(num_ab, row_nbytes, memory_budget):
+        # NOTE: rows (rather than columns) of the symmetric density are read, since they are
+        # contiguous in memory and on disk
+        output = output + _populations_from_rows(
+            olp_ab_ab[..., rows, :],
+            density[..., rows, :],
+            num_atoms,
+            ab_atom_indices,
+            atom_weights=atom_weights,
+            rows=rows,
+        )
+    return output
 
 
 # FIXME: bad name (since providing atom_weights will result in the population not being Mulliken)
+@tracing.traced(
+    "mulliken_populations",
+    flops=lambda coeff_ab_mo, *args, **kwargs: tracing.matmul_flops(
+        coeff_ab_mo.shape[0], coeff_ab_mo.shape[1], coeff_ab_mo.shape[0]
+    ),
+)
 def mulliken_populations(
-    coeff_ab_mo, occupations, olp_ab_ab, num_atoms, ab_atom_indices, atom_weights=None
+    coeff_ab_mo,
+    occupations,
+    olp_ab_ab,
+    num_atoms,
+    ab_atom_indices,
+    atom_weights=None,
+    validate=None,
+    memory_budget=None,
 ):
     r"""Return the Mulliken populations of the given molecular orbitals.
 
@@ -93,13 +454,26 @@ def mulliken_populations(
         Index of the atom to which each atomic basis function belongs.
         Data type must be integers.
         `K` is the number of atomic orbitals.
-    atom_weights : np.ndarray(A, K, K)
+    atom_weights : {np.ndarray(A, K, K), orbtools.weights.WeightScheme}
         Weights of the atomic orbital pairs for the atoms. In other words, this weight controls the
         amount of electrons associated with an atomic orbital pair that will be attributed to an
         atom.
         `A` is the number of atoms and `K` is the number of atomic orbitals.
         Default is the Mulliken partitioning scheme where two orbitals that belong to the given atom
         is 1, only one orbital that belong to the given atoms is 0.5, and no orbitals is 0.
+        A scheme from `orbtools.weights` (e.g. `BickelhauptWeights`) gives the same populations as
+        its dense weights without building the (A, K, K) array.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks of the inputs.
+        Default is the level set in `orbtools.validation`.
+    memory_budget : {int, None}
+        Number of bytes that the temporary arrays may use.
+        If given, the density matrix is never built: its blocks of rows are computed from the
+        corresponding rows of `coeff_ab_mo` and reduced with the same rows of `olp_ab_ab`, so that
+        only a few arrays of shape (block size, K) are held at once. The results are the same up to
+        rounding.
+        Default is the budget set in `orbtools.blocking`. Memory-mapped inputs (see
+        `orbtools.blocking.load_array`) are always read in blocks.
 
     Returns
     -------
@@ -118,6 +492,7 @@ def mulliken_populations(
         If `ab_atom_indices` is not a a one-dimensional numpy array of ints.
         If `atom_weights` is not the default value (`None`) and is not a 3-dimensional numpy array
         of ints/flotas.
+        If `memory_budget` is not an integer or None.
     ValueError
         If `olp_ab_ab` is not square.
         If the number of rows in `coeff_ab_mo` is not equal to the number of rows in
@@ -132,40 +507,256 @@ def mulliken_populations(
         functions (i.e. number of rows in `olp_ab_ab`).
         If `ab_atom_indices` contains indices that are less than 0 or greater than or equal to the
         number of atoms.
-        If `atom_weights` has first dimension that is not equal to the number of atoms.
-        If `atom_weights` has second and third dimensions that are not equal to the number of atomic
-        orbitals.
-        If `atom_weights` is not symmetric with respect to the interchange of the second and third
-        indices.
-        If `atom_weights` is not normalized. i.e. sum over the first dimension does not result in
-        1's.
-
-    Warns
-    -----
-    If there are any occupation numbers of the molecular orbitals that is greater than 2.
-    If the total population does not match the sum of the electrons provided by the `occupations`.
+        If `atom_weights` has first dimension that is not equal to the number of atoms.
+        If `atom_weights` has second and third dimensions that are not equal to the number of atomic
+        orbitals.
+        If `atom_weights` is not symmetric with respect to the interchange of the second and third
+        indices.
+        If `atom_weights` is not normalized. i.e. sum over the first dimension does not result in
+        1's.
+        If `memory_budget` is not positive.
+
+    Warns
+    -----
+    If there are any occupation numbers of the molecular orbitals that is greater than 2.
+    If the total population does not match the sum of the electrons provided by the `occupations`.
+
+    """
+    level = validation.resolve_level(validate)
+    memory_budget = resolve_memory_budget(memory_budget, coeff_ab_mo, olp_ab_ab)
+    with tracing.span("mulliken_populations.validate"):
+        _check_mo_input(
+            coeff_ab_mo,
+            occupations,
+            olp_ab_ab,
+            num_atoms,
+            ab_atom_indices,
+            level,
+            memory_budget=memory_budget,
+        )
+        if atom_weights is not None:
+            _check_atom_weights(atom_weights, num_atoms, olp_ab_ab.shape[0], level)
+
+    num_ab = olp_ab_ab.shape[0]
+    output = 0
+    for rows in row_blocks(num_ab, NUM_TILES * num_ab * olp_ab_ab.itemsize, memory_budget):
+        # rows of the density matrix (which is symmetric)
+        density_rows = (coeff_ab_mo[rows] * occupations[None, :]).dot(coeff_ab_mo.T)
+        output = output + _populations_from_rows(
+            olp_ab_ab[rows], density_rows, num_atoms, ab_atom_indices, atom_weights, rows=rows
+        )
+
+    if not abs(np.sum(occupations) - np.sum(output)) < 1e-6:
+        print("WARNING: Population does not match up with the number of electrons.")
+
+    return output
+
+
+def mulliken_populations_batch(
+    coeff_ab_mo,
+    occupations,
+    olp_ab_ab,
+    num_atoms,
+    ab_atom_indices,
+    atom_weights=None,
+    validate=None,
+):
+    r"""Return the Mulliken populations of a stack of sets of molecular orbitals.
+
+    Each set of molecular orbitals (e.g. frames of a trajectory or spin channels) is treated as in
+    `mulliken_populations`, but the densities and the reductions of all sets are evaluated together
+    with stacked matrix products rather than a loop over the sets.
+
+    Parameters
+    ----------
+    coeff_ab_mo : np.ndarray(B, K, M)
+        Transformation matrices from the atomic basis to molecular orbitals.
+        Data type must be float.
+        `B` is the number of sets, `K` is the number of atomic orbitals, and `M` is the number of
+        molecular orbitals.
+    occupations : np.ndarray(B, M)
+        Occupation numbers of each molecular orbital in each set.
+        Data type must be integers or floats.
+    olp_ab_ab : {np.ndarray(K, K), np.ndarray(B, K, K)}
+        Overlap between atomic basis functions.
+        If two-dimensional, the same overlap is used for all sets.
+        Data type must be floats.
+    num_atoms : int
+        Number of atoms.
+    ab_atom_indices : np.ndarray(K,)
+        Index of the atom to which each atomic basis function belongs.
+        Data type must be integers.
+    atom_weights : {np.ndarray(A, K, K), orbtools.weights.WeightScheme}
+        Weights of the atomic orbital pairs for the atoms.
+        Default is the Mulliken partitioning scheme.
+        See `mulliken_populations` for details.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks of the inputs.
+        Default is the level set in `orbtools.validation`.
+
+    Returns
+    -------
+    population : np.ndarray(B, A)
+        Number of electrons associated with each atom for each set of molecular orbitals.
+        `A` is the number of atoms.
+
+    Raises
+    ------
+    TypeError
+        If `coeff_ab_mo` is not a three-dimensional numpy array of floats.
+        If `occupations` is not a two-dimensional numpy array of ints/floats.
+        If `olp_ab_ab` is not a two- or three-dimensional numpy array of floats.
+        If `num_atoms` is not an integer.
+        If `ab_atom_indices` is not a a one-dimensional numpy array of ints.
+    ValueError
+        If the shapes of `coeff_ab_mo`, `occupations`, `olp_ab_ab`, and `ab_atom_indices` are not
+        consistent.
+        If `olp_ab_ab` is not symmetric or does not have diagonals of 1.
+        If molecular orbitals are not normalized.
+        If `occupations` has any negative numbers.
+        If `ab_atom_indices` contains indices that are less than 0 or greater than or equal to the
+        number of atoms.
+
+    Warns
+    -----
+    If there are any occupation numbers of the molecular orbitals that is greater than 2.
+    If the total population of any set does not match the sum of the electrons provided by the
+    `occupations`.
+
+    See Also
+    --------
+    orbtools.mulliken.mulliken_populations
+
+    """
+    # pylint: disable=R0912
+    if not (
+        isinstance(coeff_ab_mo, np.ndarray) and coeff_ab_mo.ndim == 3 and coeff_ab_mo.dtype == float
+    ):
+        raise TypeError(
+            "Transformation matrices from atomic basis functions to molecular orbitals must be a "
+            "three-dimensional numpy array of floats."
+        )
+    if not (
+        isinstance(occupations, np.ndarray)
+        and occupations.ndim == 2
+        and occupations.dtype in [float, int]
+    ):
+        raise TypeError(
+            "Molecular orbital occupation numbers must be a two-dimensional numpy array of floats "
+            "or ints."
+        )
+    if not (
+        isinstance(olp_ab_ab, np.ndarray) and olp_ab_ab.ndim in [2, 3] and olp_ab_ab.dtype == float
+    ):
+        raise TypeError(
+            "Overlap of the atomic basis functions must be a two- or three-dimensional numpy array "
+            "of floats."
+        )
+    if not isinstance(num_atoms, int):
+        raise TypeError("Number of atoms must be an integer.")
+    if not (
+        isinstance(ab_atom_indices, np.ndarray)
+        and ab_atom_indices.ndim == 1
+        and ab_atom_indices.dtype == int
+    ):
+        raise TypeError(
+            "Atom indices of each atomic basis function must be a one-dimensional numpy array of "
+            "integers with size equal to the number of atomic basis functions."
+        )
+
+    num_sets, num_ab, num_mo = coeff_ab_mo.shape
+    if olp_ab_ab.shape[-2:] != (num_ab, num_ab) or olp_ab_ab.shape[:-2] not in [(), (num_sets,)]:
+        raise ValueError(
+            "Overlap matrices must be square with as many rows as there are atomic orbitals in the "
+            "transformation matrices, and there must be one for each set (or one for all sets)."
+        )
+    if occupations.shape != (num_sets, num_mo):
+        raise ValueError(
+            "Number of sets and molecular orbitals in the transformation matrices and occupations "
+            "are not equal."
+        )
+    level = validation.resolve_level(validate)
+    if not validation.is_hermitian(olp_ab_ab, level):
+        raise ValueError("Overlap of the atomic basis functions must be symmetric.")
+    if level != "off" and not np.allclose(np.diagonal(olp_ab_ab, axis1=-2, axis2=-1), 1):
+        raise ValueError("Overlap of the atomic basis functions must be normalized.")
+    if not validation.is_normalized(coeff_ab_mo, olp_ab_ab, level):
+        raise ValueError(
+            "Molecular orbitals (and the corresponding transformation matrix) must be normalized."
+        )
+
+    if not np.all(occupations >= 0):
+        raise ValueError("Occupation numbers must be greater than or equal to 0.")
+    if np.any(occupations > 2):
+        print("WARNING: Atleast one occupation number exceeds 2.")
+
+    if ab_atom_indices.size != num_ab:
+        raise ValueError(
+            "Number of indices in `ab_atom_indices` must be equal to the number of atomic basis "
+            "functions."
+        )
+    if not (np.all(ab_atom_indices >= 0) and np.all(ab_atom_indices < num_atoms)):
+        raise ValueError(
+            "Atom indices of each atomic basis function must be greater than or equal to zero and "
+            " less than the number of atoms"
+        )
+
+    if atom_weights is not None:
+        _check_atom_weights(atom_weights, num_atoms, num_ab, level)
+
+    density = np.matmul(coeff_ab_mo * occupations[:, None, :], np.swapaxes(coeff_ab_mo, 1, 2))
+    output = _populations_from_density(
+        density, olp_ab_ab, num_atoms, ab_atom_indices, atom_weights=atom_weights
+    )
+
+    if not np.all(np.abs(np.sum(occupations, axis=1) - np.sum(output, axis=1)) < 1e-6):
+        print("WARNING: Population does not match up with the number of electrons.")
+
+    return output
+
+
+def _check_density_input(density, olp_ab_ab, num_atoms, ab_atom_indices, level, memory_budget=None):
+    """Check the inputs of the population analyses that use density matrices.
+
+    Parameters
+    ----------
+    density : {np.ndarray(K, K), np.ndarray(B, K, K)}
+        Density matrix (or a stack of density matrices) in the atomic orbital basis.
+    olp_ab_ab : {np.ndarray(K, K), np.ndarray(B, K, K)}
+        Overlap between atomic basis functions.
+    num_atoms : int
+        Number of atoms.
+    ab_atom_indices : np.ndarray(K,)
+        Index of the atom to which each atomic basis function belongs.
+    level : {"full", "cheap", "off"}
+        Level of the numerical checks.
+    memory_budget : {int, None}
+        Number of bytes that the temporary arrays of the numerical checks may use.
+        Default is to check the whole matrices at once.
+
+    Raises
+    ------
+    TypeError
+        If `density` is not a two- or three-dimensional numpy array of floats.
+        If `olp_ab_ab` is not a two- or three-dimensional numpy array of floats.
+        If `num_atoms` is not an integer.
+        If `ab_atom_indices` is not a a one-dimensional numpy array of ints.
+    ValueError
+        If `density` is not square or not symmetric.
+        If `olp_ab_ab` is not square, not symmetric, or does not have diagonals of 1.
+        If the shapes of `density`, `olp_ab_ab`, and `ab_atom_indices` are not consistent.
+        If `ab_atom_indices` contains indices that are less than 0 or greater than or equal to the
+        number of atoms.
 
     """
-    # pylint: disable=R0912,R0915
-    if not (
-        isinstance(coeff_ab_mo, np.ndarray) and coeff_ab_mo.ndim == 2 and coeff_ab_mo.dtype == float
-    ):
-        raise TypeError(
-            "Transformation matrix from atomic basis functions to molecular orbitals must be a "
-            "two-dimensional numpy array of floats."
-        )
+    if not (isinstance(density, np.ndarray) and density.ndim in [2, 3] and density.dtype == float):
+        raise TypeError("Density matrix must be a two- or three-dimensional numpy array of floats.")
     if not (
-        isinstance(occupations, np.ndarray)
-        and occupations.ndim == 1
-        and occupations.dtype in [float, int]
+        isinstance(olp_ab_ab, np.ndarray) and olp_ab_ab.ndim in [2, 3] and olp_ab_ab.dtype == float
     ):
         raise TypeError(
-            "Molecular orbital occupation numbers must be not a one-dimensional numpy array of "
-            "floats or ints."
-        )
-    if not (isinstance(olp_ab_ab, np.ndarray) and olp_ab_ab.ndim == 2 and olp_ab_ab.dtype == float):
-        raise TypeError(
-            "Overlap of the atomic basis functions must be a two-dimensional numpy array of floats."
+            "Overlap of the atomic basis functions must be a two- or three-dimensional numpy array "
+            "of floats."
         )
     if not isinstance(num_atoms, int):
         raise TypeError("Number of atoms must be an integer.")
@@ -179,35 +770,23 @@ def mulliken_populations(
             "integers with size equal to the number of atomic basis functions."
         )
 
-    if not olp_ab_ab.shape[0] == olp_ab_ab.shape[1]:
-        raise ValueError("Overlap matrix is not square.")
-    if not coeff_ab_mo.shape[0] == olp_ab_ab.shape[0]:
-        raise ValueError(
-            "Number of atomic orbitals in the transformation matrix and overlap matrix are not "
-            "equal."
-        )
-    if not coeff_ab_mo.shape[1] == occupations.size:
+    num_ab = density.shape[-1]
+    if density.shape[-2] != num_ab:
+        raise ValueError("Density matrix is not square.")
+    if olp_ab_ab.shape[-2:] != (num_ab, num_ab):
         raise ValueError(
-            "Number of molecular orbitals in the transformation matrix and occupations are not "
-            "equal."
+            "Number of atomic orbitals in the density matrix and overlap matrix are not equal."
         )
-
-    if not np.allclose(olp_ab_ab, olp_ab_ab.T):
+    if olp_ab_ab.ndim == 3 and olp_ab_ab.shape[:1] != density.shape[:-2]:
+        raise ValueError("Stack of overlap matrices must have one overlap for each density matrix.")
+    if not validation.is_hermitian(density, level, memory_budget=memory_budget):
+        raise ValueError("Density matrix must be symmetric.")
+    if not validation.is_hermitian(olp_ab_ab, level, memory_budget=memory_budget):
         raise ValueError("Overlap of the atomic basis functions must be symmetric.")
-    if not np.allclose(np.diag(olp_ab_ab), 1):
+    if level != "off" and not np.allclose(np.diagonal(olp_ab_ab, axis1=-2, axis2=-1), 1):
         raise ValueError("Overlap of the atomic basis functions must be normalized.")
-    if not np.allclose(np.diag(coeff_ab_mo.T.dot(olp_ab_ab).dot(coeff_ab_mo)), 1):
-        raise ValueError(
-            "Molecular orbitals (and the corresponding transformation matrix) must be normalized."
-        )
-
-    if not np.all(occupations >= 0):
-        raise ValueError("Occupation numbers must be greater than or equal to 0.")
-    if np.any(occupations > 2):
-        print("WARNING: Atleast one occupation number exceeds 2.")
 
-    # Check basis mapping
-    if ab_atom_indices.size != olp_ab_ab.shape[0]:
+    if ab_atom_indices.size != num_ab:
         raise ValueError(
             "Number of indices in `ab_atom_indices` must be equal to the number of atomic basis "
             "functions."
@@ -218,68 +797,234 @@ def mulliken_populations(
             " less than the number of atoms"
         )
 
-    if atom_weights is None:
-        num_ab = olp_ab_ab.shape[0]
-        # NOTE: creating this numpy array is quite memory intensive. Since nothing here will ever be
-        # a computational bottleneck, it will be smarter to use a for loop incorporating the next
-        # two parts (weights and density) together. However, we keep these two parts separated to
-        # make it easier to implement different weight paradigms.
-        atom_weights = np.zeros((num_atoms, num_ab, num_ab))
-        ab_atom_indices_separated = ab_atom_indices[None, :] == np.arange(num_atoms)[:, None]
-        atom_weights += (ab_atom_indices_separated.astype(float) * 0.5)[:, :, None]
-        atom_weights += (ab_atom_indices_separated.astype(float) * 0.5)[:, None, :]
-        # code above is equivalent to the following:
-        # atom_weights = {}
-        # for i in range(num_atoms):
-        #     weights = np.zeros(num_ab)
-        #     weights[ab_atom_indices == i] = 0.5
-        #     atom_weights[i] = weights[:, None] + weights[None, :]
-    else:
-        if not (
-            isinstance(atom_weights, np.ndarray)
-            and atom_weights.ndim == 3
-            and atom_weights.dtype in [float, int]
-        ):
-            raise TypeError(
-                "Orbital weights for the atoms must be a 3-dimensional numpy array of ints/floats."
-            )
-        if atom_weights.shape[0] != num_atoms:
-            raise ValueError(
-                "First dimension of the orbital weights for the atoms must be equal to the number "
-                "of atoms."
-            )
-        if atom_weights.shape[1:] != olp_ab_ab.shape:
-            raise ValueError(
-                "Second and third dimension of the orbital weights for the atoms must be equal to "
-                "the number of atomic orbitals."
-            )
-        if not np.allclose(atom_weights, np.swapaxes(atom_weights, 1, 2)):
-            raise ValueError(
-                "Orbital weights for each atom must be symmetric, i.e. `atom_weights` must be "
-                "symmetric with respect to the interchange of the second and third indices."
-            )
-        if not np.allclose(np.sum(atom_weights, axis=0), 1):
-            raise ValueError(
-                "Orbital weights for the atoms must be normalized, i.e. sum over the first "
-                "dimension must result in 1's."
-            )
-
-    # NOTE: the axis keyword used here for np.sum uses API introduced in numpy 1.7.0. This means
-    # that this function call will restrict the version of numpy used by this package.
-    density = (coeff_ab_mo * occupations[None, :]).dot(coeff_ab_mo.T)
-    raw_pops = (olp_ab_ab * density.T)[None, :, :] * atom_weights
-    output = np.sum(raw_pops, axis=(1, 2))
-    # code above is equivalent to the following:
-    # output = np.zeros(num_atoms)
-    # for atom_ind, weights in atom_weights.items():
-    #     output[atom_ind] = np.sum(olp_ab_ab * density.T * weights)
 
-    if not abs(np.sum(occupations) - np.sum(output)) < 1e-6:
-        print("WARNING: Population does not match up with the number of electrons.")
+@tracing.traced("mulliken_populations_density")
+def mulliken_populations_density(
+    density,
+    olp_ab_ab,
+    num_atoms,
+    ab_atom_indices,
+    atom_weights=None,
+    validate=None,
+    memory_budget=None,
+):
+    r"""Return the Mulliken populations of the given density matrix.
 
-    return output
+    .. math::
+
+        N_A = \sum_{jk} w_{jk}^A S_{jk} P_{kj}
+
+    Unlike `mulliken_populations`, the density matrix is given directly, so it does not need to
+    come from a set of molecular orbitals and their occupations (e.g. correlated densities that
+    are not idempotent).
+
+    Parameters
+    ----------
+    density : {np.ndarray(K, K), np.ndarray(B, K, K)}
+        Density matrix (or a stack of density matrices) in the atomic orbital basis.
+        Data type must be float.
+        `K` is the number of atomic orbitals and `B` is the number of density matrices.
+    olp_ab_ab : {np.ndarray(K, K), np.ndarray(B, K, K)}
+        Overlap between atomic basis functions.
+        If two-dimensional, the same overlap is used for all density matrices.
+        Data type must be floats.
+    num_atoms : int
+        Number of atoms.
+    ab_atom_indices : np.ndarray(K,)
+        Index of the atom to which each atomic basis function belongs.
+        Data type must be integers.
+    atom_weights : {np.ndarray(A, K, K), orbtools.weights.WeightScheme}
+        Weights of the atomic orbital pairs for the atoms.
+        Default is the Mulliken partitioning scheme.
+        See `mulliken_populations` for details.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks of the inputs.
+        Default is the level set in `orbtools.validation`.
+    memory_budget : {int, None}
+        Number of bytes that the temporary arrays may use.
+        If given, the matrices are reduced in blocks of rows so that only a few arrays of shape
+        (B, block size, K) are held at once.
+        Default is the budget set in `orbtools.blocking`. Memory-mapped inputs (see
+        `orbtools.blocking.load_array`) are always read in blocks.
+
+    Returns
+    -------
+    population : {np.ndarray(A,), np.ndarray(B, A)}
+        Number of electrons associated with each atom (for each density matrix).
+        `A` is the number of atoms.
+
+    Raises
+    ------
+    TypeError
+        If `density` is not a two- or three-dimensional numpy array of floats.
+        If `olp_ab_ab` is not a two- or three-dimensional numpy array of floats.
+        If `num_atoms` is not an integer.
+        If `ab_atom_indices` is not a a one-dimensional numpy array of ints.
+    ValueError
+        If `density` is not square or not symmetric.
+        If `olp_ab_ab` is not square, not symmetric, or does not have diagonals of 1.
+        If the shapes of `density`, `olp_ab_ab`, and `ab_atom_indices` are not consistent.
+        If `ab_atom_indices` contains indices that are less than 0 or greater than or equal to the
+        number of atoms.
+
+    See Also
+    --------
+    orbtools.mulliken.mulliken_populations
+
+    """
+    level = validation.resolve_level(validate)
+    memory_budget = resolve_memory_budget(memory_budget, density, olp_ab_ab)
+    with tracing.span("mulliken_populations_density.validate"):
+        _check_density_input(
+            density, olp_ab_ab, num_atoms, ab_atom_indices, level, memory_budget=memory_budget
+        )
+        if atom_weights is not None:
+            _check_atom_weights(atom_weights, num_atoms, density.shape[-1], level)
+    return _populations_from_density(
+        density,
+        olp_ab_ab,
+        num_atoms,
+        ab_atom_indices,
+        atom_weights=atom_weights,
+        memory_budget=memory_budget,
+    )
+
+
+def overlap_populations(
+    density, olp_ab_ab, num_atoms, ab_atom_indices, drop_tol=None, validate=None
+):
+    r"""Return the Mulliken overlap populations of each pair of atoms.
+
+    .. math::
+
+        O_{AB} = \sum_{j \in A} \sum_{k \in B} P_{jk} S_{jk}
+
+    The diagonal entries are the net populations of the atoms, the off-diagonal entries are the
+    overlap populations of the pairs of atoms (i.e. half of the Mulliken bond order), and the sum of
+    each row is the Mulliken population of the atom.
+
+    Parameters
+    ----------
+    density : {np.ndarray(K, K), np.ndarray(B, K, K)}
+        Density matrix (or a stack of density matrices).
+        Any basis set can be used (e.g. atomic basis functions, QUAO's or QUAMBO's) as long as the
+        overlap and the atom indices are given for the same basis set.
+        Data type must be float.
+    olp_ab_ab : {np.ndarray(K, K), np.ndarray(B, K, K)}
+        Overlap between the basis functions.
+        If two-dimensional, the same overlap is used for all density matrices.
+        Data type must be floats.
+    num_atoms : int
+        Number of atoms.
+    ab_atom_indices : np.ndarray(K,)
+        Index of the atom to which each basis function belongs.
+        Data type must be integers.
+    drop_tol : {float, None}
+        Entries whose absolute values are less than or equal to the tolerance are dropped from a
+        sparse output.
+        Default returns a dense array.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks of the inputs.
+        Default is the level set in `orbtools.validation`.
+
+    Returns
+    -------
+    overlap_populations : {np.ndarray(A, A), np.ndarray(B, A, A), scipy.sparse.csr_matrix, list}
+        Overlap populations of each pair of atoms (for each density matrix).
+        If `drop_tol` is given, a sparse matrix (or a list of sparse matrices for a stack).
+
+    Raises
+    ------
+    TypeError
+        If any of the inputs is not of the correct type (see `mulliken_populations_density`).
+        If `drop_tol` is not an integer or a float (or None).
+    ValueError
+        If any of the inputs is not of the correct shape or value (see
+        `mulliken_populations_density`).
+        If `drop_tol` is negative.
+
+    """
+    level = validation.resolve_level(validate)
+    _check_density_input(density, olp_ab_ab, num_atoms, ab_atom_indices, level)
+    # NOTE: density and overlap are symmetric, so S_{jk} P_{kj} = S_{jk} P_{jk}
+    output = _sum_by_atom_pairs(
+        density * olp_ab_ab,
+        ab_atom_indices,
+        num_atoms,
+        memory_budget=resolve_memory_budget(None, density, olp_ab_ab),
+    )
+    return _drop_small(output, drop_tol)
+
+
+def mayer_bond_orders(density, olp_ab_ab, num_atoms, ab_atom_indices, drop_tol=None, validate=None):
+    r"""Return the Mayer bond orders of each pair of atoms.
+
+    .. math::
+
+        B_{AB} = \sum_{j \in A} \sum_{k \in B} (PS)_{jk} (PS)_{kj}
+
+    The diagonal entries are the corresponding sums over the basis functions of a single atom.
 
+    Parameters
+    ----------
+    density : {np.ndarray(K, K), np.ndarray(B, K, K)}
+        Total (spin-summed) density matrix (or a stack of density matrices) of a closed shell
+        system.
+        Any basis set can be used (e.g. atomic basis functions, QUAO's or QUAMBO's) as long as the
+        overlap and the atom indices are given for the same basis set.
+        Data type must be float.
+    olp_ab_ab : {np.ndarray(K, K), np.ndarray(B, K, K)}
+        Overlap between the basis functions.
+        If two-dimensional, the same overlap is used for all density matrices.
+        Data type must be floats.
+    num_atoms : int
+        Number of atoms.
+    ab_atom_indices : np.ndarray(K,)
+        Index of the atom to which each basis function belongs.
+        Data type must be integers.
+    drop_tol : {float, None}
+        Entries whose absolute values are less than or equal to the tolerance are dropped from a
+        sparse output.
+        Default returns a dense array.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks of the inputs.
+        Default is the level set in `orbtools.validation`.
+
+    Returns
+    -------
+    bond_orders : {np.ndarray(A, A), np.ndarray(B, A, A), scipy.sparse.csr_matrix, list}
+        Mayer bond orders of each pair of atoms (for each density matrix).
+        If `drop_tol` is given, a sparse matrix (or a list of sparse matrices for a stack).
+
+    Raises
+    ------
+    TypeError
+        If any of the inputs is not of the correct type (see `mulliken_populations_density`).
+        If `drop_tol` is not an integer or a float (or None).
+    ValueError
+        If any of the inputs is not of the correct shape or value (see
+        `mulliken_populations_density`).
+        If `drop_tol` is negative.
 
+    References
+    ----------
+    .. [1] Mayer, I. Charge, bond order and valence in the ab initio SCF theory. Chem. Phys. Lett.
+        1983, 97, 270-274.
+
+    """
+    level = validation.resolve_level(validate)
+    _check_density_input(density, olp_ab_ab, num_atoms, ab_atom_indices, level)
+    density_olp = np.matmul(density, olp_ab_ab)
+    output = _sum_by_atom_pairs(
+        density_olp * np.swapaxes(density_olp, -1, -2),
+        ab_atom_indices,
+        num_atoms,
+        memory_budget=resolve_memory_budget(None, density, olp_ab_ab),
+    )
+    return _drop_small(output, drop_tol)
+
+
+@tracing.traced("mulliken_populations_newbasis")
 def mulliken_populations_newbasis(
     coeff_ab_mo,
     occupations,
@@ -288,6 +1033,7 @@ def mulliken_populations_newbasis(
     coeff_ab_new,
     new_atom_indices,
     new_atom_weights=None,
+    validate=None,
 ):
     r"""Return the Mulliken populations of the given system in a new basis set.
 
@@ -326,7 +1072,7 @@ def mulliken_populations_newbasis(
         Index of the atom to which each of the new basis function belongs.
         Data type must be integers.
         `L` is the number of atomic orbitals.
-    new_atom_weights : np.ndarray(A, L, L)
+    new_atom_weights : {np.ndarray(A, L, L), orbtools.weights.WeightScheme}
         Weights of the pair of new basis functions for the atoms. In other words, this weight
         controls the amount of electrons associated with an new basis function pair that will be
         attributed to an atom.
@@ -334,6 +1080,9 @@ def mulliken_populations_newbasis(
         Default is the Mulliken partitioning scheme where two basis functions that belong to the
         given atom is 1, only one basis function that belong to the given atoms is 0.5, and no basis
         functions is 0.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks of the inputs.
+        Default is the level set in `orbtools.validation`.
 
     Returns
     -------
@@ -347,9 +1096,18 @@ def mulliken_populations_newbasis(
     orbtools.mulliken.mulliken_populations
 
     """
-    olp_new_new = coeff_ab_new.T.dot(olp_ab_ab).dot(coeff_ab_new)
-    olp_new_mo = coeff_ab_new.T.dot(olp_ab_ab).dot(coeff_ab_mo)
-    coeff_new_mo = project(olp_new_new, olp_new_mo)
+    num_ab, num_new = coeff_ab_new.shape
+    with tracing.span(
+        "mulliken_populations_newbasis.overlaps",
+        flops=tracing.matmul_flops(num_new, num_ab, num_ab)
+        + tracing.matmul_flops(num_new, num_ab, num_new + coeff_ab_mo.shape[1]),
+        coeff_ab_new=coeff_ab_new,
+        olp_ab_ab=olp_ab_ab,
+    ):
+        olp_new_ab = coeff_ab_new.T.dot(olp_ab_ab)
+        olp_new_new = olp_new_ab.dot(coeff_ab_new)
+        olp_new_mo = olp_new_ab.dot(coeff_ab_mo)
+    coeff_new_mo = project(olp_new_new, olp_new_mo, validate=validate)
     return mulliken_populations(
         coeff_new_mo,
         occupations,
@@ -357,11 +1115,19 @@ def mulliken_populations_newbasis(
         num_atoms,
         new_atom_indices,
         atom_weights=new_atom_weights,
+        validate=validate,
     )
 
 
+@tracing.traced("lowdin_populations")
 def lowdin_populations(
-    coeff_ab_mo, occupations, olp_ab_ab, num_atoms, ab_atom_indices, atom_weights=None
+    coeff_ab_mo,
+    occupations,
+    olp_ab_ab,
+    num_atoms,
+    ab_atom_indices,
+    atom_weights=None,
+    validate=None,
 ):
     r"""Return the Lowdin populations of the given molecular orbitals in atomic orbital basis set.
 
@@ -396,13 +1162,16 @@ def lowdin_populations(
         Index of the atom to which each atomic basis function belongs.
         Data type must be integers.
         `K` is the number of atomic orbitals.
-    atom_weights : np.ndarray(A, K, K)
+    atom_weights : {np.ndarray(A, K, K), orbtools.weights.WeightScheme}
         Weights of the atomic orbital pairs for the atoms. In other words, this weight controls the
         amount of electrons associated with an atomic orbital pair that will be attributed to an
         atom.
         `A` is the number of atoms and `K` is the number of atomic orbitals.
         Default is the Mulliken partitioning scheme where two orbitals that belong to the given atom
         is 1, only one orbital that belong to the given atoms is 0.5, and no orbitals is 0.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks of the inputs.
+        Default is the level set in `orbtools.validation`.
 
     Returns
     -------
@@ -412,13 +1181,200 @@ def lowdin_populations(
         `ab_atom_indices`.
 
     """
-    coeff_ab_oab = power_symmetric(olp_ab_ab, -0.5)
-    return mulliken_populations_newbasis(
-        coeff_ab_mo,
-        occupations,
-        olp_ab_ab,
+    level = validation.resolve_level(validate)
+    with tracing.span("lowdin_populations.validate"):
+        _check_mo_input(coeff_ab_mo, occupations, olp_ab_ab, num_atoms, ab_atom_indices, level)
+        if atom_weights is not None:
+            _check_atom_weights(atom_weights, num_atoms, olp_ab_ab.shape[0], level)
+
+    # Molecular orbitals in the symmetrically orthogonalized basis, S^{1/2} C, from a single
+    # eigendecomposition of the overlap. The overlap in this basis is the identity, so there is no
+    # need to project the molecular orbitals onto the new basis.
+    coeff_oab_mo = power_symmetric(olp_ab_ab, 0.5, validate=level).dot(coeff_ab_mo)
+    if atom_weights is None:
+        # diagonal of the density matrix in the orthogonalized basis, S^{1/2} P S^{1/2}
+        raw_pops = (coeff_oab_mo ** 2).dot(occupations)
+        output = sum_by_atom(raw_pops, ab_atom_indices, num_atoms)
+    else:
+        density_oab = (coeff_oab_mo * occupations[None, :]).dot(coeff_oab_mo.T)
+        output = _populations_from_density(
+            density_oab,
+            np.identity(olp_ab_ab.shape[0]),
+            num_atoms,
+            ab_atom_indices,
+            atom_weights=atom_weights,
+        )
+
+    if not abs(np.sum(occupations) - np.sum(output)) < 1e-6:
+        print("WARNING: Population does not match up with the number of electrons.")
+
+    return output
+
+
+@tracing.traced("lowdin_populations_density")
+def lowdin_populations_density(
+    density, olp_ab_ab, num_atoms, ab_atom_indices, atom_weights=None, validate=None
+):
+    r"""Return the Lowdin populations of the given density matrix in atomic orbital basis set.
+
+    The density matrix is transformed to the symmetrically orthogonalized basis,
+
+    .. math::
+
+        P^{\mathrm{OAB}} = S^{1/2} P S^{1/2}
+
+    and the Mulliken populations are computed in this basis.
+
+    Parameters
+    ----------
+    density : {np.ndarray(K, K), np.ndarray(B, K, K)}
+        Density matrix (or a stack of density matrices) in the atomic orbital basis.
+        Data type must be float.
+        `K` is the number of atomic orbitals and `B` is the number of density matrices.
+    olp_ab_ab : {np.ndarray(K, K), np.ndarray(B, K, K)}
+        Overlap between atomic basis functions.
+        If two-dimensional, the same overlap is used for all density matrices.
+        Data type must be floats.
+    num_atoms : int
+        Number of atoms.
+    ab_atom_indices : np.ndarray(K,)
+        Index of the atom to which each atomic basis function belongs.
+        Data type must be integers.
+    atom_weights : {np.ndarray(A, K, K), orbtools.weights.WeightScheme}
+        Weights of the orthogonalized atomic orbital pairs for the atoms.
+        Default is the Mulliken partitioning scheme.
+        See `mulliken_populations` for details.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks of the inputs.
+        Default is the level set in `orbtools.validation`.
+
+    Returns
+    -------
+    population : {np.ndarray(A,), np.ndarray(B, A)}
+        Number of electrons associated with each atom (for each density matrix).
+        `A` is the number of atoms.
+
+    See Also
+    --------
+    orbtools.mulliken.lowdin_populations
+    orbtools.mulliken.mulliken_populations_density
+
+    """
+    level = validation.resolve_level(validate)
+    with tracing.span("lowdin_populations_density.validate"):
+        _check_density_input(density, olp_ab_ab, num_atoms, ab_atom_indices, level)
+        if atom_weights is not None:
+            _check_atom_weights(atom_weights, num_atoms, density.shape[-1], level)
+    olp_sqrt = power_symmetric(olp_ab_ab, 0.5, validate=level)
+    if atom_weights is None:
+        # only the diagonal of S^{1/2} P S^{1/2} is needed
+        raw_pops = np.einsum("...ij,...ji->...i", np.matmul(olp_sqrt, density), olp_sqrt)
+        return sum_by_atom(raw_pops, ab_atom_indices, num_atoms)
+    density_oab = np.matmul(np.matmul(olp_sqrt, density), olp_sqrt)
+    return _populations_from_density(
+        density_oab,
+        np.identity(density.shape[-1]),
         num_atoms,
-        coeff_ab_oab,
         ab_atom_indices,
-        new_atom_weights=atom_weights,
+        atom_weights=atom_weights,
     )
+
+
+def mulliken_orbital_contributions(
+    coeff_ab_mo, olp_ab_ab, num_atoms, ab_atom_indices, validate=None
+):
+    r"""Return the Mulliken contributions of each atom to each molecular orbital.
+
+    .. math::
+
+        Q_{ai} = \sum_{j \in a} (S C)_{ji} C_{ji}
+
+    Mulliken populations of any occupation numbers are then obtained with a matrix product, i.e.
+    `Q.dot(occupations)`, where `occupations` can also be a two-dimensional array whose columns are
+    different sets of occupation numbers.
+
+    Parameters
+    ----------
+    coeff_ab_mo : np.ndarray(K, M)
+        Transformation matrix from the atomic basis to molecular orbitals.
+        Data type must be float.
+        `K` is the number of atomic orbitals and `M` is the number of molecular orbitals.
+    olp_ab_ab : np.ndarray(K, K)
+        Overlap between atomic basis functions.
+        Data type must be floats.
+    num_atoms : int
+        Number of atoms.
+    ab_atom_indices : np.ndarray(K,)
+        Index of the atom to which each atomic basis function belongs.
+        Data type must be integers.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks of the inputs.
+        Default is the level set in `orbtools.validation`.
+
+    Returns
+    -------
+    contributions : np.ndarray(A, M)
+        Contribution of each atom (rows) to each molecular orbital (columns).
+        Each column sums to 1 for normalized molecular orbitals.
+
+    Raises
+    ------
+    TypeError
+        If any of the inputs is not of the correct type (see `mulliken_populations`).
+    ValueError
+        If any of the inputs is not of the correct shape or value (see `mulliken_populations`).
+
+    """
+    level = validation.resolve_level(validate)
+    _check_mo_input(coeff_ab_mo, None, olp_ab_ab, num_atoms, ab_atom_indices, level)
+    raw_contributions = olp_ab_ab.dot(coeff_ab_mo) * coeff_ab_mo
+    return sum_by_atom(raw_contributions.T, ab_atom_indices, num_atoms).T
+
+
+def lowdin_orbital_contributions(coeff_ab_mo, olp_ab_ab, num_atoms, ab_atom_indices, validate=None):
+    r"""Return the Lowdin contributions of each atom to each molecular orbital.
+
+    .. math::
+
+        Q_{ai} = \sum_{j \in a} (S^{1/2} C)_{ji}^2
+
+    Lowdin populations of any occupation numbers are then obtained with a matrix product, i.e.
+    `Q.dot(occupations)`, where `occupations` can also be a two-dimensional array whose columns are
+    different sets of occupation numbers.
+
+    Parameters
+    ----------
+    coeff_ab_mo : np.ndarray(K, M)
+        Transformation matrix from the atomic basis to molecular orbitals.
+        Data type must be float.
+        `K` is the number of atomic orbitals and `M` is the number of molecular orbitals.
+    olp_ab_ab : np.ndarray(K, K)
+        Overlap between atomic basis functions.
+        Data type must be floats.
+    num_atoms : int
+        Number of atoms.
+    ab_atom_indices : np.ndarray(K,)
+        Index of the atom to which each atomic basis function belongs.
+        Data type must be integers.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks of the inputs.
+        Default is the level set in `orbtools.validation`.
+
+    Returns
+    -------
+    contributions : np.ndarray(A, M)
+        Contribution of each atom (rows) to each molecular orbital (columns).
+        Each column sums to 1 for normalized molecular orbitals.
+
+    Raises
+    ------
+    TypeError
+        If any of the inputs is not of the correct type (see `lowdin_populations`).
+    ValueError
+        If any of the inputs is not of the correct shape or value (see `lowdin_populations`).
+
+    """
+    level = validation.resolve_level(validate)
+    _check_mo_input(coeff_ab_mo, None, olp_ab_ab, num_atoms, ab_atom_indices, level)
+    coeff_oab_mo = power_symmetric(olp_ab_ab, 0.5, validate=level).dot(coeff_ab_mo)
+    return sum_by_atom((coeff_oab_mo ** 2).T, ab_atom_indices, num_atoms).T
@@ -1,36 +1,156 @@
 """Tools for matrix decomposition and power."""
 import numpy as np
+from orbtools import tracing, validation
+from orbtools.cache import factorizations
+import scipy.linalg
+import scipy.sparse.linalg
 
+EIGH_DRIVERS = ("numpy", "ev", "evd", "evr", "evx")
+SVD_DRIVERS = ("numpy", "gesdd", "gesvd", "gram")
+SUBSET_MIN_SIZE = 200
+POWER_METHODS = ("eigh", "newton_schulz")
+NEWTON_SCHULZ_POWERS = (0.5, -0.5, -1)
+NEWTON_SCHULZ_MAX_CONDITION = 1e6
 
-def eigh(matrix, threshold=1e-9):
+
+def _check_num_top(num_top):
+    """Check the number of the largest eigenvalues (or singular values) that are requested.
+
+    Parameters
+    ----------
+    num_top : {int, None}
+        Number of the largest eigenvalues (or singular values).
+
+    Raises
+    ------
+    TypeError
+        If `num_top` is not an integer (or None).
+    ValueError
+        If `num_top` is negative.
+
+    """
+    if num_top is None:
+        return
+    if not isinstance(num_top, (int, np.integer)) or isinstance(num_top, bool):
+        raise TypeError("Number of the largest values must be an integer (or None).")
+    if num_top < 0:
+        raise ValueError("Number of the largest values must be greater than or equal to zero.")
+
+
+def _select_eigh_driver(size, num_top, overwrite):
+    """Return the driver used to decompose a Hermitian matrix of the given size.
+
+    Parameters
+    ----------
+    size : int
+        Number of rows (and columns) of the matrix.
+    num_top : {int, None}
+        Number of the largest eigenvalues that are needed.
+        None if all eigenvalues are needed.
+    overwrite : bool
+        Whether the matrix can be overwritten.
+
+    Returns
+    -------
+    driver : str
+        One of "numpy", "evd", or "evr".
+
+    """
+    if num_top is not None and num_top < size and size >= SUBSET_MIN_SIZE:
+        # MRRR computes a subset of the eigenpairs at a fraction of the cost
+        return "evr"
+    if overwrite:
+        # same algorithm as numpy.linalg.eigh (divide and conquer) without copying the matrix
+        return "evd"
+    return "numpy"
+
+
+def _kept_first(kept_indices):
+    """Return the order that moves the kept entries of each row to the front.
+
+    Parameters
+    ----------
+    kept_indices : np.ndarray(..., N)
+        Boolean indices of the entries that are kept.
+
+    Returns
+    -------
+    order : np.ndarray(..., K)
+        Indices of the kept entries of each row followed by the indices of the discarded entries.
+        :math:`K` is the largest number of kept entries in a row.
+    mask : np.ndarray(..., K)
+        Boolean indices of the kept entries in the reordered rows.
+
+    """
+    order = np.argsort(~kept_indices, axis=-1, kind="stable")
+    mask = np.take_along_axis(kept_indices, order, axis=-1)
+    num_kept = np.max(np.sum(kept_indices, axis=-1), initial=0)
+    return order[..., :num_kept], mask[..., :num_kept]
+
+
+@tracing.traced(
+    "eigh",
+    flops=lambda matrix, *args, **kwargs: tracing.eigh_flops(matrix.shape[-1])
+    * int(np.prod(matrix.shape[:-2])),
+)
+def eigh(matrix, threshold=1e-9, validate=None, num_top=None, driver=None, overwrite=False):
     """Return the eigenvalues and eigenvectors of a Hermitian matrix.
 
     Eigenvalues whose absolute values are less than the threshold are discarded as well as the
     corresponding eigenvectors.
 
+    Stacks of matrices are decomposed with a single call to `numpy.linalg.eigh`. Since the number
+    of discarded eigenvalues can differ between the matrices, the eigenvalues and eigenvectors of a
+    stack are padded with zeros and returned with a mask of the kept eigenvalues.
+
     Parameters
     ----------
-    matrix : np.ndarray(N, N)
-        Square Hermitian matrix.
+    matrix : np.ndarray(..., N, N)
+        Square Hermitian matrix or a stack of square Hermitian matrices.
     threshold : {1e-9, float}
         Eigenvalues (and corresponding eigenvectors) below this threshold are discarded.
+    validate : {"full", "cheap", "off", None}
+        Level of the check that the matrix is Hermitian.
+        Default is the level set in `orbtools.validation`.
+    num_top : {int, None}
+        Number of the largest eigenvalues (and corresponding eigenvectors) that are computed.
+        Default computes all eigenvalues.
+    driver : {"numpy", "ev", "evd", "evr", "evx", None}
+        Algorithm used to decompose the matrix.
+        "numpy" uses `numpy.linalg.eigh`, and the others use the LAPACK drivers of
+        `scipy.linalg.eigh` (QR iteration, divide and conquer, MRRR, and bisection with inverse
+        iteration, respectively). Only "evr" and "evx" compute a subset of the eigenvalues; the
+        others compute all eigenvalues and discard the ones that are not needed.
+        Default is "evr" if a subset of the eigenvalues of a matrix with at least
+        `SUBSET_MIN_SIZE` rows is requested, "evd" if the matrix can be overwritten, and "numpy"
+        otherwise.
+    overwrite : {False, bool}
+        Whether the matrix can be overwritten to avoid a copy (not supported by "numpy").
+        If True, the content of the matrix is undefined after the decomposition.
 
     Returns
     -------
-    eigval : np.ndarray(K,)
+    eigval : np.ndarray(..., K)
         Eigenvalues sorted in decreasing order.
-    eigvec : np.ndarray(N,K)
+    eigvec : np.ndarray(..., N, K)
         Matrix where the columns are the corresponding eigenvectors to the eigval.
+    mask : np.ndarray(..., K)
+        Boolean indices of the eigenvalues that are kept (the others are padding).
+        Only returned for a stack of matrices.
 
     Raises
     ------
     TypeError
-        If `matrix` is not a two-dimensional numpy array.
+        If `matrix` is not a numpy array with at least two dimensions.
         If `threshold` is not an integer or a float.
+        If `num_top` is not an integer (or None).
     ValueError
         If `matrix` is not a square matrix.
         If `matrix` is not Hermitian.
         If `threshold` is negative.
+        If `validate` is not one of "full", "cheap", "off", or None.
+        If `num_top` is negative.
+        If `driver` is not supported (drivers other than "numpy" do not support stacks).
 
     Warns
     -----
@@ -39,22 +159,58 @@ def eigh(matrix, threshold=1e-9):
 
     Note
     ----
-    This code mainly uses numpy.eigh
+    This code mainly uses numpy.eigh and scipy.linalg.eigh
+    Decompositions are stored in `orbtools.cache.factorizations`, so that the same matrix is not
+    decomposed more than once. Warnings are only printed when the matrix is decomposed. Stacks of
+    matrices are not stored.
 
     """
-    if not (isinstance(matrix, np.ndarray) and matrix.ndim == 2):
-        raise TypeError("Given matrix must be a two-dimensional numpy array.")
-    if matrix.shape[0] != matrix.shape[1]:
+    if not (isinstance(matrix, np.ndarray) and matrix.ndim >= 2):
+        raise TypeError("Given matrix must be a numpy array with at least two dimensions.")
+    if matrix.shape[-2] != matrix.shape[-1]:
         raise ValueError("Given matrix must be square.")
-    if not np.allclose(matrix.conjugate().T, matrix):
+    if not validation.is_hermitian(matrix, validation.resolve_level(validate)):
         raise ValueError("Given matrix must be Hermitian.")
     if not isinstance(threshold, (int, float)):
         raise TypeError("Given threshold must be an integer or a float.")
     if threshold < 0:
         raise ValueError("Given threshold must be positive.")
-
-    eigval, eigvec = np.linalg.eigh(matrix)
-    # NOTE: it is assumed that the np.linalg.eigh sorts the eigenvalues in increasing order.
+    _check_num_top(num_top)
+    if driver is not None and driver not in EIGH_DRIVERS:
+        raise ValueError("Driver must be one of {0} (or None).".format(", ".join(EIGH_DRIVERS)))
+    is_stack = matrix.ndim > 2
+    if is_stack and driver not in [None, "numpy"]:
+        raise ValueError("Only the numpy driver supports stacks of matrices.")
+    size = matrix.shape[-1]
+    if num_top is not None and num_top >= size:
+        num_top = None
+
+    key = None if is_stack else factorizations.key(matrix, threshold)
+    name = "eigh" if num_top is None else ("eigh", num_top)
+    cached = factorizations.lookup(key, name)
+    if cached is not None:
+        return cached
+
+    if driver is None:
+        driver = "numpy" if is_stack else _select_eigh_driver(size, num_top, overwrite)
+    if driver == "numpy":
+        eigval, eigvec = np.linalg.eigh(matrix)
+    else:
+        subset = None
+        if num_top and driver in ["evr", "evx"]:
+            subset = [size - num_top, size - 1]
+        eigval, eigvec = scipy.linalg.eigh(
+            matrix,
+            driver=driver,
+            subset_by_index=subset,
+            overwrite_a=overwrite,
+            check_finite=False,
+        )
+    # NOTE: it is assumed that the eigh sorts the eigenvalues in increasing order.
+    if num_top is not None:
+        num_computed = eigval.shape[-1]
+        eigval = eigval[..., num_computed - num_top :]
+        eigvec = eigvec[..., num_computed - num_top :]
 
     neg_indices = eigval < -threshold
     if np.any(neg_indices):
@@ -70,37 +226,123 @@ def eigh(matrix, threshold=1e-9):
             "{2}".format(np.sum(~kept_indices), threshold, eigval[~kept_indices])
         )
 
-    eigval, eigvec = eigval[kept_indices], eigvec[:, kept_indices]
-    return eigval[::-1], eigvec[:, ::-1]
+    if is_stack:
+        order, mask = _kept_first(kept_indices[..., ::-1])
+        eigval = np.where(mask, np.take_along_axis(eigval[..., ::-1], order, axis=-1), 0)
+        eigvec = np.take_along_axis(eigvec[..., ::-1], order[..., None, :], axis=-1)
+        return eigval, np.where(mask[..., None, :], eigvec, 0), mask
+
+    eigval, eigvec = eigval[kept_indices][::-1], eigvec[:, kept_indices][:, ::-1]
+    factorizations.store(key, name, (eigval, eigvec))
+    return eigval, eigvec
 
 
-def svd(matrix, threshold=1e-9):
+def _svd_gram(matrix, num_top, overwrite):
+    r"""Return the largest singular values and singular vectors from the Gram matrix.
+
+    The eigenvalues of the smaller of :math:`A A^\dagger` and :math:`A^\dagger A` are the
+    squares of the singular values of :math:`A`.
+
+    Parameters
+    ----------
+    matrix : np.ndarray(N, M)
+        Matrix.
+    num_top : int
+        Number of the largest singular values (and corresponding singular vectors) that are
+        computed.
+    overwrite : bool
+        Whether the Gram matrix can be overwritten.
+
+    Returns
+    -------
+    decomposition : {tuple of np.ndarray, None}
+        Left singular matrix, np.ndarray(N, num_top), singular values sorted in decreasing order,
+        np.ndarray(num_top,), and right singular matrix, np.ndarray(num_top, M).
+        None if the singular values are too small to be resolved from the Gram matrix.
+
+    """
+    # pylint: disable=C0103
+    num_row, num_col = matrix.shape
+    size = min(num_row, num_col)
+    gram = matrix.dot(matrix.T.conjugate()) if num_row <= num_col else matrix.T.conjugate() @ matrix
+    eigval, eigvec = scipy.linalg.eigh(
+        gram,
+        driver="evr",
+        subset_by_index=[size - num_top, size - 1],
+        overwrite_a=overwrite,
+        check_finite=False,
+    )
+    eigval, eigvec = eigval[::-1], eigvec[:, ::-1]
+    # NOTE: squaring the singular values squares the condition number, so the singular values that
+    # are less than sqrt(eps) times the largest singular value cannot be resolved
+    if eigval[-1] <= np.sqrt(np.finfo(float).eps) * max(eigval[0], 0):
+        return None
+    sigma = np.sqrt(eigval)
+    if num_row <= num_col:
+        return eigvec, sigma, eigvec.T.conjugate().dot(matrix) / sigma[:, None]
+    return matrix.dot(eigvec) / sigma, sigma, eigvec.T.conjugate()
+
+
+@tracing.traced(
+    "svd",
+    flops=lambda matrix, *args, **kwargs: tracing.svd_flops(*matrix.shape[-2:])
+    * int(np.prod(matrix.shape[:-2])),
+)
+def svd(matrix, threshold=1e-9, num_top=None, driver=None, overwrite=False):
     """Return the singular values and singular vectors of the given matrix.
 
     Singular values whose absolute values are less than the threshold are discarded as well as the
     corresponding singular vectors.
 
+    Stacks of matrices are decomposed with a single call to `numpy.linalg.svd`. Since the number of
+    discarded singular values can differ between the matrices, the singular values and singular
+    vectors of a stack are padded with zeros and returned with a mask of the kept singular values.
 
     Parameters
     ----------
-    matrix : np.ndarray(N, M)
-        Matrix.
+    matrix : np.ndarray(..., N, M)
+        Matrix or a stack of matrices.
     threshold : {1e-9, float}
         Singular values (and corresponding singular vectors) below this threshold are discarded.
+    num_top : {int, None}
+        Number of the largest singular values (and corresponding singular vectors) that are
+        computed.
+        Default computes all singular values.
+    driver : {"numpy", "gesdd", "gesvd", "gram", None}
+        Algorithm used to decompose the matrix.
+        "numpy" uses `numpy.linalg.svd`, "gesdd" and "gesvd" use the LAPACK drivers of
+        `scipy.linalg.svd` (divide and conquer and QR iteration, respectively), and "gram" computes
+        the largest eigenpairs of the smaller Gram matrix with the MRRR driver ("evr").
+        If the singular values requested from "gram" are too small to be resolved, "numpy" is used
+        instead.
+        Default is "gram" if a subset of the singular values of a matrix with at least
+        `SUBSET_MIN_SIZE` rows and columns is requested, "gesdd" if the matrix can be overwritten,
+        and "numpy" otherwise.
+    overwrite : {False, bool}
+        Whether the matrix can be overwritten to avoid a copy (only supported by "gesdd" and
+        "gesvd").
+        If True, the content of the matrix is undefined after the decomposition.
 
     Returns
     -------
-    u : np.ndarray(N, K)
+    u : np.ndarray(..., N, K)
         Left singular matrix.
-    sigma : np.ndarray(K,)
+    sigma : np.ndarray(..., K)
         Singular values sorted in decreasing order.
-    vdagger : np.ndarray(K, M)
+    vdagger : np.ndarray(..., K, M)
         Right singular matrix.
+    mask : np.ndarray(..., K)
+        Boolean indices of the singular values that are kept (the others are padding).
+        Only returned for a stack of matrices.
 
     Raises
     ------
     TypeError
-        If `matrix` is not a two-dimensional numpy array.
+        If `matrix` is not a numpy array with at least two dimensions.
+        If `num_top` is not an integer (or None).
+    ValueError
+        If `num_top` is negative.
+        If `driver` is not supported (drivers other than "numpy" do not support stacks).
 
     Warns
     -----
@@ -108,16 +350,84 @@ def svd(matrix, threshold=1e-9):
 
     Note
     ----
-    This code uses numpy.linalg.svd
+    This code uses numpy.linalg.svd and scipy.linalg
 
     """
     # pylint: disable=C0103
-    if not (isinstance(matrix, np.ndarray) and matrix.ndim == 2):
-        raise TypeError("Given matrix must be a two-dimensional numpy array.")
+    if not (isinstance(matrix, np.ndarray) and matrix.ndim >= 2):
+        raise TypeError("Given matrix must be a numpy array with at least two dimensions.")
+    _check_num_top(num_top)
+    if driver is not None and driver not in SVD_DRIVERS:
+        raise ValueError("Driver must be one of {0} (or None).".format(", ".join(SVD_DRIVERS)))
+    if matrix.ndim > 2 and driver not in [None, "numpy"]:
+        raise ValueError("Only the numpy driver supports stacks of matrices.")
+    size = min(matrix.shape[-2:])
+    if num_top is not None and num_top >= size:
+        num_top = None
+
+    if driver is None:
+        if matrix.ndim > 2:
+            driver = "numpy"
+        elif num_top and size >= SUBSET_MIN_SIZE:
+            driver = "gram"
+        elif overwrite:
+            driver = "gesdd"
+        else:
+            driver = "numpy"
+    decomposition = None
+    if driver == "gram" and num_top:
+        decomposition = _svd_gram(matrix, num_top, overwrite)
+    if decomposition is not None:
+        u, sigma, vdagger = decomposition
+    elif driver in ["gesdd", "gesvd"]:
+        u, sigma, vdagger = scipy.linalg.svd(
+            matrix,
+            full_matrices=False,
+            overwrite_a=overwrite,
+            check_finite=False,
+            lapack_driver=driver,
+        )
+    else:
+        u, sigma, vdagger = np.linalg.svd(matrix, full_matrices=False)
+    # NOTE: it is assumed that the svd sorts the singular values in descending order.
+    if num_top is not None:
+        u, sigma, vdagger = u[..., :num_top], sigma[..., :num_top], vdagger[..., :num_top, :]
+
+    return _discard_singular_values(u, sigma, vdagger, threshold)
+
+
+def _discard_singular_values(u, sigma, vdagger, threshold):
+    """Discard the singular values (and singular vectors) that are less than the threshold.
 
-    u, sigma, vdagger = np.linalg.svd(matrix, full_matrices=False)
-    # NOTE: it is assumed that the np.linalg.svd sorts the singular values in descending order.
+    Parameters
+    ----------
+    u : np.ndarray(..., N, K)
+        Left singular matrix.
+    sigma : np.ndarray(..., K)
+        Singular values sorted in decreasing order.
+    vdagger : np.ndarray(..., K, M)
+        Right singular matrix.
+    threshold : float
+        Singular values (and corresponding singular vectors) below this threshold are discarded.
+
+    Returns
+    -------
+    u : np.ndarray(..., N, L)
+        Left singular matrix.
+    sigma : np.ndarray(..., L)
+        Singular values sorted in decreasing order.
+    vdagger : np.ndarray(..., L, M)
+        Right singular matrix.
+    mask : np.ndarray(..., L)
+        Boolean indices of the singular values that are kept (the others are padding).
+        Only returned for a stack of singular value decompositions.
+
+    Warns
+    -----
+    If any singular values and singular vectors are discarded.
 
+    """
+    # pylint: disable=C0103
     kept_indices = sigma > threshold
     if np.sum(~kept_indices) > 0:
         print(
@@ -125,39 +435,428 @@ def svd(matrix, threshold=1e-9):
             "{2}".format(np.sum(~kept_indices), threshold, sigma[~kept_indices])
         )
 
+    if sigma.ndim > 1:
+        # NOTE: singular values are sorted, so the kept singular values are already in front
+        num_kept = np.max(np.sum(kept_indices, axis=-1), initial=0)
+        mask = kept_indices[..., :num_kept]
+        u = np.where(mask[..., None, :], u[..., :num_kept], 0)
+        vdagger = np.where(mask[..., :, None], vdagger[..., :num_kept, :], 0)
+        return u, np.where(mask, sigma[..., :num_kept], 0), vdagger, mask
+
     u, sigma, vdagger = u[:, kept_indices], sigma[kept_indices], vdagger[kept_indices, :]
 
     return u, sigma, vdagger
 
 
-def power_symmetric(matrix, k, threshold=1e-9):
-    """Return the kth power of the given symmetric matrix.
+def _randomized_svd(matrix, num_top, num_oversamples, num_iter, seed):
+    """Return the largest singular values and singular vectors from a randomized range finder.
+
+    Parameters
+    ----------
+    matrix : np.ndarray(N, M)
+        Matrix.
+    num_top : int
+        Number of the largest singular values (and corresponding singular vectors) that are
+        computed.
+    num_oversamples : int
+        Number of random vectors used in addition to `num_top`.
+    num_iter : int
+        Number of power iterations.
+    seed : {int, None}
+        Seed of the random vectors.
+
+    Returns
+    -------
+    u : np.ndarray(N, num_top)
+        Left singular matrix.
+    sigma : np.ndarray(num_top,)
+        Singular values sorted in decreasing order.
+    vdagger : np.ndarray(num_top, M)
+        Right singular matrix.
+
+    References
+    ----------
+    .. [1] Halko, N.; Martinsson, P.G.; Tropp, J.A. Finding structure with randomness:
+        Probabilistic algorithms for constructing approximate matrix decompositions. SIAM Rev.
+        2011, 53, 217-288.
+
+    """
+    # pylint: disable=C0103
+    num_vecs = min(num_top + num_oversamples, *matrix.shape)
+    rng = np.random.default_rng(seed)
+    basis = np.linalg.qr(matrix.dot(rng.standard_normal((matrix.shape[1], num_vecs))))[0]
+    for _ in range(num_iter):
+        # NOTE: basis is orthonormalized after each product to preserve the small singular values
+        basis = np.linalg.qr(matrix.T.conjugate().dot(basis))[0]
+        basis = np.linalg.qr(matrix.dot(basis))[0]
+    u, sigma, vdagger = np.linalg.svd(basis.T.conjugate().dot(matrix), full_matrices=False)
+    return basis.dot(u[:, :num_top]), sigma[:num_top], vdagger[:num_top]
+
+
+@tracing.traced(
+    "truncated_svd",
+    # NOTE: about ten products with a block of (num_top + oversamples) vectors
+    flops=lambda matrix, num_top, *args, **kwargs: 10
+    * tracing.matmul_flops(matrix.shape[0], matrix.shape[1], num_top + 10),
+)
+def truncated_svd(
+    matrix,
+    num_top,
+    method="randomized",
+    threshold=1e-9,
+    check_accuracy=True,
+    rtol=1e-6,
+    num_oversamples=10,
+    num_iter=4,
+    seed=0,
+):
+    r"""Return the largest singular values and singular vectors of the given matrix.
+
+    Only the largest `num_top` singular values are computed, with a randomized algorithm or with
+    the Lanczos algorithm. Singular values whose absolute values are less than the threshold are
+    discarded as well as the corresponding singular vectors.
+
+    Parameters
+    ----------
+    matrix : np.ndarray(N, M)
+        Matrix.
+    num_top : int
+        Number of the largest singular values (and corresponding singular vectors) that are
+        computed.
+    method : {"randomized", "lanczos"}
+        Algorithm used to compute the singular values.
+        "randomized" uses a randomized range finder with power iterations, and "lanczos" uses
+        `scipy.sparse.linalg.svds` (ARPACK).
+    threshold : {1e-9, float}
+        Singular values (and corresponding singular vectors) below this threshold are discarded.
+    check_accuracy : {True, bool}
+        Whether the residuals of the computed singular triplets, :math:`\| A v_i - \sigma_i u_i \|`,
+        are checked, which costs one product of the matrix with the computed singular vectors.
+        If the sum of their squares is greater than `rtol` times the sum of the squares of the
+        computed singular values, the singular values are computed with `svd` instead.
+        Note that the residuals do not detect larger singular values that are missed altogether.
+    rtol : {1e-6, float}
+        Relative tolerance of the accuracy check.
+    num_oversamples : {10, int}
+        Number of random vectors used in addition to `num_top` in the randomized algorithm.
+    num_iter : {4, int}
+        Number of power iterations in the randomized algorithm.
+    seed : {0, int, None}
+        Seed of the random vectors.
+
+    Returns
+    -------
+    u : np.ndarray(N, K)
+        Left singular matrix.
+    sigma : np.ndarray(K,)
+        Singular values sorted in decreasing order.
+    vdagger : np.ndarray(K, M)
+        Right singular matrix.
+
+    Raises
+    ------
+    TypeError
+        If `matrix` is not a two-dimensional numpy array.
+        If `num_top` is not an integer.
+    ValueError
+        If `num_top` is negative.
+        If `method` is not one of "randomized" or "lanczos".
+
+    Warns
+    -----
+    If the computed singular values do not pass the accuracy check.
+    If any singular values and singular vectors are discarded.
+
+    """
+    # pylint: disable=C0103
+    if not (isinstance(matrix, np.ndarray) and matrix.ndim == 2):
+        raise TypeError("Given matrix must be a two-dimensional numpy array.")
+    if num_top is None:
+        raise TypeError("Number of the largest values must be an integer.")
+    _check_num_top(num_top)
+    if method not in ["randomized", "lanczos"]:
+        raise ValueError("Method must be one of randomized or lanczos.")
+
+    size = min(matrix.shape)
+    # NOTE: ARPACK cannot compute all singular values
+    if num_top == 0 or num_top >= size or (method == "lanczos" and num_top >= size - 1):
+        return svd(matrix, threshold=threshold, num_top=num_top)
+
+    if method == "randomized":
+        u, sigma, vdagger = _randomized_svd(matrix, num_top, num_oversamples, num_iter, seed)
+    else:
+        u, sigma, vdagger = scipy.sparse.linalg.svds(matrix, k=num_top, random_state=seed)
+        # NOTE: svds sorts the singular values in increasing order
+        u, sigma, vdagger = u[:, ::-1], sigma[::-1], vdagger[::-1]
+
+    if check_accuracy:
+        # NOTE: for the randomized algorithm, A^dagger u_i = sigma_i v_i holds exactly, so only the
+        # other residuals are computed
+        residual = np.sum(np.abs(matrix.dot(vdagger.T.conjugate()) - u * sigma) ** 2)
+        mass = np.sum(sigma ** 2)
+        if residual > rtol * mass:
+            print(
+                "WARNING: Truncated SVD ({0}) has a squared residual of {1} for {2} squared "
+                "singular values. Full SVD is used instead.".format(method, residual, mass)
+            )
+            return svd(matrix, threshold=threshold, num_top=num_top)
+
+    return _discard_singular_values(u, sigma, vdagger, threshold)
+
+
+def _condition_number(matrix):
+    """Return the estimate of the condition number of a symmetric positive definite matrix.
+
+    The condition number (in the 1-norm) is estimated from the Cholesky decomposition, which costs
+    a small fraction of the Newton-Schulz iteration.
 
     Parameters
     ----------
     matrix : np.ndarray(N, N)
         Symmetric matrix.
+
+    Returns
+    -------
+    condition : {float, None}
+        Estimate of the condition number.
+        None if the matrix is not positive definite.
+
+    """
+    potrf, pocon = scipy.linalg.lapack.get_lapack_funcs(("potrf", "pocon"), (matrix,))
+    with tracing.span(
+        "power_symmetric.condition", flops=tracing.cholesky_flops(matrix.shape[0]), matrix=matrix
+    ):
+        factor, info = potrf(matrix, lower=False, clean=False)
+        if info != 0:
+            return None
+        rcond, info = pocon(factor, np.linalg.norm(matrix, 1))
+    if info != 0 or rcond <= 0:
+        return np.inf
+    return 1.0 / rcond
+
+
+def _newton_schulz(matrix, k, tol, max_iter):
+    r"""Return powers of a symmetric positive definite matrix from the Newton-Schulz iteration.
+
+    The matrix is divided by an upper bound of its largest eigenvalue (the smaller of its Frobenius
+    and infinity norms), so that the eigenvalues of the scaled matrix :math:`A` are in (0, 1].
+    The inverse is the limit of :math:`X_{i+1} = X_i (2I - A X_i)` with :math:`X_0 = I`, and the
+    square root and inverse square root are the limits of the coupled iteration
+    :math:`T_i = (3I - Z_i Y_i) / 2`, :math:`Y_{i+1} = Y_i T_i`, :math:`Z_{i+1} = T_i Z_i` with
+    :math:`Y_0 = A` and :math:`Z_0 = I`. Only matrix products are used.
+
+    Parameters
+    ----------
+    matrix : np.ndarray(N, N)
+        Symmetric positive definite matrix.
+    k : {0.5, -0.5, -1}
+        Power of the matrix.
+    tol : float
+        Tolerance of the root mean square of the residual (:math:`I - A X_i` or
+        :math:`I - Z_i Y_i`).
+    max_iter : int
+        Maximum number of iterations.
+
+    Returns
+    -------
+    powers : {dict of float to np.ndarray(N, N), None}
+        Powers of the matrix that are computed by the iteration (both the square root and the
+        inverse square root for :math:`k = \pm 1/2`).
+        None if the iteration did not converge.
+
+    """
+    size = matrix.shape[0]
+    identity = np.identity(size, dtype=matrix.dtype)
+    scale = min(np.linalg.norm(matrix), np.linalg.norm(matrix, np.inf))
+    scaled = matrix / scale
+    num_matmul = 2 if k == -1 else 3
+    flops = num_matmul * tracing.matmul_flops(size, size, size)
+
+    # NOTE: the residual decreases monotonically until the iteration converges (or stagnates at the
+    # precision of the products), so any increase stops the iteration
+    residual = np.inf
+    if k == -1:
+        inverse = identity
+        for _ in range(max_iter):
+            with tracing.span("power_symmetric.newton_schulz", flops=flops):
+                product = scaled.dot(inverse)
+                product *= -1
+                product[np.diag_indices(size)] += 1
+                new_residual = np.linalg.norm(product) / np.sqrt(size)
+                if new_residual < tol:
+                    inverse = (inverse + inverse.T) / (2 * scale)
+                    return {-1: inverse}
+                if new_residual >= residual:
+                    break
+                residual = new_residual
+                product[np.diag_indices(size)] += 1
+                inverse = inverse.dot(product)
+    else:
+        sqrt, inv_sqrt = scaled, identity
+        for _ in range(max_iter):
+            with tracing.span("power_symmetric.newton_schulz", flops=flops):
+                product = inv_sqrt.dot(sqrt)
+                product *= -1
+                product[np.diag_indices(size)] += 1
+                new_residual = np.linalg.norm(product) / np.sqrt(size)
+                if new_residual < tol:
+                    sqrt = (sqrt + sqrt.T) * (np.sqrt(scale) / 2)
+                    inv_sqrt = (inv_sqrt + inv_sqrt.T) / (2 * np.sqrt(scale))
+                    return {0.5: sqrt, -0.5: inv_sqrt}
+                if new_residual >= residual:
+                    break
+                residual = new_residual
+                # T = (3I - ZY) / 2 = I + (I - ZY) / 2
+                product /= 2
+                product[np.diag_indices(size)] += 1
+                sqrt, inv_sqrt = sqrt.dot(product), product.dot(inv_sqrt)
+    print(
+        "WARNING: Newton-Schulz iteration did not converge within {0} iterations (residual {1} is "
+        "not less than the tolerance {2}). Eigendecomposition is used instead.".format(
+            max_iter, residual, tol
+        )
+    )
+    return None
+
+
+@tracing.traced(
+    "power_symmetric",
+    flops=lambda matrix, k, threshold=1e-9, validate=None, method="eigh", **kwargs: (
+        None
+        if method != "eigh"
+        else (tracing.eigh_flops(matrix.shape[-1]) + tracing.matmul_flops(*[matrix.shape[-1]] * 3))
+        * int(np.prod(matrix.shape[:-2]))
+    ),
+)
+def power_symmetric(
+    matrix, k, threshold=1e-9, validate=None, method="eigh", tol=1e-10, max_iter=100
+):
+    r"""Return the kth power of the given symmetric matrix.
+
+    Parameters
+    ----------
+    matrix : np.ndarray(..., N, N)
+        Symmetric matrix or a stack of symmetric matrices.
     k : {int, float}
         Power of the matrix.
     threshold : {1e-9, float}
         In the eigenvalue decomposition, the eigenvalues (and corresponding eigenvectors) that are
         less than the threshold are discarded.
+    validate : {"full", "cheap", "off", None}
+        Level of the check that the matrix is symmetric.
+        Default is the level set in `orbtools.validation`.
+    method : {"eigh", "newton_schulz"}
+        Algorithm used to compute the power.
+        "eigh" raises the eigenvalues of the matrix to the kth power. "newton_schulz" uses the
+        Newton-Schulz iteration, which consists only of matrix products and therefore runs well on
+        many cores; it supports only :math:`k = 1/2, -1/2, -1` of a single positive definite matrix.
+        If the estimated condition number of the matrix is greater than
+        `NEWTON_SCHULZ_MAX_CONDITION` (the number of iterations grows with the logarithm of the
+        condition number), or if the iteration does not converge, "eigh" is used instead.
+    tol : {1e-10, float}
+        Tolerance of the Newton-Schulz iteration.
+        The iteration stops when the root mean square of the entries of its residual (e.g.
+        :math:`I - A^{-1/2} A^{1/2}`) is less than the tolerance.
+    max_iter : {100, int}
+        Maximum number of Newton-Schulz iterations.
 
     Returns
     -------
-    matrix_power : np.ndarray(N, N)
-        Matrix raised to the kth power.
+    matrix_power : np.ndarray(..., N, N)
+        Matrix (or each matrix in the stack) raised to the kth power.
 
     Raises
     ------
+    TypeError
+        If `matrix` is not a two-dimensional numpy array and `method` is "newton_schulz".
+        If `tol` is not a float or `max_iter` is not an integer.
     ValueError
         If the `k` is a fraction and matrix has negative eigenvalues.
+        If `method` is not one of "eigh" or "newton_schulz".
+        If `method` is "newton_schulz" and `k` is not one of 1/2, -1/2, or -1, or `matrix` is a
+        stack of matrices.
+        If `tol` or `max_iter` is not positive.
+
+    Warns
+    -----
+    If the Newton-Schulz iteration falls back to the eigendecomposition.
+
+    Note
+    ----
+    Powers are stored in `orbtools.cache.factorizations`, so that the same power of the same matrix
+    is not computed more than once. Stacks of matrices are not stored. Powers from the Newton-Schulz
+    iteration are stored separately from the ones from the eigendecomposition.
 
     """
-    eigval, eigvec = eigh(matrix, threshold=threshold)
+    if method not in POWER_METHODS:
+        raise ValueError("Method must be one of {0}.".format(", ".join(POWER_METHODS)))
+    if method == "newton_schulz":
+        if not (isinstance(matrix, np.ndarray) and matrix.ndim >= 2):
+            raise TypeError("Given matrix must be a two-dimensional numpy array.")
+        if matrix.ndim > 2:
+            raise ValueError("Newton-Schulz iteration does not support stacks of matrices.")
+        if matrix.shape[0] != matrix.shape[1]:
+            raise ValueError("Given matrix must be square.")
+        if k not in NEWTON_SCHULZ_POWERS:
+            raise ValueError("Newton-Schulz iteration only supports the powers 1/2, -1/2, and -1.")
+        if not isinstance(tol, (int, float)) or isinstance(tol, bool):
+            raise TypeError("Tolerance must be an integer or a float.")
+        if tol <= 0:
+            raise ValueError("Tolerance must be positive.")
+        if not isinstance(max_iter, (int, np.integer)) or isinstance(max_iter, bool):
+            raise TypeError("Maximum number of iterations must be an integer.")
+        if max_iter <= 0:
+            raise ValueError("Maximum number of iterations must be positive.")
+
+    if isinstance(matrix, np.ndarray) and matrix.ndim > 2:
+        eigval, eigvec, mask = eigh(matrix, threshold=threshold, validate=validate)
+        if k % 1 != 0 and np.any(eigval < 0):
+            raise ValueError(
+                "Given matrix has negative eigenvalues. Fractional powers of negative eigenvalues "
+                "are not supported."
+            )
+        # NOTE: padded eigenvalues are replaced before the power so that negative powers are finite
+        eigval_power = np.where(mask, np.where(mask, eigval, 1) ** k, 0)
+        return np.matmul(eigvec * eigval_power[..., None, :], np.swapaxes(eigvec, -1, -2))
+
+    key = factorizations.key(matrix, threshold)
+    name = ("power", k) if method == "eigh" else ("power", k, method)
+    matrix_power = factorizations.lookup(key, name)
+    if matrix_power is not None:
+        return matrix_power
+
+    if method == "newton_schulz":
+        if not validation.is_hermitian(matrix, validation.resolve_level(validate)):
+            raise ValueError("Given matrix must be Hermitian.")
+        validate = "off"
+        condition = _condition_number(matrix)
+        if condition is None:
+            print(
+                "WARNING: Given matrix is not positive definite. Eigendecomposition is used "
+                "instead of the Newton-Schulz iteration."
+            )
+        elif condition > NEWTON_SCHULZ_MAX_CONDITION:
+            print(
+                "WARNING: Estimated condition number ({0:.3e}) of the matrix is greater than "
+                "{1:.3e}. Eigendecomposition is used instead of the Newton-Schulz "
+                "iteration.".format(condition, NEWTON_SCHULZ_MAX_CONDITION)
+            )
+        else:
+            powers = _newton_schulz(matrix, k, tol, max_iter)
+            if powers is not None:
+                for power, value in powers.items():
+                    factorizations.store(key, ("power", power, method), value)
+                return powers[k]
+        matrix_power = factorizations.lookup(key, ("power", k))
+        if matrix_power is not None:
+            return matrix_power
+
+    eigval, eigvec = eigh(matrix, threshold=threshold, validate=validate)
     if k % 1 != 0 and np.any(eigval < 0):
         raise ValueError(
             "Given matrix has negative eigenvalues. Fractional powers of negative eigenvalues are "
             "not supported."
         )
-    return (eigvec * (eigval ** k)).dot(eigvec.T)
+    matrix_power = (eigvec * (eigval ** k)).dot(eigvec.T)
+    factorizations.store(key, ("power", k), matrix_power)
+    return matrix_power
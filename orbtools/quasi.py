@@ -1,13 +1,51 @@
 """Module for making Quasiatomic orbitals."""
 import numpy as np
+from orbtools import blocking
 from orbtools import orthogonalization as orth
+from orbtools import tracing, validation
+from orbtools.cache import factorizations, fingerprint
+import scipy.linalg
+
+
+def _is_positive_semidefinite(matrix, level):
+    """Check if the given symmetric matrix is positive semidefinite.
+
+    Parameters
+    ----------
+    matrix : np.ndarray(N, N)
+        Symmetric matrix.
+    level : {"full", "cheap", "off"}
+        Level of the check.
+        If "full", the eigendecomposition of the matrix is used (and is stored in the factorization
+        cache for later use). If "cheap", the Cholesky decomposition of the matrix is used.
+
+    Returns
+    -------
+    is_positive_semidefinite : bool
+        True if the matrix is positive semidefinite (or if the check is turned off).
+
+    """
+    if level == "off":
+        return True
+    if level == "cheap":
+        return validation.is_positive_semidefinite_cholesky(matrix)
+    return np.all(orth.eigh(matrix, validate="off")[0] >= 0)
 
 
 def _check_input(
-    *, olp_ab_ab=None, olp_aao_ab=None, olp_aao_aao=None, coeff_ab_mo=None, indices_span=None
+    *,
+    olp_ab_ab=None,
+    olp_aao_ab=None,
+    olp_aao_aao=None,
+    coeff_ab_mo=None,
+    indices_span=None,
+    validate=None
 ):
     """Check the inputs.
 
+    Types and shapes are always checked. The numerical properties (symmetry, positive
+    semidefiniteness, and normalization) are checked at the level given by `validate`.
+
     Parameters
     ----------
     olp_ab_ab : np.ndarray(K, K)
@@ -33,6 +71,9 @@ def _check_input(
         Molecular orbitals that will be spanned exactly by the quasi basis functions.
         Each entry is a boolean, where molecular orbitals that are exactly described have value
         `True`.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks.
+        Default is the level set in `orbtools.validation`.
 
     Raises
     ------
@@ -54,9 +95,11 @@ def _check_input(
         If number of reference basis functions (aao) is not consistent for `olp_aao_ab` and
         `olp_aao_aao`.
         If molecular orbitals are not normalized.
+        If `validate` is not one of "full", "cheap", "off", or None.
 
     """
     # pylint: disable=R0912
+    level = validation.resolve_level(validate)
     if coeff_ab_mo is not None:
         if not (isinstance(coeff_ab_mo, np.ndarray) and coeff_ab_mo.ndim == 2):
             raise TypeError("Given coefficient matrix is not a two-dimensional numpy array.")
@@ -70,11 +113,12 @@ def _check_input(
             raise TypeError(
                 "Given overlap matrix for atomic basis is not a two-dimensional square numpy array."
             )
-        if not np.allclose(np.diag(olp_ab_ab), np.ones(olp_ab_ab.shape[0])):
+        if level != "off" and not np.allclose(np.diag(olp_ab_ab), np.ones(olp_ab_ab.shape[0])):
             raise ValueError("Given overlap matrix for atomic basis is not normalized.")
-        if not np.allclose(olp_ab_ab, olp_ab_ab.T):
+        memory_budget = blocking.resolve_memory_budget(None, olp_ab_ab)
+        if not validation.is_hermitian(olp_ab_ab, level, memory_budget=memory_budget):
             raise ValueError("Given overlap matrix for atomic basis is not symmetric.")
-        if not np.all(orth.eigh(olp_ab_ab)[0] >= 0):
+        if not _is_positive_semidefinite(olp_ab_ab, level):
             raise ValueError("Given overlap matrix for atomic basis is not positive semidefinite.")
 
     if olp_aao_ab is not None:
@@ -93,11 +137,11 @@ def _check_input(
             raise TypeError(
                 "Given overlap matrix for AAO is not a two dimensional square numpy array."
             )
-        if not np.allclose(np.diag(olp_aao_aao), np.ones(olp_aao_aao.shape[0])):
+        if level != "off" and not np.allclose(np.diag(olp_aao_aao), np.ones(olp_aao_aao.shape[0])):
             raise ValueError("Given overlap matrix for AAO is not normalized.")
-        if not np.allclose(olp_aao_aao, olp_aao_aao.T):
+        if not validation.is_hermitian(olp_aao_aao, level):
             raise ValueError("Given overlap matrix for AAO is not symmetric.")
-        if not np.all(orth.eigh(olp_aao_aao)[0] >= 0):
+        if not _is_positive_semidefinite(olp_aao_aao, level):
             raise ValueError("Given overlap matrix for AAO is not positive semidefinite.")
 
     if (
@@ -139,8 +183,8 @@ def _check_input(
         )
 
     if coeff_ab_mo is not None and olp_ab_ab is not None:
-        olp_mo_mo = coeff_ab_mo.T.dot(olp_ab_ab).dot(coeff_ab_mo)
-        if not np.allclose(np.diag(olp_mo_mo), np.ones(olp_mo_mo.shape[0])):
+        memory_budget = blocking.resolve_memory_budget(None, coeff_ab_mo, olp_ab_ab)
+        if not validation.is_normalized(coeff_ab_mo, olp_ab_ab, level, memory_budget=memory_budget):
             raise ValueError(
                 "The overlap of the molecular orbitals, calculated from `coeff_ab_mo` and "
                 "`olp_ab_ab` is not normalized."
@@ -162,7 +206,148 @@ def _check_input(
             )
 
 
-def project(olp_one_one, olp_one_two):
+@tracing.traced(
+    "project.cholesky",
+    flops=lambda matrix, *args, **kwargs: tracing.cholesky_flops(matrix.shape[0]),
+)
+def _cholesky(matrix, threshold=1e-9):
+    """Return the Cholesky decomposition of the given matrix if it is well conditioned.
+
+    Parameters
+    ----------
+    matrix : np.ndarray(N, N)
+        Symmetric matrix.
+    threshold : {1e-9, float}
+        Smallest reciprocal condition number (in the 1-norm) of the matrix that is accepted.
+
+    Returns
+    -------
+    factor : {np.ndarray(N, N), None}
+        Lower triangular Cholesky factor of the matrix.
+        None if the matrix is not positive definite or if its reciprocal condition number is less
+        than the threshold.
+
+    Note
+    ----
+    Decompositions are stored in `orbtools.cache.factorizations`, so that the same matrix is not
+    decomposed more than once.
+
+    """
+    key = factorizations.key(matrix, threshold)
+    factor = factorizations.lookup(key, "cholesky")
+    if factor is not None:
+        return factor
+
+    try:
+        factor, _ = scipy.linalg.cho_factor(matrix, lower=True, check_finite=False)
+    except np.linalg.LinAlgError:
+        return None
+    (pocon,) = scipy.linalg.lapack.get_lapack_funcs(("pocon",), (factor,))
+    rcond, info = pocon(factor, np.max(np.sum(np.abs(matrix), axis=0)), uplo="L")
+    if info != 0 or rcond < threshold:
+        return None
+    factor = np.tril(factor)
+    factorizations.store(key, "cholesky", factor)
+    return factor
+
+
+@tracing.traced("project.rank", flops=lambda olp: tracing.cholesky_flops(olp.shape[0]))
+def _rank(olp):
+    r"""Return the number of linearly independent functions with the given overlap.
+
+    Rank is obtained from the pivoted Cholesky decomposition of the overlap, where the pivots that
+    are less than :math:`N \epsilon` are treated as zero.
+
+    Parameters
+    ----------
+    olp : np.ndarray(N, N)
+        Overlap of the normalized functions.
+
+    Returns
+    -------
+    rank : int
+        Number of linearly independent functions.
+
+    """
+    (pstrf,) = scipy.linalg.lapack.get_lapack_funcs(("pstrf",), (olp,))
+    _, _, rank, _ = pstrf(olp, lower=1)
+    return int(rank)
+
+
+def solve_projection(olp_one_one, olp_one_two):
+    r"""Return the coefficients of the projections of basis set 2 onto basis set 1.
+
+    Linear equations :math:`S_A C = S_{A,B}` are solved with the Cholesky decomposition of
+    :math:`S_A`. If :math:`S_A` is (nearly) singular, its pseudoinverse is obtained from its
+    eigendecomposition instead.
+
+    Parameters
+    ----------
+    olp_one_one : np.ndarray(N, N)
+        Overlap of the basis functions in set 1 with basis functions from set 1.
+    olp_one_two : np.ndarray(N, M)
+        Overlap of the basis functions in set 1 with basis functions from set 2.
+
+    Returns
+    -------
+    coeff : np.ndarray(N, M)
+        Transformation matrix from basis functions in set 1 to the (unnormalized) projections of
+        basis set 2 onto basis set 1.
+
+    """
+    factor = _cholesky(olp_one_one)
+    if factor is not None:
+        return scipy.linalg.cho_solve((factor, True), olp_one_two, check_finite=False)
+    # NOTE: (pseudo)inverse of the (nearly) singular overlap is obtained from its
+    # eigendecomposition, where the negligible eigenvalues are discarded
+    return orth.power_symmetric(olp_one_one, -1, validate="off").dot(olp_one_two)
+
+
+def normalize_projections(coeff_one_proj, olp_proj_proj, validate=None):
+    """Return the normalized projections without the projections that are zero.
+
+    Parameters
+    ----------
+    coeff_one_proj : np.ndarray(N, M)
+        Transformation matrix from basis functions in set 1 to the (unnormalized) projections.
+    olp_proj_proj : np.ndarray(M, M)
+        Overlap of the (unnormalized) projections.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks.
+        If "full" or "cheap", the linear dependence of the projections is checked with the pivoted
+        Cholesky decomposition of their overlap. If "off", the linear dependence is not checked.
+        Default is the level set in `orbtools.validation`.
+
+    Returns
+    -------
+    coeff : np.ndarray(N, M')
+        Transformation matrix from basis functions in set 1 to the normalized projections that are
+        not zero.
+
+    """
+    # Remove zero columns
+    nonzero = np.any(coeff_one_proj, axis=0)
+    coeff_one_proj = coeff_one_proj[:, nonzero]
+    olp_proj_proj = olp_proj_proj[np.ix_(nonzero, nonzero)]
+    # Normalize
+    normalizer = np.diag(olp_proj_proj) ** (-0.5)
+    coeff_one_proj *= normalizer
+    # Check linear dependence
+    if validation.resolve_level(validate) == "off":
+        return coeff_one_proj
+    rank = _rank(olp_proj_proj * np.outer(normalizer, normalizer))
+    if rank < coeff_one_proj.shape[1]:
+        print(
+            "Warning: There are {0} linearly dependent projections. The transformation matrix has a"
+            " shape of {1} and rank of {2}".format(
+                coeff_one_proj.shape[1] - rank, coeff_one_proj.shape, rank
+            )
+        )
+    return coeff_one_proj
+
+
+@tracing.traced("project")
+def project(olp_one_one, olp_one_two, validate=None):
     r"""Project one basis set onto another basis set.
 
     .. math::
@@ -180,6 +365,11 @@ def project(olp_one_one, olp_one_two):
         Overlap of the basis functions in set 1 with basis functions from set 1.
     olp_one_two : np.ndarray(N, M)
         Overlap of the basis functions in set 1 with basis functions from set 2.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks.
+        If "full" or "cheap", the linear dependence of the projections is checked with the pivoted
+        Cholesky decomposition of their overlap. If "off", the linear dependence is not checked.
+        Default is the level set in `orbtools.validation`.
 
     Returns
     -------
@@ -187,6 +377,20 @@ def project(olp_one_one, olp_one_two):
         Transformation matrix from basis functions in set 1 to the projection of baiss set 2 onto
         basis set 1.
 
+    Raises
+    ------
+    TypeError
+        If `olp_one_one` is not a two-dimensional square numpy array.
+        If `olp_one_two` is not a two-dimensional numpy array.
+    ValueError
+        If the number of rows of `olp_one_two` is not equal to the number of rows of `olp_one_one`.
+        If `olp_one_one` is not symmetric.
+
+    Note
+    ----
+    Linear equations are solved with the Cholesky decomposition of `olp_one_one`. If `olp_one_one`
+    is (nearly) singular, its pseudoinverse is obtained from its eigendecomposition instead.
+
     """
     if not (
         isinstance(olp_one_one, np.ndarray)
@@ -201,27 +405,75 @@ def project(olp_one_one, olp_one_two):
             "Number of rows/columns of `olp_one_one` must be equal to the number of rows in "
             "`olp_one_two`."
         )
-    olp_one_one_inv = orth.power_symmetric(olp_one_one, -1)
-    coeff_one_proj = olp_one_one_inv.dot(olp_one_two)
-    # Remove zero columns
-    coeff_one_proj = coeff_one_proj[:, np.any(coeff_one_proj, axis=0)]
-    # Normalize
-    olp_proj_proj = coeff_one_proj.T.dot(olp_one_one).dot(coeff_one_proj)
-    normalizer = np.diag(olp_proj_proj) ** (-0.5)
-    coeff_one_proj *= normalizer
-    # Check linear dependence
-    rank = np.linalg.matrix_rank(coeff_one_proj)
-    if rank < coeff_one_proj.shape[1]:
-        print(
-            "Warning: There are {0} linearly dependent projections. The transformation matrix has a"
-            " shape of {1} and rank of {2}".format(
-                coeff_one_proj.shape[1] - rank, coeff_one_proj.shape, rank
-            )
+    level = validation.resolve_level(validate)
+    with tracing.span("project.validate", olp_one_one=olp_one_one):
+        if not validation.is_hermitian(olp_one_one, level):
+            raise ValueError("`olp_one_one` must be symmetric.")
+    num_rows, num_cols = olp_one_two.shape
+    with tracing.span(
+        "project.solve",
+        flops=2 * num_rows ** 2 * num_cols,
+        olp_one_one=olp_one_one,
+        olp_one_two=olp_one_two,
+    ):
+        coeff_one_proj = solve_projection(olp_one_one, olp_one_two)
+    with tracing.span(
+        "project.normalize",
+        flops=tracing.matmul_flops(num_cols, num_rows, num_rows)
+        + tracing.matmul_flops(num_cols, num_rows, num_cols),
+        coeff_one_proj=coeff_one_proj,
+    ):
+        olp_proj_proj = coeff_one_proj.T.dot(olp_one_one).dot(coeff_one_proj)
+    return normalize_projections(coeff_one_proj, olp_proj_proj, validate=level)
+
+
+def _check_dim_mmo(dim_mmo, num_aao, indices_span):
+    """Check the dimension of the MMO space.
+
+    Parameters
+    ----------
+    dim_mmo : {int, None}
+        Total dimension of the MMO space.
+        If None, the dimension of the reference basis function space is used.
+    num_aao : int
+        Number of reference basis functions.
+    indices_span : np.ndarray(N)
+        Boolean indices for the molecular orbitals that will be spanned by the generated MMO's.
+
+    Returns
+    -------
+    dim_mmo : int
+        Total dimension of the MMO space.
+
+    Raises
+    ------
+    TypeError
+        If `dim_mmo` is not an integer (or None).
+    ValueError
+        If the dimension of the MMO space is larger than the number of molecular orbitals.
+        If the dimension of the MMO space is smaller than the space that needs to be spanned.
+
+    """
+    if dim_mmo is None:
+        dim_mmo = num_aao
+    if not isinstance(dim_mmo, int):
+        raise TypeError("Dimension of MMO space must be an integer (or None).")
+    num_mo = indices_span.size
+    if dim_mmo > num_mo:
+        raise ValueError(
+            "Dimension of MMO space, {0}, is larger than the number of molecular orbitals, {1}."
+            "".format(dim_mmo, num_mo)
         )
-    return coeff_one_proj
+    if dim_mmo < np.sum(indices_span):
+        raise ValueError(
+            "Dimension of MMO space, {0}, is smaller than the space you want to span, {1}."
+            "".format(dim_mmo, np.sum(indices_span))
+        )
+    return dim_mmo
 
 
-def make_mmo(olp_aao_ab, coeff_ab_mo, indices_span, dim_mmo=None):
+@tracing.traced("make_mmo")
+def make_mmo(olp_aao_ab, coeff_ab_mo, indices_span, dim_mmo=None, validate=None, svd_method=None):
     r"""Return transformation matrix from atomic basis functions to minimal molecular orbitals.
 
     Parameters
@@ -236,6 +488,14 @@ def make_mmo(olp_aao_ab, coeff_ab_mo, indices_span, dim_mmo=None):
     dim_mmo : {int, None}
         Total dimension of the MMO space.
         Default is the dimension of the reference basis function space.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks.
+        Default is the level set in `orbtools.validation`.
+    svd_method : {None, "randomized", "lanczos"}
+        Algorithm used to compute the right singular vectors of the overlap of the reference basis
+        functions with the virtual molecular orbitals.
+        Default computes them with `orthogonalization.svd`. "randomized" and "lanczos" compute only
+        the needed singular vectors with `orthogonalization.truncated_svd`.
 
     Returns
     -------
@@ -249,6 +509,7 @@ def make_mmo(olp_aao_ab, coeff_ab_mo, indices_span, dim_mmo=None):
     ValueError
         If the dimension of the MMO space is larger than the number of molecular orbitals.
         If the dimension of the MMO space is smaller than the space that needs to be spanned.
+        If `svd_method` is not one of "randomized", "lanczos", or None.
 
     References
     ----------
@@ -260,25 +521,25 @@ def make_mmo(olp_aao_ab, coeff_ab_mo, indices_span, dim_mmo=None):
         234107.
 
     """
-    _check_input(coeff_ab_mo=coeff_ab_mo, olp_aao_ab=olp_aao_ab, indices_span=indices_span)
-    olp_aao_mo = olp_aao_ab.dot(coeff_ab_mo)
-
-    num_aao, num_mo = olp_aao_mo.shape
-    if dim_mmo is None:
-        dim_mmo = num_aao
-    if not isinstance(dim_mmo, int):
-        raise TypeError("Dimension of MMO space must be an integer (or None).")
-    if dim_mmo > num_mo:
-        raise ValueError(
-            "Dimension of MMO space, {0}, is larger than the number of molecular orbitals, {1}."
-            "".format(dim_mmo, num_mo)
+    with tracing.span("make_mmo.validate"):
+        _check_input(
+            coeff_ab_mo=coeff_ab_mo,
+            olp_aao_ab=olp_aao_ab,
+            indices_span=indices_span,
+            validate=validate,
         )
-    if dim_mmo < np.sum(indices_span):
-        raise ValueError(
-            "Dimension of MMO space, {0}, is smaller than the space you want to span, {1}."
-            "".format(dim_mmo, np.sum(indices_span))
+    with tracing.span(
+        "make_mmo.overlaps",
+        flops=tracing.matmul_flops(olp_aao_ab.shape[0], *coeff_ab_mo.shape),
+        olp_aao_ab=olp_aao_ab,
+        coeff_ab_mo=coeff_ab_mo,
+    ):
+        olp_aao_mo = blocking.dot(
+            olp_aao_ab, coeff_ab_mo, blocking.resolve_memory_budget(None, olp_aao_ab, coeff_ab_mo)
         )
 
+    dim_mmo = _check_dim_mmo(dim_mmo, olp_aao_ab.shape[0], indices_span)
+
     # Set local variables
     dim_span = np.sum(indices_span)
     num_to_add = dim_mmo - dim_span
@@ -289,10 +550,11 @@ def make_mmo(olp_aao_ab, coeff_ab_mo, indices_span, dim_mmo=None):
     # Create virtual MMO
     #  find overlap between aao and virtuals
     olp_aao_virmo = olp_aao_mo[:, ~indices_span]
-    #  from the right singular vector of olp_aao_virmo
-    coeff_virmo_virmmo = orth.svd(olp_aao_virmo)[2].T
-    #  select vectors with largest (num_to_add) singular values
-    coeff_virmo_virmmo = coeff_virmo_virmmo[:, :num_to_add]
+    #  from the right singular vectors of olp_aao_virmo with largest (num_to_add) singular values
+    if svd_method is None:
+        coeff_virmo_virmmo = orth.svd(olp_aao_virmo, num_top=num_to_add)[2].T
+    else:
+        coeff_virmo_virmmo = orth.truncated_svd(olp_aao_virmo, num_to_add, method=svd_method)[2].T
 
     # Combine the occupied and virtual MMO's
     coeff_mo_occmmo = np.zeros((indices_span.size, coeff_occmo_occmmo.shape[1]))
@@ -305,7 +567,35 @@ def make_mmo(olp_aao_ab, coeff_ab_mo, indices_span, dim_mmo=None):
     return coeff_ab_mo.dot(coeff_mo_mmo)
 
 
-def quambo(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span, dim=None):
+def _project_aao(olp_ab_ab, olp_aao_ab, coeff_ab_mmo, validate):
+    """Return the normalized projections of the reference basis functions onto the MMO space.
+
+    Parameters
+    ----------
+    olp_ab_ab : np.ndarray(K, K)
+        Overlaps of the atomic basis functions.
+    olp_aao_ab : np.ndarray(L, K)
+        Overlaps of the reference basis functions (aao) with the atomic basis functions.
+    coeff_ab_mmo : np.ndarray(K, N)
+        Transformation matrix from atomic basis functions to the MMO's.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks.
+
+    Returns
+    -------
+    coeff_ab_proj : np.ndarray(K, L)
+        Transformation matrix from atomic basis functions to the normalized projections.
+
+    """
+    return _project_aao_sweep(
+        olp_ab_ab, olp_aao_ab, coeff_ab_mmo, [coeff_ab_mmo.shape[1]], validate
+    )[0]
+
+
+@tracing.traced("quambo")
+def quambo(
+    olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span, dim=None, validate=None, svd_method=None
+):
     r"""Return transformation matrix from atomic basis functions to QUAMBO's.
 
     Parameters
@@ -333,6 +623,14 @@ def quambo(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span, dim=None):
     dim : {int, None}
         Number of QUAMBO basis functions.
         Default is the number of reference basis functions.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks.
+        Default is the level set in `orbtools.validation`.
+    svd_method : {None, "randomized", "lanczos"}
+        Algorithm used to compute the right singular vectors of the overlap of the reference basis
+        functions with the virtual molecular orbitals.
+        Default computes them with `orthogonalization.svd`. "randomized" and "lanczos" compute only
+        the needed singular vectors with `orthogonalization.truncated_svd`.
 
     Returns
     -------
@@ -359,26 +657,32 @@ def quambo(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span, dim=None):
         orbitals in terms of deformed atomic minimal.
 
     """
-    _check_input(
-        olp_ab_ab=olp_ab_ab,
-        olp_aao_ab=olp_aao_ab,
-        coeff_ab_mo=coeff_ab_mo,
-        indices_span=indices_span,
-    )
+    with tracing.span("quambo.validate"):
+        _check_input(
+            olp_ab_ab=olp_ab_ab,
+            olp_aao_ab=olp_aao_ab,
+            coeff_ab_mo=coeff_ab_mo,
+            indices_span=indices_span,
+            validate=validate,
+        )
     # Find MMO for QUAMBOs
-    coeff_ab_mmo = make_mmo(olp_aao_ab, coeff_ab_mo, indices_span, dim_mmo=dim)
-    # Get transformation
-    olp_mmo_mmo = coeff_ab_mmo.T.dot(olp_ab_ab).dot(coeff_ab_mmo)
-    olp_mmo_aao = (olp_aao_ab.dot(coeff_ab_mmo)).T
-    coeff_mmo_proj = project(olp_mmo_mmo, olp_mmo_aao)
-    # Normalize
-    olp_proj_proj = coeff_mmo_proj.T.dot(olp_mmo_mmo).dot(coeff_mmo_proj)
-    coeff_mmo_proj *= np.diag(olp_proj_proj) ** (-0.5)
-
-    return coeff_ab_mmo.dot(coeff_mmo_proj)
+    coeff_ab_mmo = make_mmo(
+        olp_aao_ab, coeff_ab_mo, indices_span, dim_mmo=dim, validate=validate, svd_method=svd_method
+    )
+    return _project_aao(olp_ab_ab, olp_aao_ab, coeff_ab_mmo, validate)
 
 
-def quao(olp_ab_ab, olp_aao_ab, olp_aao_aao, coeff_ab_mo, indices_span, dim=None):
+@tracing.traced("quao")
+def quao(
+    olp_ab_ab,
+    olp_aao_ab,
+    olp_aao_aao,
+    coeff_ab_mo,
+    indices_span,
+    dim=None,
+    validate=None,
+    svd_method=None,
+):
     r"""Return transformation matrix from atomic basis functions to QUAO's.
 
     Parameters
@@ -412,6 +716,14 @@ def quao(olp_ab_ab, olp_aao_ab, olp_aao_aao, coeff_ab_mo, indices_span, dim=None
     dim : {int, None}
         Number of QUAMBO basis functions.
         Default is the number of reference basis functions.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks.
+        Default is the level set in `orbtools.validation`.
+    svd_method : {None, "randomized", "lanczos"}
+        Algorithm used to compute the right singular vectors of the overlap of the reference basis
+        functions with the virtual molecular orbitals.
+        Default computes them with `orthogonalization.svd`. "randomized" and "lanczos" compute only
+        the needed singular vectors with `orthogonalization.truncated_svd`.
 
     Returns
     -------
@@ -436,6 +748,287 @@ def quao(olp_ab_ab, olp_aao_ab, olp_aao_aao, coeff_ab_mo, indices_span, dim=None
         molecule-intrinsic quasiatomic, bonding, and correlating orbitals. I. Hartree-Fock wave
         functions. J. Chem. Phys. 2013, 139, 234107.
 
+    """
+    with tracing.span("quao.validate"):
+        _check_input(
+            olp_ab_ab=olp_ab_ab,
+            olp_aao_ab=olp_aao_ab,
+            olp_aao_aao=olp_aao_aao,
+            coeff_ab_mo=coeff_ab_mo,
+            indices_span=indices_span,
+            validate=validate,
+        )
+    # Orthogonalize AAOs
+    with tracing.span(
+        "quao.orthogonalize_aao",
+        flops=tracing.matmul_flops(olp_aao_aao.shape[0], *olp_aao_ab.shape),
+        olp_aao_aao=olp_aao_aao,
+        olp_aao_ab=olp_aao_ab,
+    ):
+        olp_oaao_ab = orth.power_symmetric(olp_aao_aao, -0.5, validate=validate).dot(olp_aao_ab)
+
+    # Get MMOs using the orthogonalized AAOs (MMO for QUAOs)
+    coeff_ab_mmo = make_mmo(
+        olp_oaao_ab,
+        coeff_ab_mo,
+        indices_span,
+        dim_mmo=dim,
+        validate=validate,
+        svd_method=svd_method,
+    )
+
+    # Find transformation for QUAOs
+    return _project_aao(olp_ab_ab, olp_aao_ab, coeff_ab_mmo, validate)
+
+
+def _check_dims(dims, num_aao, indices_span):
+    """Check the dimensions of the MMO spaces in a sweep.
+
+    Parameters
+    ----------
+    dims : list of {int, None}
+        Dimensions of the MMO spaces.
+        None is replaced with the dimension of the reference basis function space.
+    num_aao : int
+        Number of reference basis functions.
+    indices_span : np.ndarray(N)
+        Boolean indices for the molecular orbitals that will be spanned by the generated MMO's.
+
+    Returns
+    -------
+    dims : list of int
+        Dimensions of the MMO spaces.
+
+    Raises
+    ------
+    TypeError
+        If `dims` is not a nonempty list or tuple.
+        If any dimension is not an integer (or None).
+    ValueError
+        If any dimension is larger than the number of molecular orbitals or smaller than the space
+        that needs to be spanned.
+
+    """
+    if not (isinstance(dims, (list, tuple)) and len(dims) > 0):
+        raise TypeError("Dimensions of the MMO spaces must be given as a nonempty list or tuple.")
+    return [_check_dim_mmo(dim, num_aao, indices_span) for dim in dims]
+
+
+def make_mmo_sweep(olp_aao_ab, coeff_ab_mo, indices_span, dims, validate=None, svd_method=None):
+    """Return transformation matrices from atomic basis functions to MMO's of several dimensions.
+
+    MMO's of a smaller dimension are the first columns of the MMO's of a larger dimension, so only
+    the MMO's of the largest dimension are constructed (with a single SVD).
+
+    Parameters
+    ----------
+    olp_aao_ab : np.ndarray(M, N)
+        Overlap between reference basis functions (rows) and atomic basis functions (columns).
+    coeff_ab_mo : np.ndarray(K, N)
+        Transformation matrix from atomic basis functions (rows) to molecular orbitals (columns).
+    indices_span : np.ndarray(N)
+        Boolean indices for the molecular orbitals that will be spanned by the generated MMO's.
+    dims : list of {int, None}
+        Total dimensions of the MMO spaces.
+        None is the dimension of the reference basis function space.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks.
+        Default is the level set in `orbtools.validation`.
+    svd_method : {None, "randomized", "lanczos"}
+        Algorithm used to compute the right singular vectors (see `make_mmo`).
+
+    Returns
+    -------
+    coeffs_ab_mmo : list of np.ndarray
+        Transformation matrices from atomic basis functions to MMO's of each dimension.
+
+    Raises
+    ------
+    TypeError
+        If `dims` is not a nonempty list or tuple.
+        If any dimension is not an integer (or None).
+    ValueError
+        If any dimension is larger than the number of molecular orbitals or smaller than the space
+        that needs to be spanned.
+
+    """
+    _check_input(
+        coeff_ab_mo=coeff_ab_mo, olp_aao_ab=olp_aao_ab, indices_span=indices_span, validate=validate
+    )
+    dims = _check_dims(dims, olp_aao_ab.shape[0], indices_span)
+    coeff_ab_mmo = make_mmo(
+        olp_aao_ab,
+        coeff_ab_mo,
+        indices_span,
+        dim_mmo=max(dims),
+        validate=validate,
+        svd_method=svd_method,
+    )
+    return [coeff_ab_mmo[:, :dim] for dim in dims]
+
+
+@tracing.traced("project_aao")
+def _project_aao_sweep(olp_ab_ab, olp_aao_ab, coeff_ab_mmo, dims, validate):
+    """Return the normalized projections of the reference basis functions onto nested MMO spaces.
+
+    Overlaps of the MMO's are computed once for the largest MMO space and sliced for the others.
+
+    Parameters
+    ----------
+    olp_ab_ab : np.ndarray(K, K)
+        Overlaps of the atomic basis functions.
+    olp_aao_ab : np.ndarray(L, K)
+        Overlaps of the reference basis functions (aao) with the atomic basis functions.
+    coeff_ab_mmo : np.ndarray(K, N)
+        Transformation matrix from atomic basis functions to the MMO's of the largest dimension.
+    dims : list of int
+        Dimensions of the MMO spaces.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks.
+
+    Returns
+    -------
+    coeffs_ab_proj : list of np.ndarray(K, L)
+        Transformation matrices from atomic basis functions to the normalized projections.
+
+    """
+    memory_budget = blocking.resolve_memory_budget(None, olp_ab_ab, olp_aao_ab)
+    num_ab, num_mmo = coeff_ab_mmo.shape
+    with tracing.span(
+        "project_aao.overlaps",
+        flops=tracing.matmul_flops(num_mmo, num_ab, num_ab)
+        + tracing.matmul_flops(num_mmo, num_ab, num_mmo)
+        + tracing.matmul_flops(olp_aao_ab.shape[0], num_ab, num_mmo),
+        olp_ab_ab=olp_ab_ab,
+        olp_aao_ab=olp_aao_ab,
+        coeff_ab_mmo=coeff_ab_mmo,
+    ):
+        olp_mmo_mmo = blocking.congruence(coeff_ab_mmo, olp_ab_ab, memory_budget)
+        olp_mmo_aao = blocking.dot(olp_aao_ab, coeff_ab_mmo, memory_budget).T
+    coeffs_ab_proj = []
+    for dim in dims:
+        coeff_mmo_proj = project(olp_mmo_mmo[:dim, :dim], olp_mmo_aao[:dim], validate=validate)
+        with tracing.span(
+            "project_aao.normalize",
+            flops=tracing.matmul_flops(num_ab, dim, coeff_mmo_proj.shape[1]),
+            coeff_mmo_proj=coeff_mmo_proj,
+        ):
+            olp_proj_proj = coeff_mmo_proj.T.dot(olp_mmo_mmo[:dim, :dim]).dot(coeff_mmo_proj)
+            coeff_mmo_proj *= np.diag(olp_proj_proj) ** (-0.5)
+            coeffs_ab_proj.append(coeff_ab_mmo[:, :dim].dot(coeff_mmo_proj))
+    return coeffs_ab_proj
+
+
+def quambo_sweep(
+    olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span, dims, validate=None, svd_method=None
+):
+    """Return transformation matrices from atomic basis functions to QUAMBO's of several dimensions.
+
+    Inputs are checked once, the MMO's are constructed once for the largest dimension (see
+    `make_mmo_sweep`), and the overlaps of the MMO's are sliced for the smaller dimensions.
+
+    Parameters
+    ----------
+    olp_ab_ab : np.ndarray(K, K)
+        Overlaps of the atomic basis functions.
+    olp_aao_ab : np.ndarray(L, K)
+        Overlaps of the reference basis functions (aao) with the atomic basis functions.
+    coeff_ab_mo : np.ndarray(K, M)
+        Transformation matrix from the atomic basis functions to molecular orbitals.
+    indices_span : np.ndarray(M)
+        Molecular orbitals that will be spanned exactly by the QUAMBO's.
+    dims : list of {int, None}
+        Numbers of QUAMBO basis functions.
+        None is the number of reference basis functions.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks.
+        Default is the level set in `orbtools.validation`.
+    svd_method : {None, "randomized", "lanczos"}
+        Algorithm used to compute the right singular vectors (see `make_mmo`).
+
+    Returns
+    -------
+    coeffs_ab_quambo : list of np.ndarray(K, L)
+        Transformation matrices from atomic basis functions to QUAMBO's of each dimension.
+
+    Raises
+    ------
+    TypeError
+        If any of the inputs is not of the correct type (see `quambo`).
+        If `dims` is not a nonempty list or tuple.
+    ValueError
+        If any of the inputs is not of the correct shape or value (see `quambo`).
+
+    """
+    _check_input(
+        olp_ab_ab=olp_ab_ab,
+        olp_aao_ab=olp_aao_ab,
+        coeff_ab_mo=coeff_ab_mo,
+        indices_span=indices_span,
+        validate=validate,
+    )
+    dims = _check_dims(dims, olp_aao_ab.shape[0], indices_span)
+    coeff_ab_mmo = make_mmo(
+        olp_aao_ab,
+        coeff_ab_mo,
+        indices_span,
+        dim_mmo=max(dims),
+        validate=validate,
+        svd_method=svd_method,
+    )
+    return _project_aao_sweep(olp_ab_ab, olp_aao_ab, coeff_ab_mmo, dims, validate)
+
+
+def quao_sweep(
+    olp_ab_ab,
+    olp_aao_ab,
+    olp_aao_aao,
+    coeff_ab_mo,
+    indices_span,
+    dims,
+    validate=None,
+    svd_method=None,
+):
+    """Return transformation matrices from atomic basis functions to QUAO's of several dimensions.
+
+    Inputs are checked once, the AAO's are orthogonalized once, the MMO's are constructed once for
+    the largest dimension (see `make_mmo_sweep`), and the overlaps of the MMO's are sliced for the
+    smaller dimensions.
+
+    Parameters
+    ----------
+    olp_ab_ab : np.ndarray(K, K)
+        Overlaps of the atomic basis functions.
+    olp_aao_ab : np.ndarray(L, K)
+        Overlaps of the reference basis functions (aao) with the atomic basis functions.
+    olp_aao_aao : np.ndarray(L, L)
+        Overlaps of the reference basis functions.
+    coeff_ab_mo : np.ndarray(K, M)
+        Transformation matrix from the atomic basis functions to molecular orbitals.
+    indices_span : np.ndarray(M)
+        Molecular orbitals that will be spanned exactly by the QUAO's.
+    dims : list of {int, None}
+        Numbers of QUAO basis functions.
+        None is the number of reference basis functions.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks.
+        Default is the level set in `orbtools.validation`.
+    svd_method : {None, "randomized", "lanczos"}
+        Algorithm used to compute the right singular vectors (see `make_mmo`).
+
+    Returns
+    -------
+    coeffs_ab_quao : list of np.ndarray(K, L)
+        Transformation matrices from atomic basis functions to QUAO's of each dimension.
+
+    Raises
+    ------
+    TypeError
+        If any of the inputs is not of the correct type (see `quao`).
+        If `dims` is not a nonempty list or tuple.
+    ValueError
+        If any of the inputs is not of the correct shape or value (see `quao`).
+
     """
     _check_input(
         olp_ab_ab=olp_ab_ab,
@@ -443,20 +1036,210 @@ def quao(olp_ab_ab, olp_aao_ab, olp_aao_aao, coeff_ab_mo, indices_span, dim=None
         olp_aao_aao=olp_aao_aao,
         coeff_ab_mo=coeff_ab_mo,
         indices_span=indices_span,
+        validate=validate,
     )
-    # Orthogonalize AAOs
-    olp_oaao_ab = orth.power_symmetric(olp_aao_aao, -0.5).dot(olp_aao_ab)
+    dims = _check_dims(dims, olp_aao_ab.shape[0], indices_span)
+    olp_oaao_ab = orth.power_symmetric(olp_aao_aao, -0.5, validate=validate).dot(olp_aao_ab)
+    coeff_ab_mmo = make_mmo(
+        olp_oaao_ab,
+        coeff_ab_mo,
+        indices_span,
+        dim_mmo=max(dims),
+        validate=validate,
+        svd_method=svd_method,
+    )
+    return _project_aao_sweep(olp_ab_ab, olp_aao_ab, coeff_ab_mmo, dims, validate)
 
-    # Get MMOs using the orthogonalized AAOs (MMO for QUAOs)
-    coeff_ab_mmo = make_mmo(olp_oaao_ab, coeff_ab_mo, indices_span, dim_mmo=dim)
 
-    # Find transformation for QUAOs
-    olp_mmo_mmo = coeff_ab_mmo.T.dot(olp_ab_ab).dot(coeff_ab_mmo)
-    olp_mmo_aao = (olp_aao_ab.dot(coeff_ab_mmo)).T
-    coeff_mmo_proj = project(olp_mmo_mmo, olp_mmo_aao)
+class QuasiAtomicBuilder:
+    """Builder of quasiatomic orbitals for a fixed set of reference basis functions (AAO's).
 
-    # Normalize
-    olp_proj_proj = coeff_mmo_proj.T.dot(olp_mmo_mmo).dot(coeff_mmo_proj)
-    coeff_mmo_proj *= np.diag(olp_proj_proj) ** (-0.5)
+    The overlap of the reference basis functions is validated and orthogonalized once, so that
+    repeated constructions of QUAO's and QUAMBO's (e.g. along a geometry scan or a trajectory) only
+    do the work that depends on the molecular orbitals.
+
+    Attributes
+    ----------
+    olp_aao_aao : np.ndarray(L, L)
+        Overlap of the reference basis functions.
+    olp_aao_aao_inv_sqrt : np.ndarray(L, L)
+        Inverse square root of the overlap of the reference basis functions.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks.
+        If None, the level set in `orbtools.validation` at the time of the call is used.
+
+    Examples
+    --------
+    >>> builder = QuasiAtomicBuilder(olp_aao_aao)
+    >>> for olp_ab_ab, olp_aao_ab, coeff_ab_mo in frames:
+    ...     coeff_ab_quao = builder.quao(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span)
+
+    """
+
+    def __init__(self, olp_aao_aao, validate=None):
+        """Initialize.
+
+        Parameters
+        ----------
+        olp_aao_aao : np.ndarray(L, L)
+            Overlap of the reference basis functions.
+        validate : {"full", "cheap", "off", None}
+            Level of the numerical checks.
+            Default is the level set in `orbtools.validation` at the time of each call.
+
+        Raises
+        ------
+        TypeError
+            If `olp_aao_aao` is not a two-dimensional square numpy array.
+        ValueError
+            If `olp_aao_aao` is not normalized, symmetric, or positive semidefinite.
+            If `validate` is not one of "full", "cheap", "off", or None.
+
+        """
+        level = validation.resolve_level(validate)
+        _check_input(olp_aao_aao=olp_aao_aao, validate=level)
+        self.olp_aao_aao = olp_aao_aao.copy()
+        self.olp_aao_aao.flags.writeable = False
+        self.olp_aao_aao_inv_sqrt = orth.power_symmetric(olp_aao_aao, -0.5, validate="off")
+        self.olp_aao_aao_inv_sqrt.flags.writeable = False
+        self.validate = validate
+        self._validated_olp_ab_ab = None
+
+    def _check_input(self, olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span):
+        """Check the inputs that change from call to call.
+
+        The numerical checks of the overlap of the atomic basis functions are skipped if an array
+        with the same content was checked at the same level in the previous call.
 
-    return coeff_ab_mmo.dot(coeff_mmo_proj)
+        Parameters
+        ----------
+        olp_ab_ab : np.ndarray(K, K)
+            Overlaps of the atomic basis functions.
+        olp_aao_ab : np.ndarray(L, K)
+            Overlaps of the reference basis functions with the atomic basis functions.
+        coeff_ab_mo : np.ndarray(K, M)
+            Transformation matrix from the atomic basis functions to molecular orbitals.
+        indices_span : np.ndarray(M)
+            Molecular orbitals that will be spanned exactly by the quasiatomic orbitals.
+
+        Returns
+        -------
+        level : str
+            Level of the numerical checks used for the call.
+
+        Raises
+        ------
+        TypeError
+            If any of the inputs is not of the correct type (see `_check_input`).
+        ValueError
+            If any of the inputs is not of the correct shape or value (see `_check_input`).
+
+        """
+        level = validation.resolve_level(self.validate)
+        _check_input(
+            olp_ab_ab=olp_ab_ab,
+            olp_aao_ab=olp_aao_ab,
+            olp_aao_aao=self.olp_aao_aao,
+            coeff_ab_mo=coeff_ab_mo,
+            indices_span=indices_span,
+            validate="off",
+        )
+        if level == "off":
+            return level
+        key = (level, fingerprint(olp_ab_ab))
+        if self._validated_olp_ab_ab != key:
+            _check_input(olp_ab_ab=olp_ab_ab, validate=level)
+            self._validated_olp_ab_ab = key
+        memory_budget = blocking.resolve_memory_budget(None, coeff_ab_mo, olp_ab_ab)
+        if not validation.is_normalized(coeff_ab_mo, olp_ab_ab, level, memory_budget=memory_budget):
+            raise ValueError(
+                "The overlap of the molecular orbitals, calculated from `coeff_ab_mo` and "
+                "`olp_ab_ab` is not normalized."
+            )
+        return level
+
+    def quao(self, olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span, dim=None, svd_method=None):
+        """Return transformation matrix from atomic basis functions to QUAO's.
+
+        Parameters
+        ----------
+        olp_ab_ab : np.ndarray(K, K)
+            Overlaps of the atomic basis functions.
+        olp_aao_ab : np.ndarray(L, K)
+            Overlaps of the reference basis functions with the atomic basis functions.
+        coeff_ab_mo : np.ndarray(K, M)
+            Transformation matrix from the atomic basis functions to molecular orbitals.
+        indices_span : np.ndarray(M)
+            Molecular orbitals that will be spanned exactly by the QUAO's.
+        dim : {int, None}
+            Number of QUAO basis functions.
+            Default is the number of reference basis functions.
+        svd_method : {None, "randomized", "lanczos"}
+            Algorithm used to compute the right singular vectors in `make_mmo`.
+
+        Returns
+        -------
+        coeff_ab_quao : np.ndarray(K, L)
+            Transformation matrix from atomic basis functions to QUAO's.
+
+        Raises
+        ------
+        TypeError
+            If any of the inputs is not of the correct type (see `quao`).
+        ValueError
+            If any of the inputs is not of the correct shape or value (see `quao`).
+
+        """
+        level = self._check_input(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span)
+        coeff_ab_mmo = make_mmo(
+            self.olp_aao_aao_inv_sqrt.dot(olp_aao_ab),
+            coeff_ab_mo,
+            indices_span,
+            dim_mmo=dim,
+            validate=level,
+            svd_method=svd_method,
+        )
+        return _project_aao(olp_ab_ab, olp_aao_ab, coeff_ab_mmo, level)
+
+    def quambo(self, olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span, dim=None, svd_method=None):
+        """Return transformation matrix from atomic basis functions to QUAMBO's.
+
+        Parameters
+        ----------
+        olp_ab_ab : np.ndarray(K, K)
+            Overlaps of the atomic basis functions.
+        olp_aao_ab : np.ndarray(L, K)
+            Overlaps of the reference basis functions with the atomic basis functions.
+        coeff_ab_mo : np.ndarray(K, M)
+            Transformation matrix from the atomic basis functions to molecular orbitals.
+        indices_span : np.ndarray(M)
+            Molecular orbitals that will be spanned exactly by the QUAMBO's.
+        dim : {int, None}
+            Number of QUAMBO basis functions.
+            Default is the number of reference basis functions.
+        svd_method : {None, "randomized", "lanczos"}
+            Algorithm used to compute the right singular vectors in `make_mmo`.
+
+        Returns
+        -------
+        coeff_ab_quambo : np.ndarray(K, L)
+            Transformation matrix from atomic basis functions to QUAMBO's.
+
+        Raises
+        ------
+        TypeError
+            If any of the inputs is not of the correct type (see `quambo`).
+        ValueError
+            If any of the inputs is not of the correct shape or value (see `quambo`).
+
+        """
+        level = self._check_input(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span)
+        coeff_ab_mmo = make_mmo(
+            olp_aao_ab,
+            coeff_ab_mo,
+            indices_span,
+            dim_mmo=dim,
+            validate=level,
+            svd_method=svd_method,
+        )
+        return _project_aao(olp_ab_ab, olp_aao_ab, coeff_ab_mmo, level)
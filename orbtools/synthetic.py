@@ -0,0 +1,486 @@
+r"""Synthetic systems for scaling studies.
+
+Large inputs are generated without a quantum chemistry calculation, so that the cost of the
+analyses can be measured for any number of atoms and basis functions.
+
+The atoms sit near the points of a simple cubic lattice. Each atom has normalized s-type Gaussian
+basis functions whose exponents form an even-tempered series, so that the overlaps are positive
+definite, spatially local (they decay with the distance between the atoms), and well conditioned.
+The reference basis functions (AAO's) are a minimal set of s-type Gaussians of each atom that are
+similar to (but not in the span of) the atomic basis functions.
+
+The molecular orbitals are the eigenvectors of an extended Hückel Hamiltonian with the
+Wolfsberg-Helmholz approximation,
+
+.. math::
+
+    H_{ij} = \frac{k}{2} (\epsilon_i + \epsilon_j) S_{ij}
+
+where the valence functions (the ones the reference basis functions are derived from) have lower
+on-site energies :math:`\epsilon_i` than the others. The orbitals are obtained from the generalized
+eigenvalue problem :math:`H C = S C E`, so they are orthonormal with respect to the overlap, and
+the occupied orbitals lie mostly in the space of the reference basis functions.
+
+Examples
+--------
+>>> system = make_system(500, ab_per_atom=10, seed=0)
+>>> quao(
+...     system["olp_ab_ab"],
+...     system["olp_aao_ab"],
+...     system["olp_aao_aao"],
+...     system["coeff_ab_mo"],
+...     system["indices_span"],
+... )
+>>> print(format_scaling_report(scaling_report([500, 1000, 2000])))
+
+"""
+import numpy as np
+from orbtools import tracing
+from orbtools.mulliken import lowdin_populations, mulliken_populations
+from orbtools.quasi import quambo, quao
+import scipy.linalg
+
+# Constant of the Wolfsberg-Helmholz approximation
+WOLFSBERG_HELMHOLZ_CONSTANT = 1.75
+# Smallest exponent and ratio of the consecutive exponents of the atomic basis functions
+MIN_EXPONENT = 0.3
+EXPONENT_RATIO = 2.5
+# Ratio of the exponents of the reference basis functions and of the valence functions
+AAO_EXPONENT_SCALE = 1.3
+# On-site energies of the valence and of the other atomic basis functions
+VALENCE_ENERGY = -1.0
+OTHER_ENERGY = -0.3
+ENERGY_SPREAD = 0.05
+
+REPORT_ANALYSES = ("quao", "quambo", "mulliken_populations", "lowdin_populations")
+REPORT_TARGETS = (10000, 20000, 50000)
+
+
+def _check_positive_int(value, name):
+    """Check that the given value is a positive integer.
+
+    Parameters
+    ----------
+    value : int
+        Value.
+    name : str
+        Name of the value in the error message.
+
+    Raises
+    ------
+    TypeError
+        If `value` is not a positive integer.
+
+    """
+    if not (isinstance(value, (int, np.integer)) and not isinstance(value, bool) and value > 0):
+        raise TypeError("`{0}` must be a positive integer.".format(name))
+
+
+def gaussian_overlap(exponents_one, centers_one, exponents_two, centers_two):
+    r"""Return the overlap of normalized s-type Gaussians.
+
+    .. math::
+
+        \braket{g_i | g_j} = \left( \frac{2 \sqrt{\alpha_i \alpha_j}}{\alpha_i + \alpha_j}
+        \right)^{3/2} \exp \left( -\frac{\alpha_i \alpha_j}{\alpha_i + \alpha_j}
+        |\mathbf{R}_i - \mathbf{R}_j|^2 \right)
+
+    Parameters
+    ----------
+    exponents_one : np.ndarray(N,)
+        Exponents of the first set of Gaussians.
+    centers_one : np.ndarray(N, 3)
+        Centers of the first set of Gaussians.
+    exponents_two : np.ndarray(M,)
+        Exponents of the second set of Gaussians.
+    centers_two : np.ndarray(M, 3)
+        Centers of the second set of Gaussians.
+
+    Returns
+    -------
+    olp : np.ndarray(N, M)
+        Overlap of the Gaussians of the first set (rows) with the Gaussians of the second set
+        (columns).
+
+    """
+    # NOTE: squared distances are summed over the coordinates (rather than expanded as
+    # |a|^2 + |b|^2 - 2 a.b) so that Gaussians on the same center are exactly normalized
+    distances = np.zeros((exponents_one.size, exponents_two.size))
+    for axis in range(3):
+        distances += (centers_one[:, None, axis] - centers_two[None, :, axis]) ** 2
+    sums = exponents_one[:, None] + exponents_two[None, :]
+    products = exponents_one[:, None] * exponents_two[None, :]
+    olp = (2 * np.sqrt(products) / sums) ** 1.5
+    olp *= np.exp(-products / sums * distances)
+    return olp
+
+
+def make_system(
+    num_atoms, ab_per_atom=10, aao_per_atom=5, num_occupied=None, seed=None, atom_coords=None
+):
+    """Return the inputs of the analyses of a synthetic system.
+
+    Parameters
+    ----------
+    num_atoms : int
+        Number of atoms.
+    ab_per_atom : {10, int}
+        Number of atomic basis functions of each atom.
+    aao_per_atom : {5, int}
+        Number of reference basis functions of each atom.
+    num_occupied : {int, None}
+        Number of (doubly) occupied molecular orbitals.
+        Default is half the number of reference basis functions.
+    seed : {int, None}
+        Seed of the random positions of the atoms and on-site energies.
+    atom_coords : {np.ndarray(A, 3), None}
+        Positions of the atoms (e.g. a frame of a trajectory).
+        Default places the atoms near the points of a simple cubic lattice. The on-site energies
+        depend only on the seed, so frames made with the same seed are the same system.
+
+    Returns
+    -------
+    system : dict
+        Inputs of the analyses:
+
+        - "olp_ab_ab" : np.ndarray(K, K), overlap of the atomic basis functions;
+        - "olp_aao_ab" : np.ndarray(L, K), overlap of the reference and atomic basis functions;
+        - "olp_aao_aao" : np.ndarray(L, L), overlap of the reference basis functions;
+        - "coeff_ab_mo" : np.ndarray(K, K), molecular orbitals (orthonormal with respect to the
+          overlap), sorted by energy;
+        - "mo_energies" : np.ndarray(K,), energies of the molecular orbitals;
+        - "occupations" : np.ndarray(K,), occupations of the molecular orbitals;
+        - "indices_span" : np.ndarray(K,), boolean indices of the occupied molecular orbitals;
+        - "num_atoms" : int, number of atoms;
+        - "ab_atom_indices" : np.ndarray(K,), atom of each atomic basis function;
+        - "aao_atom_indices" : np.ndarray(L,), atom of each reference basis function;
+        - "atom_coords" : np.ndarray(A, 3), positions of the atoms.
+
+    Raises
+    ------
+    TypeError
+        If `num_atoms`, `ab_per_atom`, `aao_per_atom`, or `num_occupied` is not a positive integer.
+        If `atom_coords` is not a numpy array (or None).
+    ValueError
+        If `aao_per_atom` is greater than `ab_per_atom`.
+        If `num_occupied` is greater than the number of reference basis functions.
+        If `atom_coords` does not have the shape (`num_atoms`, 3).
+
+    """
+    _check_positive_int(num_atoms, "num_atoms")
+    _check_positive_int(ab_per_atom, "ab_per_atom")
+    _check_positive_int(aao_per_atom, "aao_per_atom")
+    if aao_per_atom > ab_per_atom:
+        raise ValueError("`aao_per_atom` must be less than or equal to `ab_per_atom`.")
+    num_aao = num_atoms * aao_per_atom
+    if num_occupied is None:
+        num_occupied = max(num_aao // 2, 1)
+    _check_positive_int(num_occupied, "num_occupied")
+    if num_occupied > num_aao:
+        raise ValueError(
+            "Number of occupied orbitals must be less than or equal to the number of reference "
+            "basis functions, {0}.".format(num_aao)
+        )
+    if not (atom_coords is None or isinstance(atom_coords, np.ndarray)):
+        raise TypeError("`atom_coords` must be a numpy array (or None).")
+    if atom_coords is not None and atom_coords.shape != (num_atoms, 3):
+        raise ValueError("`atom_coords` must have the shape ({0}, 3).".format(num_atoms))
+    rng = np.random.default_rng(seed)
+
+    # atoms near the points of a simple cubic lattice (in bohr)
+    side = int(np.ceil(num_atoms ** (1 / 3) - 1e-9))
+    lattice = np.indices((side, side, side)).reshape(3, -1).T[:num_atoms] * 2.5
+    # NOTE: the offsets are drawn even if the positions are given, so that the on-site energies
+    # only depend on the seed
+    offsets = 0.25 * rng.standard_normal(lattice.shape)
+    if atom_coords is None:
+        atom_coords = lattice + offsets
+    atom_coords = np.array(atom_coords, dtype=float)
+
+    ab_atom_indices = np.repeat(np.arange(num_atoms), ab_per_atom)
+    ab_order = np.tile(np.arange(ab_per_atom), num_atoms)
+    ab_exponents = MIN_EXPONENT * EXPONENT_RATIO ** ab_order
+    # valence functions are spread over the exponents of each atom
+    valence = np.round(np.linspace(0, ab_per_atom - 1, aao_per_atom)).astype(int)
+    aao_atom_indices = np.repeat(np.arange(num_atoms), aao_per_atom)
+    aao_exponents = (
+        AAO_EXPONENT_SCALE * MIN_EXPONENT * EXPONENT_RATIO ** np.tile(valence, num_atoms)
+    )
+
+    ab_centers = atom_coords[ab_atom_indices]
+    aao_centers = atom_coords[aao_atom_indices]
+    olp_ab_ab = gaussian_overlap(ab_exponents, ab_centers, ab_exponents, ab_centers)
+    olp_aao_ab = gaussian_overlap(aao_exponents, aao_centers, ab_exponents, ab_centers)
+    olp_aao_aao = gaussian_overlap(aao_exponents, aao_centers, aao_exponents, aao_centers)
+
+    energies = np.where(np.isin(ab_order, valence), VALENCE_ENERGY, OTHER_ENERGY)
+    energies += ENERGY_SPREAD * rng.standard_normal(energies.size)
+    hamiltonian = (WOLFSBERG_HELMHOLZ_CONSTANT / 2) * (energies[:, None] + energies[None, :])
+    hamiltonian *= olp_ab_ab
+    hamiltonian[np.diag_indices_from(hamiltonian)] = energies
+    mo_energies, coeff_ab_mo = scipy.linalg.eigh(
+        hamiltonian, olp_ab_ab, overwrite_a=True, check_finite=False
+    )
+
+    occupations = np.zeros(mo_energies.size)
+    occupations[:num_occupied] = 2
+    return {
+        "olp_ab_ab": olp_ab_ab,
+        "olp_aao_ab": olp_aao_ab,
+        "olp_aao_aao": olp_aao_aao,
+        "coeff_ab_mo": coeff_ab_mo,
+        "mo_energies": mo_energies,
+        "occupations": occupations,
+        "indices_span": occupations > 0,
+        "num_atoms": num_atoms,
+        "ab_atom_indices": ab_atom_indices,
+        "aao_atom_indices": aao_atom_indices,
+        "atom_coords": atom_coords,
+    }
+
+
+def _run_analysis(analysis, system, validate=None):
+    """Run one of the analyses of the scaling report on the given system."""
+    if analysis == "quao":
+        return quao(
+            system["olp_ab_ab"],
+            system["olp_aao_ab"],
+            system["olp_aao_aao"],
+            system["coeff_ab_mo"],
+            system["indices_span"],
+            validate=validate,
+        )
+    if analysis == "quambo":
+        return quambo(
+            system["olp_ab_ab"],
+            system["olp_aao_ab"],
+            system["coeff_ab_mo"],
+            system["indices_span"],
+            validate=validate,
+        )
+    func = {"mulliken_populations": mulliken_populations, "lowdin_populations": lowdin_populations}
+    return func[analysis](
+        system["coeff_ab_mo"],
+        system["occupations"],
+        system["olp_ab_ab"],
+        system["num_atoms"],
+        system["ab_atom_indices"],
+        validate=validate,
+    )
+
+
+def _fit_power_law(sizes, values):
+    """Return the prefactor and exponent of the power law that fits the given values best.
+
+    The fit is a linear least squares fit of the logarithms, :math:`\\log y = \\log c + p \\log K`.
+
+    Parameters
+    ----------
+    sizes : np.ndarray
+        Sizes.
+    values : np.ndarray
+        Values for each size.
+
+    Returns
+    -------
+    fit : {tuple of float, None}
+        Prefactor and exponent of the power law.
+        None if there are fewer than two distinct sizes with positive values.
+
+    """
+    sizes = np.asarray(sizes, dtype=float)
+    values = np.asarray(values, dtype=float)
+    mask = (sizes > 0) & (values > 0)
+    if np.unique(sizes[mask]).size < 2:
+        return None
+    exponent, log_prefactor = np.polyfit(np.log(sizes[mask]), np.log(values[mask]), 1)
+    return float(np.exp(log_prefactor)), float(exponent)
+
+
+def scaling_report(
+    sizes,
+    ab_per_atom=10,
+    aao_per_atom=5,
+    analyses=REPORT_ANALYSES,
+    targets=REPORT_TARGETS,
+    validate=None,
+    seed=0,
+):
+    """Return the wall time and peak memory of the analyses of synthetic systems of each size.
+
+    Each analysis is run once on each system, with the stages traced by `orbtools.tracing`. The
+    wall times and peak memories are fit to power laws of the number of atomic basis functions and
+    extrapolated to the target sizes.
+
+    Parameters
+    ----------
+    sizes : list of int
+        Numbers of atomic basis functions (K) of the systems.
+    ab_per_atom : {10, int}
+        Number of atomic basis functions of each atom.
+        The number of atoms of each system is `size // ab_per_atom`.
+    aao_per_atom : {5, int}
+        Number of reference basis functions of each atom.
+    analyses : {tuple of str, list of str}
+        Analyses that are measured ("quao", "quambo", "mulliken_populations",
+        "lowdin_populations").
+    targets : {tuple of int, list of int}
+        Numbers of atomic basis functions to which the measurements are extrapolated.
+    validate : {"full", "cheap", "off", None}
+        Level of the numerical checks of the analyses.
+        Default is the level set in `orbtools.validation`.
+    seed : {0, int, None}
+        Seed of the synthetic systems.
+
+    Returns
+    -------
+    report : dict
+        - "records" : list of dict, with the analysis ("analysis"), numbers of atomic basis
+          functions ("num_ab"), molecular orbitals ("num_mo"), atoms ("num_atoms"), and reference
+          basis functions ("num_aao"), the memory of the inputs ("input_bytes"), the wall time in
+          seconds ("time"), the peak of the memory allocated by the analysis in bytes
+          ("peak_bytes"), and the wall time and peak memory of each stage ("stages").
+        - "fits" : dict of str to dict, with the prefactor and exponent of the power laws of the
+          wall time ("time") and peak memory ("peak_bytes") of each analysis (None if fewer than
+          two sizes were measured).
+        - "extrapolations" : list of dict, with the extrapolated wall time ("time") and peak
+          memory ("peak_bytes") of each analysis ("analysis") at each target size ("num_ab").
+
+    Raises
+    ------
+    ValueError
+        If an analysis is not one of `REPORT_ANALYSES`.
+
+    """
+    for analysis in analyses:
+        if analysis not in REPORT_ANALYSES:
+            raise ValueError("Analysis must be one of {0}.".format(", ".join(REPORT_ANALYSES)))
+    records = []
+    for size in sizes:
+        _check_positive_int(size, "sizes")
+        system = make_system(
+            max(size // ab_per_atom, 1),
+            ab_per_atom=ab_per_atom,
+            aao_per_atom=aao_per_atom,
+            seed=seed,
+        )
+        input_bytes = sum(
+            value.nbytes
+            for key, value in system.items()
+            if key.startswith(("olp_", "coeff_")) and isinstance(value, np.ndarray)
+        )
+        for analysis in analyses:
+            with tracing.trace(memory=True) as spans:
+                _run_analysis(analysis, system, validate=validate)
+            top = [record for record in spans if record.depth == 0 and record.name == analysis][-1]
+            stages = tracing.summary([record for record in spans if record is not top])
+            records.append(
+                {
+                    "analysis": analysis,
+                    "num_ab": system["olp_ab_ab"].shape[0],
+                    "num_mo": system["coeff_ab_mo"].shape[1],
+                    "num_atoms": system["num_atoms"],
+                    "num_aao": system["olp_aao_aao"].shape[0],
+                    "input_bytes": input_bytes,
+                    "time": top.duration,
+                    "peak_bytes": top.peak_bytes,
+                    "stages": {
+                        name: {"time": entry["total_time"], "peak_bytes": entry["peak_bytes"]}
+                        for name, entry in stages.items()
+                    },
+                }
+            )
+
+    fits = {}
+    extrapolations = []
+    for analysis in analyses:
+        measured = [record for record in records if record["analysis"] == analysis]
+        num_ab = [record["num_ab"] for record in measured]
+        fits[analysis] = {
+            key: _fit_power_law(num_ab, [record[key] for record in measured])
+            for key in ["time", "peak_bytes"]
+        }
+        for target in targets:
+            extrapolation = {"analysis": analysis, "num_ab": target}
+            for key, fit in fits[analysis].items():
+                extrapolation[key] = None if fit is None else fit[0] * target ** fit[1]
+            extrapolations.append(extrapolation)
+    return {"records": records, "fits": fits, "extrapolations": extrapolations}
+
+
+def _format_bytes(num_bytes):
+    """Return the given number of bytes in a readable unit."""
+    if num_bytes is None:
+        return "-"
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if abs(num_bytes) < 1024:
+            return "{0:.1f} {1}".format(num_bytes, unit)
+        num_bytes /= 1024
+    return "{0:.1f} TiB".format(num_bytes)
+
+
+def _format_time(seconds):
+    """Return the given wall time in a readable unit."""
+    if seconds is None:
+        return "-"
+    if seconds < 120:
+        return "{0:.3g} s".format(seconds)
+    if seconds < 7200:
+        return "{0:.3g} min".format(seconds / 60)
+    return "{0:.3g} h".format(seconds / 3600)
+
+
+def format_scaling_report(report):
+    """Return the given scaling report as a table.
+
+    Parameters
+    ----------
+    report : dict
+        Output of `scaling_report`.
+
+    Returns
+    -------
+    table : str
+        Measured and extrapolated wall times and peak memories of each analysis, and the fitted
+        exponents of their power laws.
+
+    """
+    header = "{0:<22}{1:>8}{2:>8}{3:>8}{4:>8}{5:>12}{6:>14}{7:>14}".format(
+        "analysis", "K", "M", "A", "L", "time", "peak memory", "inputs"
+    )
+    lines = ["Measured", header]
+    for record in report["records"]:
+        lines.append(
+            "{0:<22}{1:>8}{2:>8}{3:>8}{4:>8}{5:>12}{6:>14}{7:>14}".format(
+                record["analysis"],
+                record["num_ab"],
+                record["num_mo"],
+                record["num_atoms"],
+                record["num_aao"],
+                _format_time(record["time"]),
+                _format_bytes(record["peak_bytes"]),
+                _format_bytes(record["input_bytes"]),
+            )
+        )
+    lines += ["", "Fitted power laws (value = c K^p)"]
+    for analysis, fits in report["fits"].items():
+        exponents = [
+            "{0} p = {1}".format(key, "-" if fit is None else "{0:.2f}".format(fit[1]))
+            for key, fit in fits.items()
+        ]
+        lines.append("{0:<22}{1}".format(analysis, ", ".join(exponents)))
+    lines += [
+        "",
+        "Extrapolated",
+        "{0:<22}{1:>8}{2:>12}{3:>14}".format("analysis", "K", "time", "peak memory"),
+    ]
+    for extrapolation in report["extrapolations"]:
+        lines.append(
+            "{0:<22}{1:>8}{2:>12}{3:>14}".format(
+                extrapolation["analysis"],
+                extrapolation["num_ab"],
+                _format_time(extrapolation["time"]),
+                _format_bytes(extrapolation["peak_bytes"]),
+            )
+        )
+    return "\n".join(lines)
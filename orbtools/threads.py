@@ -0,0 +1,206 @@
+"""Number of threads used by BLAS/LAPACK.
+
+The heavy parts of orbtools (e.g. `power_symmetric`, `project`, `make_mmo`, and the density
+matrices) run through the BLAS/LAPACK libraries of numpy and scipy, which use all of the processors
+by default. When several analyses are run at the same time, the number of threads of each should be
+limited so that they do not oversubscribe the processors.
+
+The limits are set with `threadpoolctl` if it is installed. Otherwise, the OpenBLAS libraries that
+are bundled with numpy and scipy are controlled directly. If neither is possible, the environment
+variables are set instead, which only affects the libraries that are loaded (and the processes that
+are started) afterwards.
+
+Examples
+--------
+>>> with blas_threads(1):
+...     quao(olp_ab_ab, olp_aao_ab, olp_aao_aao, coeff_ab_mo, indices_span)
+
+"""
+from contextlib import contextmanager
+import ctypes
+import os
+
+# NOTE: the BLAS/LAPACK libraries of numpy and scipy are loaded with these modules
+import numpy.linalg  # noqa: F401 pylint: disable=W0611
+import scipy.linalg  # noqa: F401 pylint: disable=W0611
+
+try:
+    import threadpoolctl
+except ImportError:
+    threadpoolctl = None
+
+BLAS_THREAD_VARIABLES = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "BLIS_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+OPENBLAS_SYMBOLS = (
+    ("openblas_get_num_threads", "openblas_set_num_threads"),
+    ("openblas_get_num_threads64_", "openblas_set_num_threads64_"),
+    ("scipy_openblas_get_num_threads", "scipy_openblas_set_num_threads"),
+    ("scipy_openblas_get_num_threads64_", "scipy_openblas_set_num_threads64_"),
+)
+
+_openblas_functions = None
+
+
+def _check_num_threads(num_threads):
+    """Check the given number of threads.
+
+    Parameters
+    ----------
+    num_threads : int
+        Number of threads.
+
+    Raises
+    ------
+    TypeError
+        If `num_threads` is not a positive integer.
+
+    """
+    if not (isinstance(num_threads, int) and not isinstance(num_threads, bool) and num_threads > 0):
+        raise TypeError("Number of threads must be a positive integer.")
+
+
+def _openblas():
+    """Return the functions that get and set the number of threads of the loaded OpenBLAS.
+
+    The libraries are found in the memory map of the process (Linux only).
+
+    Returns
+    -------
+    functions : list of tuple of ctypes function
+        Functions that get and set the number of threads of each OpenBLAS library.
+
+    """
+    global _openblas_functions  # pylint: disable=W0603
+    if _openblas_functions is not None:
+        return _openblas_functions
+    paths = []
+    try:
+        with open("/proc/self/maps") as maps:
+            for line in maps:
+                path = line.split()[-1]
+                if "openblas" in os.path.basename(path).lower() and path not in paths:
+                    paths.append(path)
+    except OSError:
+        pass
+
+    _openblas_functions = []
+    for path in paths:
+        try:
+            library = ctypes.CDLL(path)
+        except OSError:
+            continue
+        for get_name, set_name in OPENBLAS_SYMBOLS:
+            if hasattr(library, get_name) and hasattr(library, set_name):
+                get_func = getattr(library, get_name)
+                get_func.restype = ctypes.c_int
+                set_func = getattr(library, set_name)
+                set_func.argtypes = [ctypes.c_int]
+                set_func.restype = None
+                _openblas_functions.append((get_func, set_func))
+                break
+    return _openblas_functions
+
+
+def get_blas_threads():
+    """Return the number of threads used by BLAS/LAPACK.
+
+    Returns
+    -------
+    num_threads : {int, None}
+        Largest number of threads used by the loaded BLAS/LAPACK libraries.
+        None if it cannot be determined.
+
+    """
+    if threadpoolctl is not None:
+        num_threads = [
+            info["num_threads"]
+            for info in threadpoolctl.threadpool_info()
+            if info["user_api"] == "blas"
+        ]
+        return max(num_threads) if num_threads else None
+    functions = _openblas()
+    if functions:
+        return max(get_func() for get_func, _ in functions)
+    value = os.environ.get("OPENBLAS_NUM_THREADS", os.environ.get("OMP_NUM_THREADS"))
+    return int(value) if value is not None and value.isdigit() else None
+
+
+def set_blas_threads(num_threads):
+    """Set the number of threads used by BLAS/LAPACK.
+
+    Parameters
+    ----------
+    num_threads : int
+        Number of threads.
+
+    Raises
+    ------
+    TypeError
+        If `num_threads` is not a positive integer.
+
+    Warns
+    -----
+    If neither `threadpoolctl` nor an OpenBLAS library is available, in which case only the
+    environment variables are set.
+
+    """
+    _check_num_threads(num_threads)
+    if threadpoolctl is not None:
+        threadpoolctl.threadpool_limits(limits=num_threads, user_api="blas")
+        return
+    functions = _openblas()
+    if functions:
+        for _, set_func in functions:
+            set_func(num_threads)
+        return
+    print(
+        "WARNING: Number of BLAS threads cannot be changed in this process (install threadpoolctl)."
+        " Only the environment variables are set, which affect libraries loaded afterwards and "
+        "new processes."
+    )
+    os.environ.update({name: str(num_threads) for name in BLAS_THREAD_VARIABLES})
+
+
+@contextmanager
+def blas_threads(num_threads):
+    """Temporarily set the number of threads used by BLAS/LAPACK.
+
+    The limit is global to the process (BLAS libraries do not have limits for each thread), so the
+    threads that run in the meantime are also limited.
+
+    Parameters
+    ----------
+    num_threads : {int, None}
+        Number of threads.
+        If None, the number of threads is not changed.
+
+    Raises
+    ------
+    TypeError
+        If `num_threads` is not a positive integer or None.
+
+    """
+    if num_threads is None:
+        yield
+        return
+    _check_num_threads(num_threads)
+    old_num_threads = get_blas_threads()
+    old_variables = {name: os.environ.get(name) for name in BLAS_THREAD_VARIABLES}
+    set_blas_threads(num_threads)
+    try:
+        yield
+    finally:
+        if threadpoolctl is not None or _openblas():
+            if old_num_threads is not None:
+                set_blas_threads(old_num_threads)
+        for name, value in old_variables.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
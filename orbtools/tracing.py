@@ -0,0 +1,511 @@
+"""Opt-in tracing of the stages of the analyses.
+
+The stages of the analyses in `quasi`, `orthogonalization`, and `mulliken` (e.g. the checks of the
+inputs, the orthogonalization of the AAO's, the SVD in `make_mmo`, and the inversion in `project`)
+are wrapped in named spans. When tracing is enabled, each span records its wall time, the shapes of
+its matrices, an estimate of its number of floating point operations, and (optionally) the peak of
+its temporary allocations. When tracing is disabled (default), a span costs a single check of a
+flag.
+
+The peak of the allocations is measured by `tracemalloc`, which counts the allocations of the whole
+process. Spans that overlap with spans of other threads (e.g. in `batch.run_batch` with threads
+or in `fragments` with several workers) would include the allocations of those threads, so their
+peaks are not recorded (None).
+
+Examples
+--------
+>>> with trace(memory=True) as spans:
+...     quao(olp_ab_ab, olp_aao_ab, olp_aao_aao, coeff_ab_mo, indices_span)
+>>> export_chrome_trace("quao.json", spans)  # open in chrome://tracing or Perfetto
+>>> summary(spans)["quao.make_mmo"]["total_time"]
+
+"""
+from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+Span = namedtuple(
+    "Span", ["name", "start", "duration", "shapes", "flops", "peak_bytes", "thread", "depth"]
+)
+Span.__doc__ = """Record of a stage of an analysis.
+
+Attributes
+----------
+name : str
+    Name of the stage.
+start : float
+    Time (in seconds) at which the stage started, relative to when tracing was enabled.
+duration : float
+    Wall time (in seconds) of the stage.
+shapes : dict of str to tuple
+    Shapes of the matrices of the stage.
+flops : {int, None}
+    Estimate of the number of floating point operations of the stage.
+peak_bytes : {int, None}
+    Peak of the memory allocated during the stage (in addition to the memory allocated before it).
+    None if the memory is not traced, or if the stage overlapped with stages of other threads.
+thread : int
+    Identifier of the thread that ran the stage.
+depth : int
+    Number of stages that enclose the stage.
+
+"""
+
+_enabled = False
+_memory = False
+_started_tracemalloc = False
+_origin = 0.0
+_spans = []
+_local = threading.local()
+# spans of all threads whose memory is traced, to find those that overlap across threads
+_memory_spans = []
+_memory_lock = threading.Lock()
+_NULL_SPAN = nullcontext()
+
+
+def matmul_flops(num_rows, num_inner, num_cols):
+    """Return the number of floating point operations of a matrix product.
+
+    Parameters
+    ----------
+    num_rows : int
+        Number of rows of the left matrix.
+    num_inner : int
+        Number of columns of the left matrix (rows of the right matrix).
+    num_cols : int
+        Number of columns of the right matrix.
+
+    Returns
+    -------
+    flops : int
+        Number of floating point operations.
+
+    """
+    return 2 * num_rows * num_inner * num_cols
+
+
+def eigh_flops(size):
+    """Return the approximate number of floating point operations of a symmetric eigendecomposition.
+
+    Parameters
+    ----------
+    size : int
+        Number of rows (and columns) of the matrix.
+
+    Returns
+    -------
+    flops : int
+        Number of floating point operations (eigenvalues and eigenvectors).
+
+    """
+    return 9 * size ** 3
+
+
+def svd_flops(num_rows, num_cols):
+    """Return the approximate number of floating point operations of a thin SVD.
+
+    Parameters
+    ----------
+    num_rows : int
+        Number of rows of the matrix.
+    num_cols : int
+        Number of columns of the matrix.
+
+    Returns
+    -------
+    flops : int
+        Number of floating point operations (singular values and both sets of singular vectors).
+
+    """
+    large, small = max(num_rows, num_cols), min(num_rows, num_cols)
+    return 6 * large * small ** 2 + 20 * small ** 3
+
+
+def cholesky_flops(size):
+    """Return the number of floating point operations of a Cholesky decomposition.
+
+    Parameters
+    ----------
+    size : int
+        Number of rows (and columns) of the matrix.
+
+    Returns
+    -------
+    flops : int
+        Number of floating point operations.
+
+    """
+    return size ** 3 // 3
+
+
+def is_enabled():
+    """Return whether tracing is enabled.
+
+    Returns
+    -------
+    enabled : bool
+        Whether the spans are recorded.
+
+    """
+    return _enabled
+
+
+def enable(memory=False):
+    """Enable tracing.
+
+    Parameters
+    ----------
+    memory : {False, True}
+        Whether the peaks of the memory allocated in each span are recorded (with `tracemalloc`,
+        which slows down the allocations).
+
+    """
+    global _enabled, _memory, _started_tracemalloc, _origin  # pylint: disable=W0603
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _started_tracemalloc = True
+    if not _enabled:
+        _origin = time.perf_counter()
+    _memory = memory
+    _enabled = True
+
+
+def disable():
+    """Disable tracing.
+
+    The recorded spans are kept until `clear` is called.
+
+    """
+    global _enabled, _memory, _started_tracemalloc  # pylint: disable=W0603
+    if _started_tracemalloc:
+        tracemalloc.stop()
+        _started_tracemalloc = False
+    _enabled = False
+    _memory = False
+
+
+def clear():
+    """Discard the recorded spans."""
+    del _spans[:]
+
+
+def get_spans():
+    """Return the recorded spans.
+
+    Returns
+    -------
+    spans : list of Span
+        Spans in the order in which they ended.
+
+    """
+    return list(_spans)
+
+
+@contextmanager
+def trace(memory=False):
+    """Record the spans of the analyses that are run within the context.
+
+    Parameters
+    ----------
+    memory : {False, True}
+        Whether the peaks of the memory allocated in each span are recorded.
+
+    Yields
+    ------
+    spans : list of Span
+        Spans recorded within the context (filled when the context is exited).
+
+    Notes
+    -----
+    The tracing state that precedes the context (e.g. of an enclosing `trace`) is restored when the
+    context is exited.
+
+    """
+    global _memory, _started_tracemalloc  # pylint: disable=W0603
+    was_enabled, was_memory, was_tracing = _enabled, _memory, tracemalloc.is_tracing()
+    num_spans = len(_spans)
+    spans = []
+    enable(memory=memory)
+    try:
+        yield spans
+    finally:
+        spans.extend(_spans[num_spans:])
+        if not was_enabled:
+            disable()
+        else:
+            _memory = was_memory
+            if _started_tracemalloc and not was_tracing:
+                tracemalloc.stop()
+                _started_tracemalloc = False
+
+
+def _shape(value):
+    """Return the shape of the given array (or the value itself, if it is not an array)."""
+    return tuple(value.shape) if isinstance(value, np.ndarray) else value
+
+
+class _Span:
+    """Span that is being recorded."""
+
+    __slots__ = ("name", "flops", "shapes", "start", "base", "peak", "depth", "thread", "shared")
+
+    def __init__(self, name, flops, shapes):
+        """Initialize.
+
+        Parameters
+        ----------
+        name : str
+            Name of the stage.
+        flops : {int, None}
+            Estimate of the number of floating point operations of the stage.
+        shapes : dict
+            Matrices (or their shapes) of the stage.
+
+        """
+        self.name = name
+        self.flops = flops
+        self.shapes = {key: _shape(value) for key, value in shapes.items()}
+        self.start = 0.0
+        self.base = 0
+        self.peak = 0
+        self.depth = 0
+        self.thread = threading.get_ident()
+        self.shared = False
+
+    def __enter__(self):
+        """Start recording the span."""
+        if not hasattr(_local, "stack"):
+            _local.stack = []
+        stack = _local.stack
+        if _memory:
+            with _memory_lock:
+                if any(other.thread != self.thread for other in _memory_spans):
+                    for other in _memory_spans:
+                        other.shared = True
+                    self.shared = True
+                _memory_spans.append(self)
+            # NOTE: the peak of tracemalloc is shared, so it is passed on to the enclosing spans
+            # before it is reset for this span
+            current, peak = tracemalloc.get_traced_memory()
+            for other in stack:
+                other.peak = max(other.peak, peak)
+            tracemalloc.reset_peak()
+            self.base = self.peak = current
+        self.depth = len(stack)
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        """Stop recording the span."""
+        end = time.perf_counter()
+        stack = _local.stack
+        stack.pop()
+        peak_bytes = None
+        traced_memory = False
+        if _memory_spans:
+            with _memory_lock:
+                traced_memory = self in _memory_spans
+                if traced_memory:
+                    _memory_spans.remove(self)
+        if traced_memory and tracemalloc.is_tracing():
+            peak = tracemalloc.get_traced_memory()[1]
+            for other in stack:
+                other.peak = max(other.peak, peak)
+            self.peak = max(self.peak, peak)
+            tracemalloc.reset_peak()
+            if not self.shared:
+                peak_bytes = self.peak - self.base
+        _spans.append(
+            Span(
+                self.name,
+                self.start - _origin,
+                end - self.start,
+                self.shapes,
+                self.flops,
+                peak_bytes,
+                self.thread,
+                self.depth,
+            )
+        )
+        return False
+
+
+def span(name, flops=None, **shapes):
+    """Return the context that records a stage of an analysis.
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage.
+    flops : {int, None}
+        Estimate of the number of floating point operations of the stage.
+    shapes : dict of str to np.ndarray
+        Matrices of the stage, whose shapes are recorded.
+
+    Returns
+    -------
+    context : context manager
+        Context that records the span if tracing is enabled, and does nothing otherwise.
+
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, flops, shapes)
+
+
+def traced(name, flops=None):
+    """Return the decorator that records each call of a function as a span.
+
+    The shapes of the arrays given to the function are recorded.
+
+    Parameters
+    ----------
+    name : str
+        Name of the span.
+    flops : {callable, None}
+        Function of the arguments of the decorated function that returns an estimate of its number
+        of floating point operations (or None if it is not known in advance).
+
+    Returns
+    -------
+    decorator : callable
+        Decorator.
+
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            # NOTE: invalid arguments are reported by the function itself
+            try:
+                arguments = signature.bind(*args, **kwargs).arguments
+                num_flops = None if flops is None else flops(*args, **kwargs)
+                num_flops = None if num_flops is None else int(num_flops)
+            except Exception:  # pylint: disable=W0703
+                arguments, num_flops = {}, None
+            shapes = {
+                key: value for key, value in arguments.items() if isinstance(value, np.ndarray)
+            }
+            with _Span(name, num_flops, shapes):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def summary(spans=None):
+    """Return the summary of the spans of each stage.
+
+    Parameters
+    ----------
+    spans : {list of Span, None}
+        Spans that are summarized.
+        Default is all of the recorded spans.
+
+    Returns
+    -------
+    summary : dict of str to dict
+        Number of calls ("count"), total and mean wall times ("total_time", "mean_time"), total
+        number of floating point operations ("flops"), and the largest peak of the allocated
+        memory ("peak_bytes") of each stage.
+
+    """
+    spans = get_spans() if spans is None else spans
+    output = {}
+    for record in spans:
+        entry = output.setdefault(
+            record.name,
+            {"count": 0, "total_time": 0.0, "mean_time": 0.0, "flops": None, "peak_bytes": None},
+        )
+        entry["count"] += 1
+        entry["total_time"] += record.duration
+        entry["mean_time"] = entry["total_time"] / entry["count"]
+        if record.flops is not None:
+            entry["flops"] = (entry["flops"] or 0) + record.flops
+        if record.peak_bytes is not None:
+            entry["peak_bytes"] = max(entry["peak_bytes"] or 0, record.peak_bytes)
+    return output
+
+
+def _jsonable(value):
+    """Return the given value with numpy scalars and tuples converted for JSON."""
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def export_chrome_trace(filename, spans=None):
+    """Write the spans in the Trace Event Format (chrome://tracing, Perfetto).
+
+    Parameters
+    ----------
+    filename : str
+        Name of the JSON file.
+    spans : {list of Span, None}
+        Spans that are written.
+        Default is all of the recorded spans.
+
+    """
+    spans = get_spans() if spans is None else spans
+    pid = os.getpid()
+    events = [
+        {
+            "name": record.name,
+            "cat": record.name.split(".")[0],
+            "ph": "X",
+            "ts": record.start * 1e6,
+            "dur": record.duration * 1e6,
+            "pid": pid,
+            "tid": record.thread,
+            "args": _jsonable(
+                {"shapes": record.shapes, "flops": record.flops, "peak_bytes": record.peak_bytes}
+            ),
+        }
+        for record in spans
+    ]
+    with open(filename, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+
+def export_json(filename, spans=None):
+    """Write the spans and their summary as JSON.
+
+    Parameters
+    ----------
+    filename : str
+        Name of the JSON file.
+    spans : {list of Span, None}
+        Spans that are written.
+        Default is all of the recorded spans.
+
+    """
+    spans = get_spans() if spans is None else spans
+    with open(filename, "w") as f:
+        json.dump(
+            _jsonable(
+                {
+                    "spans": [record._asdict() for record in spans],
+                    "summary": summary(spans),
+                }
+            ),
+            f,
+            indent=2,
+        )
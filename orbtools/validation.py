@@ -0,0 +1,244 @@
+"""Levels of the numerical checks of the inputs.
+
+The inputs of orbtools are checked for their type and shape, which is cheap, and for numerical
+properties (e.g. symmetry, positive semidefiniteness, normalization), which can cost as much as the
+analysis itself. The level of the numerical checks can be set for the whole package or for a single
+call (with the keyword argument `validate`):
+
+- "full" : all properties are checked exactly.
+- "cheap" : symmetry and normalization of the orbitals are checked with a few random probe vectors
+  (quadratic cost), and positive semidefiniteness with a Cholesky decomposition instead of an
+  eigendecomposition.
+- "off" : numerical properties are not checked.
+
+The level of the checks never changes the results of the analyses.
+
+"""
+from contextlib import contextmanager
+
+import numpy as np
+from orbtools.blocking import row_blocks
+
+LEVELS = ("full", "cheap", "off")
+NUM_PROBES = 4
+
+_global_level = "full"
+
+
+def get_validation_level():
+    """Return the level of the numerical checks used by orbtools.
+
+    Returns
+    -------
+    level : str
+        One of "full", "cheap", or "off".
+
+    """
+    return _global_level
+
+
+def set_validation_level(level):
+    """Set the level of the numerical checks used by orbtools.
+
+    Parameters
+    ----------
+    level : str
+        One of "full", "cheap", or "off".
+
+    Raises
+    ------
+    ValueError
+        If `level` is not one of "full", "cheap", or "off".
+
+    """
+    global _global_level  # pylint: disable=W0603
+    _global_level = resolve_level(level)
+
+
+@contextmanager
+def validation_level(level):
+    """Temporarily set the level of the numerical checks used by orbtools.
+
+    Parameters
+    ----------
+    level : str
+        One of "full", "cheap", or "off".
+
+    Raises
+    ------
+    ValueError
+        If `level` is not one of "full", "cheap", or "off".
+
+    Examples
+    --------
+    >>> with validation_level("cheap"):
+    ...     quao(olp_ab_ab, olp_aao_ab, olp_aao_aao, coeff_ab_mo, indices_span)
+
+    """
+    old_level = get_validation_level()
+    set_validation_level(level)
+    try:
+        yield
+    finally:
+        set_validation_level(old_level)
+
+
+def resolve_level(validate):
+    """Return the level of the numerical checks for a call.
+
+    Parameters
+    ----------
+    validate : {str, None}
+        Level of the numerical checks given to the call.
+        If None, the level set for the package is used.
+
+    Returns
+    -------
+    level : str
+        One of "full", "cheap", or "off".
+
+    Raises
+    ------
+    ValueError
+        If `validate` is not one of "full", "cheap", "off", or None.
+
+    """
+    if validate is None:
+        return _global_level
+    if validate not in LEVELS:
+        raise ValueError(
+            "Level of the numerical checks must be one of {0} (or None).".format(", ".join(LEVELS))
+        )
+    return validate
+
+
+def _probes(size, dtype=float):
+    """Return the random probe vectors used by the cheap checks.
+
+    The same probe vectors are always used, so that the checks are reproducible.
+
+    Parameters
+    ----------
+    size : int
+        Number of entries in each probe vector.
+    dtype : {float, np.dtype}
+        Data type of the probe vectors.
+
+    Returns
+    -------
+    probes : np.ndarray(size, NUM_PROBES)
+        Probe vectors whose entries are -1 or 1.
+
+    """
+    rng = np.random.default_rng(size)
+    return rng.choice([-1.0, 1.0], size=(size, NUM_PROBES)).astype(dtype)
+
+
+def is_hermitian(matrix, level="full", memory_budget=None):
+    """Check if the given matrix (or stack of matrices) is Hermitian.
+
+    Parameters
+    ----------
+    matrix : np.ndarray(..., N, N)
+        Square matrix or a stack of square matrices.
+    level : {"full", "cheap", "off"}
+        Level of the check.
+    memory_budget : {int, None}
+        Number of bytes that the temporary arrays of the full check may use.
+        Default is to compare the whole matrix at once.
+
+    Returns
+    -------
+    is_hermitian : bool
+        True if the matrix is Hermitian (or if the check is turned off).
+
+    """
+    if level == "off":
+        return True
+    if level == "full" and memory_budget is not None:
+        # NOTE: square tiles are compared with their transposes, so that both are read from a few
+        # contiguous rows (memory-mapped matrices are read about twice instead of once per block)
+        size = matrix.shape[-1]
+        entry_nbytes = 3 * int(np.prod(matrix.shape[:-2])) * matrix.itemsize
+        tile_size = max(int(np.sqrt(memory_budget / entry_nbytes)), 1)
+        blocks = row_blocks(size, tile_size, tile_size ** 2)
+        return all(
+            np.allclose(
+                matrix[..., rows, cols], np.swapaxes(matrix[..., cols, rows], -1, -2).conjugate()
+            )
+            for i, rows in enumerate(blocks)
+            for cols in blocks[i:]
+        )
+    matrix_dagger = np.swapaxes(matrix, -1, -2).conjugate()
+    if level == "full":
+        return np.allclose(matrix, matrix_dagger)
+    size = matrix.shape[-1]
+    probes = _probes(size, np.result_type(matrix.dtype, float))
+    # NOTE: each entry of the product is a sum of `size` terms, so the tolerance is scaled
+    return np.allclose(
+        np.matmul(matrix, probes), np.matmul(matrix_dagger, probes), atol=1e-8 * np.sqrt(size)
+    )
+
+
+def is_positive_semidefinite_cholesky(matrix, threshold=1e-9):
+    """Check if the given symmetric matrix is positive semidefinite using a Cholesky decomposition.
+
+    The matrix is shifted by the threshold so that the eigenvalues that are greater than the
+    negative of the threshold are accepted, as in the check with the eigendecomposition.
+
+    Parameters
+    ----------
+    matrix : np.ndarray(N, N)
+        Symmetric matrix.
+    threshold : {1e-9, float}
+        Eigenvalues greater than or equal to the negative of the threshold are accepted.
+
+    Returns
+    -------
+    is_positive_semidefinite : bool
+        True if the Cholesky decomposition of the shifted matrix succeeds.
+
+    """
+    shift = threshold * max(1.0, np.max(np.abs(np.diag(matrix)), initial=0))
+    try:
+        np.linalg.cholesky(matrix + shift * np.identity(matrix.shape[0]))
+    except np.linalg.LinAlgError:
+        return False
+    return True
+
+
+def is_normalized(coeff, olp, level="full", memory_budget=None):
+    """Check if the given functions are normalized.
+
+    Parameters
+    ----------
+    coeff : np.ndarray(..., K, M)
+        Transformation matrix from a basis set to the functions.
+    olp : np.ndarray(..., K, K)
+        Overlap of the basis functions.
+    level : {"full", "cheap", "off"}
+        Level of the check.
+        If "cheap", only a random subset of the functions is checked.
+    memory_budget : {int, None}
+        Number of bytes that the temporary arrays may use.
+        Default is to compute the norms with whole matrices.
+
+    Returns
+    -------
+    is_normalized : bool
+        True if the functions are normalized (or if the check is turned off).
+
+    """
+    if level == "off":
+        return True
+    if level == "cheap" and coeff.shape[-1] > NUM_PROBES:
+        rng = np.random.default_rng(coeff.shape[-1])
+        coeff = coeff[..., rng.choice(coeff.shape[-1], NUM_PROBES, replace=False)]
+    if memory_budget is None:
+        return np.allclose(np.einsum("...ji,...ji->...i", np.matmul(olp, coeff), coeff), 1)
+    row_nbytes = int(np.prod(coeff.shape[:-2])) * coeff.shape[-1] * coeff.itemsize
+    norms = sum(
+        np.einsum("...ji,...ji->...i", np.matmul(olp[..., rows, :], coeff), coeff[..., rows, :])
+        for rows in row_blocks(coeff.shape[-2], row_nbytes, memory_budget)
+    )
+    return np.allclose(norms, 1)
@@ -0,0 +1,645 @@
+r"""Schemes that partition the pairs of basis functions among the atoms.
+
+A partitioning scheme assigns to each atom :math:`A` the weights :math:`w^A_{jk}` of the pairs of
+basis functions, such that the weights are symmetric (:math:`w^A_{jk} = w^A_{kj}`) and normalized
+(:math:`\sum_A w^A_{jk} = 1`). The population of an atom is then
+
+.. math::
+
+    N_A = \sum_{jk} w^A_{jk} S_{jk} P_{kj}
+
+Most schemes are defined by weights of each basis function or by a rule on the pairs of basis
+functions, so the populations can be computed without building the (A, K, K) array of weights.
+
+"""
+
+import numpy as np
+from orbtools import validation
+
+
+def sum_by_atom(values, ab_atom_indices, num_atoms):
+    """Sum the last axis of the given values over the basis functions of each atom.
+
+    Parameters
+    ----------
+    values : np.ndarray(..., K)
+        Values associated with each atomic basis function.
+        `K` is the number of atomic orbitals.
+    ab_atom_indices : np.ndarray(K,)
+        Index of the atom to which each atomic basis function belongs.
+    num_atoms : int
+        Number of atoms.
+
+    Returns
+    -------
+    atom_values : np.ndarray(..., A)
+        Sum of the values of the basis functions that belong to each atom.
+        `A` is the number of atoms.
+
+    """
+    lead_shape = values.shape[:-1]
+    num_lead = int(np.prod(lead_shape))
+    indices = np.arange(num_lead)[:, None] * num_atoms + ab_atom_indices[None, :]
+    output = np.bincount(
+        indices.ravel(), weights=values.reshape(-1), minlength=num_lead * num_atoms
+    )
+    return output.reshape(lead_shape + (num_atoms,))
+
+
+def _atom_indicator(ab_atom_indices, num_atoms):
+    """Return the indicator of the atom of each basis function.
+
+    Parameters
+    ----------
+    ab_atom_indices : np.ndarray(K,)
+        Index of the atom to which each atomic basis function belongs.
+    num_atoms : int
+        Number of atoms.
+
+    Returns
+    -------
+    indicator : np.ndarray(A, K)
+        1 if the basis function (column) belongs to the atom (row) and 0 otherwise.
+
+    """
+    return (np.arange(num_atoms)[:, None] == ab_atom_indices[None, :]).astype(float)
+
+
+class WeightScheme:
+    """Partitioning of the pairs of basis functions among the atoms.
+
+    Subclasses implement `check`, `reduce`, and `dense`.
+
+    """
+
+    def check(self, num_atoms, num_ab, level):
+        """Check the scheme against the given system.
+
+        Parameters
+        ----------
+        num_atoms : int
+            Number of atoms.
+        num_ab : int
+            Number of basis functions.
+        level : {"full", "cheap", "off"}
+            Level of the numerical checks.
+
+        """
+        raise NotImplementedError
+
+    def reduce(self, values, ab_atom_indices, num_atoms, rows=None):
+        r"""Return the weighted sums of the given values of the pairs of basis functions.
+
+        .. math::
+
+            N_A = \sum_{jk} w^A_{jk} X_{jk}
+
+        The reduction is linear in the values, so the sums over blocks of rows add up to the sum
+        over all rows.
+
+        Parameters
+        ----------
+        values : np.ndarray(..., R, K)
+            Values of the pairs of basis functions, e.g. :math:`X_{jk} = S_{jk} P_{kj}`, for the
+            given rows.
+        ab_atom_indices : np.ndarray(K,)
+            Index of the atom to which each basis function belongs.
+        num_atoms : int
+            Number of atoms.
+        rows : {slice, None}
+            Rows of the values that are given.
+            Default is all of the rows.
+
+        Returns
+        -------
+        atom_values : np.ndarray(..., A)
+            Weighted sum of the values for each atom.
+
+        """
+        raise NotImplementedError
+
+    def dense(self, ab_atom_indices, num_atoms):
+        """Return the weights of the pairs of basis functions for each atom.
+
+        Parameters
+        ----------
+        ab_atom_indices : np.ndarray(K,)
+            Index of the atom to which each basis function belongs.
+        num_atoms : int
+            Number of atoms.
+
+        Returns
+        -------
+        atom_weights : np.ndarray(A, K, K)
+            Weights of the pairs of basis functions for each atom.
+
+        """
+        raise NotImplementedError
+
+
+class MullikenWeights(WeightScheme):
+    r"""Mulliken partitioning, where half of each pair is given to the atom of each function.
+
+    .. math::
+
+        w^A_{jk} = \frac{1}{2} (\delta_{A, a(j)} + \delta_{A, a(k)})
+
+    """
+
+    def check(self, num_atoms, num_ab, level):
+        """Check the scheme against the given system (nothing to check).
+
+        Parameters
+        ----------
+        num_atoms : int
+            Number of atoms.
+        num_ab : int
+            Number of basis functions.
+        level : {"full", "cheap", "off"}
+            Level of the numerical checks.
+
+        """
+
+    def reduce(self, values, ab_atom_indices, num_atoms, rows=None):
+        """Return the weighted sums of the given values of the pairs of basis functions.
+
+        See `WeightScheme.reduce`.
+
+        """
+        rows = slice(None) if rows is None else rows
+        return (
+            sum_by_atom(np.sum(values, axis=-1), ab_atom_indices[rows], num_atoms)
+            + sum_by_atom(np.sum(values, axis=-2), ab_atom_indices, num_atoms)
+        ) / 2
+
+    def dense(self, ab_atom_indices, num_atoms):
+        """Return the weights of the pairs of basis functions for each atom.
+
+        See `WeightScheme.dense`.
+
+        """
+        indicator = _atom_indicator(ab_atom_indices, num_atoms)
+        return (indicator[:, :, None] + indicator[:, None, :]) / 2
+
+
+class FunctionWeights(WeightScheme):
+    r"""Partitioning defined by the weights of each basis function for each atom.
+
+    .. math::
+
+        w^A_{jk} = \frac{1}{2} (v^A_j + v^A_k)
+
+    The Mulliken partitioning corresponds to :math:`v^A_j = \delta_{A, a(j)}`, and fuzzy
+    partitionings (e.g. basis functions shared between atoms) to fractional weights.
+
+    Attributes
+    ----------
+    function_weights : np.ndarray(A, K)
+        Weight of each basis function (columns) for each atom (rows).
+
+    """
+
+    def __init__(self, function_weights):
+        """Initialize.
+
+        Parameters
+        ----------
+        function_weights : np.ndarray(A, K)
+            Weight of each basis function (columns) for each atom (rows).
+            Weights of each basis function must sum to 1.
+
+        Raises
+        ------
+        TypeError
+            If `function_weights` is not a two-dimensional numpy array of ints/floats.
+
+        """
+        if not (
+            isinstance(function_weights, np.ndarray)
+            and function_weights.ndim == 2
+            and function_weights.dtype in [float, int]
+        ):
+            raise TypeError(
+                "Weights of the basis functions must be a two-dimensional numpy array of "
+                "ints/floats."
+            )
+        self.function_weights = function_weights
+
+    def check(self, num_atoms, num_ab, level):
+        """Check the scheme against the given system.
+
+        Parameters
+        ----------
+        num_atoms : int
+            Number of atoms.
+        num_ab : int
+            Number of basis functions.
+        level : {"full", "cheap", "off"}
+            Level of the numerical checks.
+
+        Raises
+        ------
+        ValueError
+            If the shape of the weights is not (number of atoms, number of basis functions).
+            If the weights of each basis function do not sum to 1.
+
+        """
+        if self.function_weights.shape != (num_atoms, num_ab):
+            raise ValueError(
+                "Weights of the basis functions must have a shape of (number of atoms, number of "
+                "basis functions)."
+            )
+        if level != "off" and not np.allclose(np.sum(self.function_weights, axis=0), 1):
+            raise ValueError("Weights of each basis function must sum to 1 over the atoms.")
+
+    def reduce(self, values, ab_atom_indices, num_atoms, rows=None):
+        """Return the weighted sums of the given values of the pairs of basis functions.
+
+        See `WeightScheme.reduce`.
+
+        """
+        rows = slice(None) if rows is None else rows
+        return (
+            np.matmul(np.sum(values, axis=-1), self.function_weights[:, rows].T)
+            + np.matmul(np.sum(values, axis=-2), self.function_weights.T)
+        ) / 2
+
+    def dense(self, ab_atom_indices, num_atoms):
+        """Return the weights of the pairs of basis functions for each atom.
+
+        See `WeightScheme.dense`.
+
+        """
+        weights = self.function_weights
+        return (weights[:, :, None] + weights[:, None, :]) / 2
+
+
+class PairFractionWeights(WeightScheme):
+    r"""Partitioning where each pair is split between the atoms of its two functions.
+
+    .. math::
+
+        w^A_{jk} = \delta_{A, a(j)} f_{jk} + \delta_{A, a(k)} f_{kj}
+
+    where :math:`f_{jk} + f_{kj} = 1` is the fraction of the pair :math:`jk` that is given to the
+    atom of the function :math:`j`.
+
+    Attributes
+    ----------
+    fractions : np.ndarray(K, K)
+        Fraction of each pair that is given to the atom of the function of the row.
+
+    """
+
+    def __init__(self, fractions):
+        """Initialize.
+
+        Parameters
+        ----------
+        fractions : np.ndarray(K, K)
+            Fraction of each pair that is given to the atom of the function of the row.
+            Fractions of a pair and its transpose must sum to 1.
+
+        Raises
+        ------
+        TypeError
+            If `fractions` is not a two-dimensional numpy array of ints/floats.
+
+        """
+        if not (
+            isinstance(fractions, np.ndarray)
+            and fractions.ndim == 2
+            and fractions.dtype in [float, int]
+        ):
+            raise TypeError(
+                "Fractions of the pairs of basis functions must be a two-dimensional numpy array "
+                "of ints/floats."
+            )
+        self.fractions = fractions
+
+    def get_fractions(self, ab_atom_indices, rows=None):
+        """Return the fractions of the pairs of basis functions.
+
+        Parameters
+        ----------
+        ab_atom_indices : np.ndarray(K,)
+            Index of the atom to which each basis function belongs.
+        rows : {slice, None}
+            Rows of the fractions that are returned.
+            Default is all of the rows.
+
+        Returns
+        -------
+        fractions : np.ndarray(R, K)
+            Fraction of each pair that is given to the atom of the function of the row.
+
+        """
+        if rows is None:
+            return self.fractions
+        return self.fractions[rows]
+
+    def check(self, num_atoms, num_ab, level):
+        """Check the scheme against the given system.
+
+        Parameters
+        ----------
+        num_atoms : int
+            Number of atoms.
+        num_ab : int
+            Number of basis functions.
+        level : {"full", "cheap", "off"}
+            Level of the numerical checks.
+
+        Raises
+        ------
+        ValueError
+            If the shape of the fractions is not (number of basis functions, number of basis
+            functions).
+            If the fractions of a pair and its transpose do not sum to 1.
+
+        """
+        if self.fractions.shape != (num_ab, num_ab):
+            raise ValueError(
+                "Fractions of the pairs of basis functions must have a shape of (number of basis "
+                "functions, number of basis functions)."
+            )
+        if level != "off" and not np.allclose(self.fractions + self.fractions.T, 1):
+            raise ValueError("Fractions of each pair of basis functions must sum to 1.")
+
+    def reduce(self, values, ab_atom_indices, num_atoms, rows=None):
+        """Return the weighted sums of the given values of the pairs of basis functions.
+
+        See `WeightScheme.reduce`.
+
+        """
+        rows = slice(None) if rows is None else rows
+        fractions = self.get_fractions(ab_atom_indices, rows=rows)
+        # NOTE: fractions of the transposed pairs are 1 - f_jk
+        return sum_by_atom(
+            np.sum(fractions * values, axis=-1), ab_atom_indices[rows], num_atoms
+        ) + sum_by_atom(np.sum((1 - fractions) * values, axis=-2), ab_atom_indices, num_atoms)
+
+    def dense(self, ab_atom_indices, num_atoms):
+        """Return the weights of the pairs of basis functions for each atom.
+
+        See `WeightScheme.dense`.
+
+        """
+        fractions = self.get_fractions(ab_atom_indices)
+        indicator = _atom_indicator(ab_atom_indices, num_atoms)
+        return indicator[:, :, None] * fractions + indicator[:, None, :] * fractions.T
+
+
+class BickelhauptWeights(PairFractionWeights):
+    r"""Bickelhaupt partitioning, where pairs on different atoms are split by the diagonal density.
+
+    .. math::
+
+        f_{jk} =
+        \begin{cases}
+            \frac{u_j}{u_j + u_k} & a(j) \neq a(k)\\
+            \frac{1}{2} & a(j) = a(k)
+        \end{cases}
+
+    where :math:`u_j` is usually the diagonal of the density matrix, :math:`P_{jj}`.
+
+    Attributes
+    ----------
+    function_populations : np.ndarray(K,)
+        Populations of the basis functions used to split the pairs.
+
+    References
+    ----------
+    .. [1] Bickelhaupt, F.M.; van Eikema Hommes, N.J.R.; Fonseca Guerra, C.; Baerends, E.J. The
+        carbon-lithium electron pair bond in (CH3Li)n (n = 1, 2, 4). Organometallics 1996, 15,
+        2923-2931.
+
+    """
+
+    # pylint: disable=W0231
+    def __init__(self, function_populations):
+        """Initialize.
+
+        Parameters
+        ----------
+        function_populations : np.ndarray(K,)
+            Populations of the basis functions used to split the pairs, e.g. the diagonal of the
+            density matrix.
+
+        Raises
+        ------
+        TypeError
+            If `function_populations` is not a one-dimensional numpy array of ints/floats.
+
+        """
+        if not (
+            isinstance(function_populations, np.ndarray)
+            and function_populations.ndim == 1
+            and function_populations.dtype in [float, int]
+        ):
+            raise TypeError(
+                "Populations of the basis functions must be a one-dimensional numpy array of "
+                "ints/floats."
+            )
+        self.function_populations = function_populations
+
+    @classmethod
+    def from_density(cls, density):
+        """Return the Bickelhaupt partitioning that uses the diagonal of the given density matrix.
+
+        Parameters
+        ----------
+        density : np.ndarray(K, K)
+            Density matrix.
+
+        Returns
+        -------
+        scheme : BickelhauptWeights
+            Bickelhaupt partitioning.
+
+        """
+        return cls(np.diag(density).copy())
+
+    def get_fractions(self, ab_atom_indices, rows=None):
+        """Return the fractions of the pairs of basis functions.
+
+        Parameters
+        ----------
+        ab_atom_indices : np.ndarray(K,)
+            Index of the atom to which each basis function belongs.
+        rows : {slice, None}
+            Rows of the fractions that are returned.
+            Default is all of the rows.
+
+        Returns
+        -------
+        fractions : np.ndarray(R, K)
+            Fraction of each pair that is given to the atom of the function of the row.
+
+        """
+        rows = slice(None) if rows is None else rows
+        pops = self.function_populations
+        total = pops[rows, None] + pops[None, :]
+        fractions = np.full(total.shape, 0.5)
+        np.divide(
+            np.broadcast_to(pops[rows, None], total.shape), total, out=fractions, where=total != 0
+        )
+        fractions[ab_atom_indices[rows, None] == ab_atom_indices[None, :]] = 0.5
+        return fractions
+
+    def check(self, num_atoms, num_ab, level):
+        """Check the scheme against the given system.
+
+        Parameters
+        ----------
+        num_atoms : int
+            Number of atoms.
+        num_ab : int
+            Number of basis functions.
+        level : {"full", "cheap", "off"}
+            Level of the numerical checks.
+
+        Raises
+        ------
+        ValueError
+            If the number of populations is not equal to the number of basis functions.
+            If any population is negative.
+
+        """
+        if self.function_populations.size != num_ab:
+            raise ValueError(
+                "Number of populations of the basis functions must be equal to the number of "
+                "basis functions."
+            )
+        if level != "off" and np.any(self.function_populations < 0):
+            raise ValueError("Populations of the basis functions must be nonnegative.")
+
+
+class DenseWeights(WeightScheme):
+    """Partitioning given by the (A, K, K) array of the weights of the pairs for each atom.
+
+    Attributes
+    ----------
+    atom_weights : np.ndarray(A, K, K)
+        Weights of the pairs of basis functions for each atom.
+
+    """
+
+    def __init__(self, atom_weights):
+        """Initialize.
+
+        Parameters
+        ----------
+        atom_weights : np.ndarray(A, K, K)
+            Weights of the pairs of basis functions for each atom.
+
+        Raises
+        ------
+        TypeError
+            If `atom_weights` is not a 3-dimensional numpy array of ints/floats.
+
+        """
+        if not (
+            isinstance(atom_weights, np.ndarray)
+            and atom_weights.ndim == 3
+            and atom_weights.dtype in [float, int]
+        ):
+            raise TypeError(
+                "Orbital weights for the atoms must be a 3-dimensional numpy array of ints/floats."
+            )
+        self.atom_weights = atom_weights
+
+    def check(self, num_atoms, num_ab, level):
+        """Check the scheme against the given system.
+
+        Parameters
+        ----------
+        num_atoms : int
+            Number of atoms.
+        num_ab : int
+            Number of basis functions.
+        level : {"full", "cheap", "off"}
+            Level of the numerical checks.
+
+        Raises
+        ------
+        ValueError
+            If `atom_weights` has first dimension that is not equal to the number of atoms.
+            If `atom_weights` has second and third dimensions that are not equal to the number of
+            atomic orbitals.
+            If `atom_weights` is not symmetric with respect to the interchange of the second and
+            third indices.
+            If `atom_weights` is not normalized. i.e. sum over the first dimension does not result
+            in 1's.
+
+        """
+        atom_weights = self.atom_weights
+        if atom_weights.shape[0] != num_atoms:
+            raise ValueError(
+                "First dimension of the orbital weights for the atoms must be equal to the number "
+                "of atoms."
+            )
+        if atom_weights.shape[1:] != (num_ab, num_ab):
+            raise ValueError(
+                "Second and third dimension of the orbital weights for the atoms must be equal to "
+                "the number of atomic orbitals."
+            )
+        if not validation.is_hermitian(atom_weights, level):
+            raise ValueError(
+                "Orbital weights for each atom must be symmetric, i.e. `atom_weights` must be "
+                "symmetric with respect to the interchange of the second and third indices."
+            )
+        if level != "off" and not np.allclose(np.sum(atom_weights, axis=0), 1):
+            raise ValueError(
+                "Orbital weights for the atoms must be normalized, i.e. sum over the first "
+                "dimension must result in 1's."
+            )
+
+    def reduce(self, values, ab_atom_indices, num_atoms, rows=None):
+        """Return the weighted sums of the given values of the pairs of basis functions.
+
+        See `WeightScheme.reduce`.
+
+        """
+        # This is equivalent to the following:
+        # output = np.zeros(num_atoms)
+        # for atom_ind, weights in enumerate(atom_weights):
+        #     output[atom_ind] = np.sum(values * weights)
+        rows = slice(None) if rows is None else rows
+        return np.einsum("ajk,...jk->...a", self.atom_weights[:, rows], values, optimize=True)
+
+    def dense(self, ab_atom_indices, num_atoms):
+        """Return the weights of the pairs of basis functions for each atom.
+
+        See `WeightScheme.dense`.
+
+        """
+        return self.atom_weights
+
+
+def as_weight_scheme(atom_weights):
+    """Return the given weights as a partitioning scheme.
+
+    Parameters
+    ----------
+    atom_weights : {WeightScheme, np.ndarray(A, K, K), None}
+        Partitioning scheme or the weights of the pairs of basis functions for each atom.
+        If None, the Mulliken partitioning is used.
+
+    Returns
+    -------
+    scheme : WeightScheme
+        Partitioning scheme.
+
+    Raises
+    ------
+    TypeError
+        If `atom_weights` is not a WeightScheme, a 3-dimensional numpy array of ints/floats, or
+        None.
+
+    """
+    if atom_weights is None:
+        return MullikenWeights()
+    if isinstance(atom_weights, WeightScheme):
+        return atom_weights
+    return DenseWeights(atom_weights)
@@ -48,14 +48,15 @@ setup(
         "License :: OSI Approved :: GNU Version 3",
         # Specify the Python versions you support here.
         # These classifiers are *not* checked by 'pip install'. See instead
-        "Programming Language :: Python :: 3.5",
-        "Programming Language :: Python :: 3.6",
-        "Programming Language :: Python :: 3.7",
+        "Programming Language :: Python :: 3.9",
+        "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11",
+        "Programming Language :: Python :: 3.12",
     ],
     keywords="chemtools orbital paritioning population analysis",
     packages=find_packages(exclude=["docs", "tests"]),
-    python_requires=">=3.0",
-    install_requires=["numpy", "scipy"],
+    python_requires=">=3.9",
+    install_requires=["numpy>=1.17", "scipy"],
     extras_require={
         "dev": [
             "tox",
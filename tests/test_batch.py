@@ -0,0 +1,165 @@
+"""Test orbtools.batch."""
+import os
+
+import numpy as np
+from orbtools.batch import run_batch, SUBMITTED_PER_WORKER
+from orbtools.mulliken import mulliken_populations
+from orbtools.quasi import quao
+from orbtools.threads import BLAS_THREAD_VARIABLES, get_blas_threads
+import pytest
+
+
+def _check_shared(olp_aao_aao, scale):
+    """Return the scaled sum of the shared array if it cannot be written."""
+    if olp_aao_aao.flags.writeable:
+        raise ValueError("Shared array can be written.")
+    return scale * np.sum(olp_aao_aao)
+
+
+def _blas_threads_of_worker(system):
+    """Return the number of BLAS threads of the worker."""
+    return get_blas_threads()
+
+
+def test_run_batch(tmp_path):
+    """Test orbtools.batch.run_batch."""
+    current_dir = os.path.dirname(__file__)
+    names = ["coeff_ab_mo", "olp_ab_ab", "olp_aao_ab", "olp_aao_aao", "occupations"]
+    arrays = {
+        name: np.load(os.path.join(current_dir, "naclo4_{}.npy".format(name))) for name in names
+    }
+    ab_atom_indices = np.load(os.path.join(current_dir, "naclo4_ab_atom_indices.npy"))
+    np.savez(
+        tmp_path / "system.npz",
+        coeff_ab_mo=arrays["coeff_ab_mo"],
+        occupations=2 * arrays["occupations"],
+        olp_ab_ab=arrays["olp_ab_ab"],
+    )
+    systems = [
+        {
+            "coeff_ab_mo": arrays["coeff_ab_mo"],
+            "occupations": arrays["occupations"],
+            "olp_ab_ab": arrays["olp_ab_ab"],
+        },
+        str(tmp_path / "system.npz"),
+        {
+            "coeff_ab_mo": os.path.join(current_dir, "naclo4_coeff_ab_mo.npy"),
+            "occupations": arrays["occupations"] / 2,
+            "olp_ab_ab": os.path.join(current_dir, "naclo4_olp_ab_ab.npy"),
+        },
+    ]
+    expected = mulliken_populations(
+        arrays["coeff_ab_mo"], arrays["occupations"], arrays["olp_ab_ab"], 6, ab_atom_indices
+    )
+    results = list(
+        run_batch(
+            "mulliken_populations",
+            systems,
+            shared={"ab_atom_indices": ab_atom_indices},
+            max_workers=2,
+            num_atoms=6,
+        )
+    )
+    assert sorted(result.index for result in results) == [0, 1, 2]
+    for result in results:
+        assert result.time >= 0
+        assert np.allclose(result.result, [1, 2, 0.5][result.index] * expected)
+
+    indices_span = arrays["occupations"] > 0
+    results = list(
+        run_batch(
+            "quao",
+            [{"coeff_ab_mo": arrays["coeff_ab_mo"], "indices_span": indices_span}],
+            shared={name: arrays[name] for name in ["olp_ab_ab", "olp_aao_ab", "olp_aao_aao"]},
+            max_workers=1,
+            blas_threads=1,
+        )
+    )
+    assert np.allclose(
+        results[0].result,
+        quao(
+            arrays["olp_ab_ab"],
+            arrays["olp_aao_ab"],
+            arrays["olp_aao_aao"],
+            arrays["coeff_ab_mo"],
+            indices_span,
+        ),
+    )
+
+    results = list(
+        run_batch(
+            _check_shared,
+            [{"scale": 1.0}, {"scale": "a"}],
+            shared={"olp_aao_aao": arrays["olp_aao_aao"]},
+            max_workers=2,
+            return_exceptions=True,
+        )
+    )
+    results = sorted(results, key=lambda result: result.index)
+    assert np.isclose(results[0].result, np.sum(arrays["olp_aao_aao"]))
+    assert isinstance(results[1].result, TypeError)
+    with pytest.raises(TypeError):
+        list(run_batch(_check_shared, [{"scale": "a"}], shared={"olp_aao_aao": np.ones(2)}))
+
+    # number of BLAS threads is set in the worker processes, not in the environment of the parent
+    environment = {name: os.environ.get(name) for name in BLAS_THREAD_VARIABLES}
+    results = list(run_batch(_blas_threads_of_worker, [{"system": 0}], blas_threads=2))
+    assert results[0].result in [2, None]
+    assert {name: os.environ.get(name) for name in BLAS_THREAD_VARIABLES} == environment
+
+    # threads share the inputs and the limit on the number of BLAS threads of the process
+    num_threads = get_blas_threads()
+    results = list(
+        run_batch(
+            "mulliken_populations",
+            systems,
+            shared={"ab_atom_indices": ab_atom_indices},
+            max_workers=2,
+            blas_threads=1,
+            mode="thread",
+            num_atoms=6,
+        )
+    )
+    assert get_blas_threads() == num_threads
+    assert sorted(result.index for result in results) == [0, 1, 2]
+    for result in results:
+        assert np.allclose(result.result, [1, 2, 0.5][result.index] * expected)
+    results = list(
+        run_batch(
+            lambda olp_aao_aao, scale: scale * olp_aao_aao,
+            [{"scale": 1.0}],
+            shared={"olp_aao_aao": arrays["olp_aao_aao"]},
+            mode="thread",
+        )
+    )
+    assert np.allclose(results[0].result, arrays["olp_aao_aao"])
+
+    # systems are read from a generator as the workers become free
+    num_read = []
+
+    def stream():
+        for scale in range(10):
+            num_read.append(scale)
+            yield {"scale": float(scale)}
+
+    results = run_batch(
+        lambda olp_aao_aao, scale: scale,
+        stream(),
+        shared={"olp_aao_aao": arrays["olp_aao_aao"]},
+        max_workers=1,
+        mode="thread",
+    )
+    for num_results, _ in enumerate(results, 1):
+        assert len(num_read) <= SUBMITTED_PER_WORKER + num_results
+    assert len(num_read) == 10
+
+    with pytest.raises(ValueError):
+        list(run_batch("quao", systems, mode="fork"))
+    with pytest.raises(ValueError):
+        list(run_batch("mayer", systems))
+    with pytest.raises(TypeError):
+        list(run_batch(None, systems))
+    with pytest.raises(TypeError):
+        list(run_batch("quao", systems, max_workers=0))
+    with pytest.raises(TypeError):
+        list(run_batch("quao", systems, blas_threads=1.5))
@@ -0,0 +1,148 @@
+"""Test orbtools.blocking."""
+import os
+
+import numpy as np
+from orbtools import blocking
+from orbtools.blocking import check_memory_budget, row_blocks
+from orbtools.mulliken import mulliken_populations, mulliken_populations_density
+from orbtools.quasi import quambo, quao
+import pytest
+
+
+def test_check_memory_budget():
+    """Test orbtools.blocking.check_memory_budget."""
+    check_memory_budget(None)
+    check_memory_budget(1)
+    with pytest.raises(TypeError):
+        check_memory_budget(1.0)
+    with pytest.raises(TypeError):
+        check_memory_budget(True)
+    with pytest.raises(ValueError):
+        check_memory_budget(0)
+
+
+def test_row_blocks():
+    """Test orbtools.blocking.row_blocks."""
+    assert row_blocks(10, 8) == [slice(0, 10)]
+    assert row_blocks(10, 8, 80) == [slice(0, 10)]
+    assert row_blocks(10, 8, 32) == [slice(0, 4), slice(4, 8), slice(8, 10)]
+    assert row_blocks(3, 8, 1) == [slice(0, 1), slice(1, 2), slice(2, 3)]
+    assert row_blocks(0, 8, 1) == []
+    with pytest.raises(ValueError):
+        row_blocks(10, 8, -1)
+
+
+def test_memory_budget(tmp_path):
+    """Test orbtools.blocking.set_memory_budget and orbtools.blocking.resolve_memory_budget."""
+    array = np.identity(3)
+    assert blocking.get_memory_budget() is None
+    assert blocking.resolve_memory_budget(None, array) is None
+    assert blocking.resolve_memory_budget(100, array) == 100
+    memmap = np.memmap(tmp_path / "array.dat", dtype=float, mode="w+", shape=(3, 3))
+    assert blocking.resolve_memory_budget(None, array, memmap) == blocking.MEMMAP_MEMORY_BUDGET
+    blocking.set_memory_budget(1000)
+    try:
+        assert blocking.get_memory_budget() == 1000
+        assert blocking.resolve_memory_budget(None, array, memmap) == 1000
+        assert blocking.resolve_memory_budget(10, array) == 10
+    finally:
+        blocking.set_memory_budget(None)
+    with pytest.raises(TypeError):
+        blocking.set_memory_budget("1GB")
+    with pytest.raises(ValueError):
+        blocking.resolve_memory_budget(-1, array)
+
+
+def test_dot_congruence():
+    """Test orbtools.blocking.dot and orbtools.blocking.congruence."""
+    left = np.random.rand(13, 7)
+    right = np.random.rand(7, 5)
+    matrix = np.random.rand(13, 13)
+    matrix += matrix.T
+    coeff = np.random.rand(13, 4)
+    for memory_budget in [None, 1, 200, 10 ** 6]:
+        assert np.allclose(blocking.dot(left, right, memory_budget), left.dot(right))
+        assert np.allclose(
+            blocking.congruence(coeff, matrix, memory_budget), coeff.T.dot(matrix).dot(coeff)
+        )
+
+
+def test_memmap_inputs(tmp_path):
+    """Test that memory-mapped inputs give the same results as the inputs in memory."""
+    current_dir = os.path.dirname(__file__)
+    names = ["coeff_ab_mo", "olp_ab_ab", "olp_aao_ab", "olp_aao_aao", "occupations"]
+    arrays = {
+        name: np.load(os.path.join(current_dir, "naclo4_{}.npy".format(name))) for name in names
+    }
+    memmaps = {
+        name: blocking.load_array(os.path.join(current_dir, "naclo4_{}.npy".format(name)))
+        for name in names
+    }
+    assert all(isinstance(memmap, np.memmap) for memmap in memmaps.values())
+    assert not isinstance(
+        blocking.load_array(os.path.join(current_dir, "naclo4_olp_ab_ab.npy"), mmap=False),
+        np.memmap,
+    )
+    ab_atom_indices = np.load(os.path.join(current_dir, "naclo4_ab_atom_indices.npy"))
+    indices_span = arrays["occupations"] > 0
+
+    # a small budget so that the memory-mapped inputs are read in several blocks
+    for memory_budget in [None, 10000]:
+        blocking.set_memory_budget(memory_budget)
+        try:
+            assert np.allclose(
+                mulliken_populations(
+                    memmaps["coeff_ab_mo"],
+                    memmaps["occupations"],
+                    memmaps["olp_ab_ab"],
+                    6,
+                    ab_atom_indices,
+                ),
+                mulliken_populations(
+                    arrays["coeff_ab_mo"],
+                    arrays["occupations"],
+                    arrays["olp_ab_ab"],
+                    6,
+                    ab_atom_indices,
+                ),
+            )
+            density = (arrays["coeff_ab_mo"] * arrays["occupations"]).dot(arrays["coeff_ab_mo"].T)
+            np.save(tmp_path / "density.npy", density)
+            assert np.allclose(
+                mulliken_populations_density(
+                    blocking.load_array(str(tmp_path / "density.npy")),
+                    memmaps["olp_ab_ab"],
+                    6,
+                    ab_atom_indices,
+                ),
+                mulliken_populations_density(density, arrays["olp_ab_ab"], 6, ab_atom_indices),
+            )
+            assert np.allclose(
+                quao(
+                    memmaps["olp_ab_ab"],
+                    memmaps["olp_aao_ab"],
+                    memmaps["olp_aao_aao"],
+                    memmaps["coeff_ab_mo"],
+                    indices_span,
+                ),
+                quao(
+                    arrays["olp_ab_ab"],
+                    arrays["olp_aao_ab"],
+                    arrays["olp_aao_aao"],
+                    arrays["coeff_ab_mo"],
+                    indices_span,
+                ),
+            )
+            assert np.allclose(
+                quambo(
+                    memmaps["olp_ab_ab"],
+                    memmaps["olp_aao_ab"],
+                    memmaps["coeff_ab_mo"],
+                    indices_span,
+                ),
+                quambo(
+                    arrays["olp_ab_ab"], arrays["olp_aao_ab"], arrays["coeff_ab_mo"], indices_span
+                ),
+            )
+        finally:
+            blocking.set_memory_budget(None)
@@ -0,0 +1,155 @@
+"""Tests for orbtools.cache."""
+from concurrent.futures import ThreadPoolExecutor
+import os
+import sys
+
+import numpy as np
+from orbtools import cache
+import orbtools.orthogonalization as orth
+from orbtools.quasi import quao
+import pytest
+
+
+def test_factorization_cache():
+    """Test orbtools.cache.FactorizationCache."""
+    factorizations = cache.FactorizationCache(max_entries=2, max_bytes=1000)
+    matrix = np.random.rand(5, 5)
+    key = factorizations.key(matrix, 1e-9)
+    assert factorizations.key(matrix.copy(), 1e-9) == key
+    assert factorizations.key(matrix, 1e-8) != key
+    assert factorizations.key(matrix.tolist(), 1e-9) is None
+
+    assert factorizations.lookup(key, "eigh") is None
+    assert factorizations.info()["misses"] == 1
+    factorizations.store(key, "eigh", (np.arange(5.0), np.identity(5)))
+    eigval, eigvec = factorizations.lookup(key, "eigh")
+    assert factorizations.info()["hits"] == 1
+    assert np.allclose(eigval, np.arange(5))
+    assert np.allclose(eigvec, np.identity(5))
+    # returned arrays are copies
+    eigval[0] = 10
+    assert np.allclose(factorizations.lookup(key, "eigh")[0], np.arange(5))
+    assert factorizations.lookup(key, ("power", -1)) is None
+    assert factorizations.info()["num_bytes"] == 240
+
+    # matrix that is modified in place has a different key
+    matrix[0, 0] += 1
+    assert factorizations.key(matrix, 1e-9) != key
+
+    # least recently used matrices are evicted
+    key2 = factorizations.key(np.random.rand(5, 5), 1e-9)
+    key3 = factorizations.key(np.random.rand(5, 5), 1e-9)
+    factorizations.store(key2, "eigh", (np.arange(5.0), np.identity(5)))
+    factorizations.lookup(key, "eigh")
+    factorizations.store(key3, "eigh", (np.arange(5.0), np.identity(5)))
+    assert factorizations.info()["entries"] == 2
+    assert factorizations.lookup(key2, "eigh") is None
+    assert factorizations.lookup(key, "eigh") is not None
+    # memory limit
+    factorizations.store(key3, ("power", 2), np.identity(10))
+    assert factorizations.info()["num_bytes"] <= 1000
+    assert factorizations.lookup(key, "eigh") is None
+    # arrays that are larger than the limit are not stored
+    factorizations.store(key, "eigh", (np.arange(50.0), np.identity(50)))
+    assert factorizations.lookup(key, "eigh") is None
+
+    factorizations.clear()
+    assert factorizations.info()["entries"] == 0
+    assert factorizations.info()["hits"] == 0
+
+    factorizations.enabled = False
+    assert factorizations.key(np.random.rand(5, 5), 1e-9) is None
+
+
+def test_factorization_cache_threads():
+    """Test orbtools.cache.FactorizationCache shared by threads."""
+    factorizations = cache.FactorizationCache(max_entries=2, max_bytes=10000)
+    matrices = [np.random.rand(5, 5) for _ in range(5)]
+    keys = [factorizations.key(matrix, 1e-9) for matrix in matrices]
+
+    def work(seed):
+        """Store, look up, and evict the factorizations of random matrices."""
+        rng = np.random.default_rng(seed)
+        for i in rng.integers(len(keys), size=2000):
+            value = factorizations.lookup(keys[i], "eigh")
+            if value is None:
+                factorizations.store(keys[i], "eigh", (np.arange(5.0) + i, np.identity(5)))
+            else:
+                assert np.allclose(value[0], np.arange(5) + i)
+            if rng.random() < 0.01:
+                factorizations.clear()
+
+    # switch threads often to interleave the operations
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            list(executor.map(work, range(8)))
+    finally:
+        sys.setswitchinterval(interval)
+    info = factorizations.info()
+    assert info["entries"] <= 2
+    assert info["num_bytes"] == 240 * info["entries"]
+    assert factorizations._entries.keys() == factorizations._num_bytes.keys()
+
+
+def test_set_cache_limits():
+    """Test orbtools.cache.set_cache_limits."""
+    info = cache.cache_info()
+    with pytest.raises(TypeError):
+        cache.set_cache_limits(max_entries=1.0)
+    with pytest.raises(ValueError):
+        cache.set_cache_limits(max_bytes=-1)
+    try:
+        cache.set_cache_limits(max_entries=3, max_bytes=100)
+        assert cache.cache_info()["max_entries"] == 3
+        assert cache.cache_info()["max_bytes"] == 100
+        cache.set_cache_limits(enabled=False)
+        assert not cache.cache_info()["enabled"]
+    finally:
+        cache.set_cache_limits(
+            max_entries=info["max_entries"], max_bytes=info["max_bytes"], enabled=True
+        )
+
+
+def test_orthogonalization_cache():
+    """Test that orbtools.orthogonalization reuses the factorizations."""
+    cache.clear_cache()
+    matrix = np.random.rand(10, 10)
+    matrix = matrix.dot(matrix.T)
+    eigval, eigvec = orth.eigh(matrix)
+    assert cache.cache_info()["misses"] == 1
+    eigval2, eigvec2 = orth.eigh(matrix.copy())
+    assert cache.cache_info()["hits"] == 1
+    assert np.allclose(eigval, eigval2)
+    assert np.allclose(eigvec, eigvec2)
+
+    power = orth.power_symmetric(matrix, -0.5)
+    assert cache.cache_info()["hits"] == 2
+    assert np.allclose(power.dot(matrix).dot(power), np.identity(10))
+    # modifying the returned power does not modify the stored power
+    power_copy = power.copy()
+    power[0, 0] = 0
+    assert np.allclose(orth.power_symmetric(matrix, -0.5), power_copy)
+    assert cache.cache_info()["hits"] == 3
+
+
+def test_quao_cache():
+    """Test that orbtools.quasi.quao decomposes the overlap of the AAOs once."""
+    current_dir = os.path.dirname(__file__)
+    coeff_ab_mo = np.load(os.path.join(current_dir, "naclo4_coeff_ab_mo.npy"))
+    olp_ab_ab = np.load(os.path.join(current_dir, "naclo4_olp_ab_ab.npy"))
+    olp_aao_ab = np.load(os.path.join(current_dir, "naclo4_olp_aao_ab.npy"))
+    olp_aao_aao = np.load(os.path.join(current_dir, "naclo4_olp_aao_aao.npy"))
+    occupations = np.load(os.path.join(current_dir, "naclo4_occupations.npy"))
+    indices_span = occupations > 0
+
+    cache.clear_cache()
+    coeff_ab_quao = quao(olp_ab_ab, olp_aao_ab, olp_aao_aao, coeff_ab_mo, indices_span)
+    # eigh of olp_ab_ab, eigh of olp_aao_aao, -0.5 power of olp_aao_aao, cholesky of olp_mmo_mmo
+    assert cache.cache_info()["misses"] == 4
+    assert cache.cache_info()["hits"] == 1
+    assert np.allclose(
+        coeff_ab_quao, quao(olp_ab_ab, olp_aao_ab, olp_aao_aao, coeff_ab_mo, indices_span)
+    )
+    assert cache.cache_info()["misses"] == 4
@@ -0,0 +1,245 @@
+"""Test orbtools.fragments."""
+import numpy as np
+from orbtools.blocking import set_memory_budget
+from orbtools.fragments import (
+    find_fragments,
+    fragment_indices,
+    lowdin_populations_fragments,
+    power_symmetric_fragments,
+    project_fragments,
+    quao_fragments,
+)
+from orbtools.mulliken import lowdin_populations
+from orbtools.orthogonalization import power_symmetric
+from orbtools.quasi import project, quao
+from orbtools.synthetic import make_system
+import pytest
+import scipy.linalg
+
+
+def _fragmented_system():
+    """Return two systems and the system made of both, with their atoms interleaved."""
+    systems = [make_system(4, seed=0), make_system(6, seed=1)]
+    olp_ab_ab, olp_aao_ab, olp_aao_aao, coeff_ab_mo = [
+        scipy.linalg.block_diag(*[system[key] for system in systems])
+        for key in ["olp_ab_ab", "olp_aao_ab", "olp_aao_aao", "coeff_ab_mo"]
+    ]
+    indices_span = np.hstack([system["indices_span"] for system in systems])
+    # molecular orbitals of both systems, sorted by energy
+    order = np.argsort(np.hstack([system["mo_energies"] for system in systems]), kind="stable")
+    # atoms of the systems are interleaved
+    atoms = np.array([0, 2, 4, 6, 1, 3, 5, 7, 8, 9])
+    ab_atom_indices = atoms[np.repeat(np.arange(10), 10)]
+    aao_atom_indices = atoms[np.repeat(np.arange(10), 5)]
+    ab_order = np.argsort(ab_atom_indices, kind="stable")
+    aao_order = np.argsort(aao_atom_indices, kind="stable")
+    return systems, {
+        "olp_ab_ab": olp_ab_ab[np.ix_(ab_order, ab_order)],
+        "olp_aao_ab": olp_aao_ab[np.ix_(aao_order, ab_order)],
+        "olp_aao_aao": olp_aao_aao[np.ix_(aao_order, aao_order)],
+        "coeff_ab_mo": coeff_ab_mo[np.ix_(ab_order, order)],
+        "indices_span": indices_span[order],
+        "occupations": 2.0 * indices_span[order],
+        "num_atoms": 10,
+        "ab_atom_indices": ab_atom_indices[ab_order],
+        "aao_atom_indices": aao_atom_indices[aao_order],
+        "ab_order": ab_order,
+        "aao_order": aao_order,
+    }
+
+
+def test_find_fragments():
+    """Test orbtools.fragments.find_fragments and orbtools.fragments.fragment_indices."""
+    _, system = _fragmented_system()
+    atom_fragments = find_fragments(
+        system["olp_ab_ab"], system["ab_atom_indices"], system["num_atoms"]
+    )
+    assert np.array_equal(atom_fragments, [0, 1, 0, 1, 0, 1, 0, 1, 1, 1])
+    indices = fragment_indices(atom_fragments, system["ab_atom_indices"])
+    assert len(indices) == 2
+    assert np.array_equal(np.sort(system["ab_order"][indices[0]]), np.arange(40))
+    assert np.array_equal(np.sort(system["ab_order"][indices[1]]), np.arange(40, 100))
+    # overlap that is read in blocks of rows
+    try:
+        set_memory_budget(3000)
+        assert np.array_equal(
+            find_fragments(system["olp_ab_ab"], system["ab_atom_indices"], system["num_atoms"]),
+            atom_fragments,
+        )
+    finally:
+        set_memory_budget(None)
+    # each atom is a fragment if no overlap is an edge
+    assert np.array_equal(
+        find_fragments(system["olp_ab_ab"], system["ab_atom_indices"], 10, olp_threshold=1.0),
+        np.arange(10),
+    )
+    # atoms without basis functions are fragments of their own
+    atom_fragments = find_fragments(system["olp_ab_ab"], system["ab_atom_indices"], 11)
+    assert np.array_equal(atom_fragments, [0, 1, 0, 1, 0, 1, 0, 1, 1, 1, 2])
+    assert fragment_indices(atom_fragments, system["ab_atom_indices"])[2].size == 0
+    # overlaps of a lattice are connected
+    lattice = make_system(8, seed=0)
+    assert np.array_equal(
+        find_fragments(lattice["olp_ab_ab"], lattice["ab_atom_indices"], 8), np.zeros(8)
+    )
+
+    with pytest.raises(TypeError):
+        find_fragments(system["olp_ab_ab"][:10], system["ab_atom_indices"], 10)
+    with pytest.raises(TypeError):
+        find_fragments(system["olp_ab_ab"], system["ab_atom_indices"].astype(float), 10)
+    with pytest.raises(TypeError):
+        find_fragments(system["olp_ab_ab"], system["ab_atom_indices"], 10.0)
+    with pytest.raises(TypeError):
+        find_fragments(system["olp_ab_ab"], system["ab_atom_indices"], 10, olp_threshold=0)
+    with pytest.raises(ValueError):
+        find_fragments(system["olp_ab_ab"], system["ab_atom_indices"][1:], 10)
+    with pytest.raises(ValueError):
+        find_fragments(system["olp_ab_ab"], system["ab_atom_indices"], 9)
+    with pytest.raises(ValueError):
+        find_fragments(system["olp_ab_ab"], system["ab_atom_indices"], 10, olp_threshold=-1.0)
+
+
+def test_power_symmetric_fragments():
+    """Test orbtools.fragments.power_symmetric_fragments."""
+    _, system = _fragmented_system()
+    olp_ab_ab = system["olp_ab_ab"]
+    for k in [-1, -0.5, 0.5, 2]:
+        for max_workers in [1, 2]:
+            assert np.allclose(
+                power_symmetric_fragments(
+                    olp_ab_ab, k, system["ab_atom_indices"], 10, max_workers=max_workers
+                ),
+                power_symmetric(olp_ab_ab, k),
+            )
+    # single fragment
+    lattice = make_system(4, seed=0)
+    assert np.allclose(
+        power_symmetric_fragments(lattice["olp_ab_ab"], -0.5, lattice["ab_atom_indices"], 4),
+        power_symmetric(lattice["olp_ab_ab"], -0.5),
+    )
+
+    with pytest.raises(TypeError):
+        power_symmetric_fragments(olp_ab_ab, 0.5, system["ab_atom_indices"], 10, max_workers=0)
+    with pytest.raises(ValueError):
+        power_symmetric_fragments(
+            -olp_ab_ab + 2 * np.identity(100), 0.5, system["ab_atom_indices"], 10
+        )
+
+
+def test_project_fragments(capsys):
+    """Test orbtools.fragments.project_fragments."""
+    _, system = _fragmented_system()
+    olp_ab_ab = system["olp_ab_ab"]
+    olp_ab_aao = system["olp_aao_ab"].T
+    for max_workers in [1, 2]:
+        assert np.allclose(
+            project_fragments(
+                olp_ab_ab, olp_ab_aao, system["ab_atom_indices"], 10, max_workers=max_workers
+            ),
+            project(olp_ab_ab, olp_ab_aao),
+        )
+    # linearly dependent projections
+    olp_one_two = np.hstack([olp_ab_aao, olp_ab_aao[:, :2]])
+    assert np.allclose(
+        project_fragments(olp_ab_ab, olp_one_two, system["ab_atom_indices"], 10),
+        project(olp_ab_ab, olp_one_two),
+    )
+    assert "2 linearly dependent projections" in capsys.readouterr().out
+
+    with pytest.raises(TypeError):
+        project_fragments(olp_ab_ab, olp_ab_aao.tolist(), system["ab_atom_indices"], 10)
+    with pytest.raises(ValueError):
+        project_fragments(olp_ab_ab, olp_ab_aao[1:], system["ab_atom_indices"], 10)
+    asymmetric = olp_ab_ab.copy()
+    asymmetric[0, 1] += 0.1
+    with pytest.raises(ValueError):
+        project_fragments(asymmetric, olp_ab_aao, system["ab_atom_indices"], 10)
+
+
+def test_lowdin_populations_fragments():
+    """Test orbtools.fragments.lowdin_populations_fragments."""
+    _, system = _fragmented_system()
+    args = [
+        system["coeff_ab_mo"],
+        system["occupations"],
+        system["olp_ab_ab"],
+        10,
+        system["ab_atom_indices"],
+    ]
+    for max_workers in [1, 2]:
+        assert np.allclose(
+            lowdin_populations_fragments(*args, max_workers=max_workers),
+            lowdin_populations(*args),
+        )
+    # molecular orbitals that are delocalized over both fragments
+    rotation = np.identity(100)
+    rotation[:2, :2] = [[0.6, 0.8], [-0.8, 0.6]]
+    args[0] = system["coeff_ab_mo"].dot(rotation)
+    assert np.allclose(lowdin_populations_fragments(*args), lowdin_populations(*args))
+
+    with pytest.raises(TypeError):
+        lowdin_populations_fragments(args[0], args[1].tolist(), *args[2:])
+    with pytest.raises(ValueError):
+        lowdin_populations_fragments(args[0][:, 1:], *args[1:])
+    with pytest.raises(ValueError):
+        lowdin_populations_fragments(2 * args[0], *args[1:])
+
+
+def test_quao_fragments(capsys):
+    """Test orbtools.fragments.quao_fragments."""
+    systems, system = _fragmented_system()
+    args = [
+        system["olp_ab_ab"],
+        system["olp_aao_ab"],
+        system["olp_aao_aao"],
+        system["coeff_ab_mo"],
+        system["indices_span"],
+        system["ab_atom_indices"],
+        system["aao_atom_indices"],
+        10,
+    ]
+    # QUAO's of each system
+    expected = scipy.linalg.block_diag(
+        *[
+            quao(
+                fragment["olp_ab_ab"],
+                fragment["olp_aao_ab"],
+                fragment["olp_aao_aao"],
+                fragment["coeff_ab_mo"],
+                fragment["indices_span"],
+            )
+            for fragment in systems
+        ]
+    )[np.ix_(system["ab_order"], system["aao_order"])]
+    for max_workers in [1, 2]:
+        assert np.allclose(quao_fragments(*args, max_workers=max_workers), expected)
+    # the MMO space of the whole system has the same number of virtual orbitals in each fragment
+    assert np.allclose(quao(*args[:5]), expected)
+    # some of the virtual orbitals
+    assert np.allclose(
+        quao_fragments(*args[:3], args[3][:, :90], args[4][:90], *args[5:]),
+        quao(*args[:3], args[3][:, :90], args[4][:90]),
+    )
+    # molecular orbitals that are mixed within the spanned orbitals
+    rotation = np.identity(100)
+    spanned = np.flatnonzero(system["indices_span"])[:2]
+    rotation[np.ix_(spanned, spanned)] = [[0.6, 0.8], [-0.8, 0.6]]
+    args[3] = system["coeff_ab_mo"].dot(rotation)
+    assert np.allclose(quao_fragments(*args), expected)
+    assert capsys.readouterr().out == ""
+    # or between the spanned orbitals and the others
+    lumo = np.flatnonzero(~system["indices_span"])[0]
+    rotation = np.identity(100)
+    rotation[np.ix_([spanned[0], lumo], [spanned[0], lumo])] = [[0.6, 0.8], [-0.8, 0.6]]
+    args[3] = system["coeff_ab_mo"].dot(rotation)
+    assert np.allclose(quao_fragments(*args), quao(*args[:5]))
+    assert "WARNING" in capsys.readouterr().out
+
+    with pytest.raises(TypeError):
+        quao_fragments(*args[:4], args[4].astype(int), *args[5:])
+    with pytest.raises(TypeError):
+        quao_fragments(*args[:6], args[6].astype(float), *args[7:])
+    with pytest.raises(ValueError):
+        quao_fragments(args[0], args[1][1:], *args[2:])
+    with pytest.raises(ValueError):
+        quao_fragments(*args[:4], args[4][1:], *args[5:])
@@ -2,14 +2,23 @@
 import os
 
 import numpy as np
+from orbtools.blocking import set_memory_budget
 from orbtools.mulliken import (
+    lowdin_orbital_contributions,
     lowdin_populations,
+    lowdin_populations_density,
+    mayer_bond_orders,
+    mulliken_orbital_contributions,
     mulliken_populations,
+    mulliken_populations_batch,
+    mulliken_populations_density,
     mulliken_populations_newbasis,
+    overlap_populations,
 )
 from orbtools.orthogonalization import power_symmetric
-from orbtools.quasi import project
+from orbtools.quasi import project, quambo
 import pytest
+import scipy.sparse
 
 
 def test_mulliken_populations_input():
@@ -348,3 +357,373 @@ def test_lowdin_populations():
         ),
         lowdin_populations(coeff_ab_mo, occupations, olp_ab_ab, 6, ab_atom_indices),
     )
+
+    atom_weights = np.random.rand(6, 124, 124)
+    atom_weights += np.swapaxes(atom_weights, 1, 2)
+    atom_weights /= np.sum(atom_weights, axis=0)
+    assert np.allclose(
+        mulliken_populations_newbasis(
+            coeff_ab_mo,
+            occupations,
+            olp_ab_ab,
+            6,
+            coeff_ab_oab,
+            ab_atom_indices,
+            new_atom_weights=atom_weights,
+        ),
+        lowdin_populations(
+            coeff_ab_mo, occupations, olp_ab_ab, 6, ab_atom_indices, atom_weights=atom_weights
+        ),
+    )
+    with pytest.raises(ValueError):
+        lowdin_populations(coeff_ab_mo * 2, occupations, olp_ab_ab, 6, ab_atom_indices)
+
+
+def test_mulliken_populations_default_weights():
+    """Test that the default weights of orbtools.mulliken.mulliken_populations are Mulliken's."""
+    current_dir = os.path.dirname(__file__)
+    coeff_ab_mo = np.load(os.path.join(current_dir, "naclo4_coeff_ab_mo.npy"))
+    olp_ab_ab = np.load(os.path.join(current_dir, "naclo4_olp_ab_ab.npy"))
+    occupations = np.load(os.path.join(current_dir, "naclo4_occupations.npy"))
+    ab_atom_indices = np.load(os.path.join(current_dir, "naclo4_ab_atom_indices.npy"))
+
+    ab_atom_indices_separated = ab_atom_indices[None, :] == np.arange(6)[:, None]
+    atom_weights = np.zeros((6, 124, 124))
+    atom_weights += (ab_atom_indices_separated * 0.5)[:, :, None]
+    atom_weights += (ab_atom_indices_separated * 0.5)[:, None, :]
+    assert np.allclose(
+        mulliken_populations(coeff_ab_mo, occupations, olp_ab_ab, 6, ab_atom_indices),
+        mulliken_populations(
+            coeff_ab_mo, occupations, olp_ab_ab, 6, ab_atom_indices, atom_weights=atom_weights
+        ),
+        rtol=0,
+        atol=1e-12,
+    )
+    # atoms without basis functions have no population
+    assert np.allclose(
+        mulliken_populations(coeff_ab_mo, occupations, olp_ab_ab, 8, ab_atom_indices)[6:], 0
+    )
+
+
+def test_mulliken_populations_batch():
+    """Test orbtools.mulliken.mulliken_populations_batch."""
+    current_dir = os.path.dirname(__file__)
+    coeff_ab_mo = np.load(os.path.join(current_dir, "naclo4_coeff_ab_mo.npy"))
+    olp_ab_ab = np.load(os.path.join(current_dir, "naclo4_olp_ab_ab.npy"))
+    occupations = np.load(os.path.join(current_dir, "naclo4_occupations.npy"))
+    ab_atom_indices = np.load(os.path.join(current_dir, "naclo4_ab_atom_indices.npy"))
+
+    # rotate the molecular orbitals within the occupied and virtual spaces and smear occupations
+    indices_occ = occupations > 0
+    coeff_stack, occ_stack = [], []
+    for _ in range(3):
+        rotation = np.identity(coeff_ab_mo.shape[1])
+        rotation[np.ix_(indices_occ, indices_occ)] = np.linalg.qr(
+            np.random.rand(np.sum(indices_occ), np.sum(indices_occ))
+        )[0]
+        coeff_stack.append(coeff_ab_mo.dot(rotation))
+        occ_stack.append(occupations * np.random.rand(occupations.size))
+    coeff_stack, occ_stack = np.array(coeff_stack), np.array(occ_stack)
+
+    expected = np.array(
+        [
+            mulliken_populations(coeff, occ, olp_ab_ab, 6, ab_atom_indices)
+            for coeff, occ in zip(coeff_stack, occ_stack)
+        ]
+    )
+    assert np.allclose(
+        mulliken_populations_batch(coeff_stack, occ_stack, olp_ab_ab, 6, ab_atom_indices), expected
+    )
+    assert np.allclose(
+        mulliken_populations_batch(
+            coeff_stack, occ_stack, np.array([olp_ab_ab] * 3), 6, ab_atom_indices
+        ),
+        expected,
+    )
+    atom_weights = np.random.rand(6, 124, 124)
+    atom_weights += np.swapaxes(atom_weights, 1, 2)
+    atom_weights /= np.sum(atom_weights, axis=0)
+    assert np.allclose(
+        mulliken_populations_batch(
+            coeff_stack, occ_stack, olp_ab_ab, 6, ab_atom_indices, atom_weights=atom_weights
+        ),
+        [
+            mulliken_populations(
+                coeff, occ, olp_ab_ab, 6, ab_atom_indices, atom_weights=atom_weights
+            )
+            for coeff, occ in zip(coeff_stack, occ_stack)
+        ],
+    )
+
+    with pytest.raises(TypeError):
+        mulliken_populations_batch(coeff_ab_mo, occupations, olp_ab_ab, 6, ab_atom_indices)
+    with pytest.raises(TypeError):
+        mulliken_populations_batch(coeff_stack, occupations, olp_ab_ab, 6, ab_atom_indices)
+    with pytest.raises(ValueError):
+        mulliken_populations_batch(coeff_stack, occ_stack[:2], olp_ab_ab, 6, ab_atom_indices)
+    with pytest.raises(ValueError):
+        mulliken_populations_batch(
+            coeff_stack, occ_stack, np.array([olp_ab_ab] * 2), 6, ab_atom_indices
+        )
+    with pytest.raises(ValueError):
+        mulliken_populations_batch(coeff_stack * 2, occ_stack, olp_ab_ab, 6, ab_atom_indices)
+    with pytest.raises(ValueError):
+        mulliken_populations_batch(coeff_stack, -occ_stack, olp_ab_ab, 6, ab_atom_indices)
+    with pytest.raises(ValueError):
+        mulliken_populations_batch(coeff_stack, occ_stack, olp_ab_ab, 5, ab_atom_indices)
+
+
+def test_mulliken_populations_density():
+    """Test orbtools.mulliken.mulliken_populations_density."""
+    current_dir = os.path.dirname(__file__)
+    coeff_ab_mo = np.load(os.path.join(current_dir, "naclo4_coeff_ab_mo.npy"))
+    olp_ab_ab = np.load(os.path.join(current_dir, "naclo4_olp_ab_ab.npy"))
+    occupations = np.load(os.path.join(current_dir, "naclo4_occupations.npy"))
+    ab_atom_indices = np.load(os.path.join(current_dir, "naclo4_ab_atom_indices.npy"))
+
+    density = (coeff_ab_mo * occupations).dot(coeff_ab_mo.T)
+    assert np.allclose(
+        mulliken_populations_density(density, olp_ab_ab, 6, ab_atom_indices),
+        mulliken_populations(coeff_ab_mo, occupations, olp_ab_ab, 6, ab_atom_indices),
+    )
+    # stack of non-idempotent densities
+    occ_stack = np.array([occupations * np.random.rand(occupations.size) for _ in range(3)])
+    density_stack = np.array([(coeff_ab_mo * occ).dot(coeff_ab_mo.T) for occ in occ_stack])
+    expected = np.array(
+        [mulliken_populations(coeff_ab_mo, occ, olp_ab_ab, 6, ab_atom_indices) for occ in occ_stack]
+    )
+    assert np.allclose(
+        mulliken_populations_density(density_stack, olp_ab_ab, 6, ab_atom_indices), expected
+    )
+    assert np.allclose(
+        mulliken_populations_density(density_stack, np.array([olp_ab_ab] * 3), 6, ab_atom_indices),
+        expected,
+    )
+
+    with pytest.raises(TypeError):
+        mulliken_populations_density(density.tolist(), olp_ab_ab, 6, ab_atom_indices)
+    with pytest.raises(TypeError):
+        mulliken_populations_density(density.ravel(), olp_ab_ab, 6, ab_atom_indices)
+    with pytest.raises(ValueError):
+        mulliken_populations_density(density[:, :-1], olp_ab_ab, 6, ab_atom_indices)
+    with pytest.raises(ValueError):
+        mulliken_populations_density(density + np.triu(density), olp_ab_ab, 6, ab_atom_indices)
+    with pytest.raises(ValueError):
+        mulliken_populations_density(density_stack, np.array([olp_ab_ab] * 2), 6, ab_atom_indices)
+    with pytest.raises(ValueError):
+        mulliken_populations_density(density, olp_ab_ab, 5, ab_atom_indices)
+
+
+def test_lowdin_populations_density():
+    """Test orbtools.mulliken.lowdin_populations_density."""
+    current_dir = os.path.dirname(__file__)
+    coeff_ab_mo = np.load(os.path.join(current_dir, "naclo4_coeff_ab_mo.npy"))
+    olp_ab_ab = np.load(os.path.join(current_dir, "naclo4_olp_ab_ab.npy"))
+    occupations = np.load(os.path.join(current_dir, "naclo4_occupations.npy"))
+    ab_atom_indices = np.load(os.path.join(current_dir, "naclo4_ab_atom_indices.npy"))
+
+    density = (coeff_ab_mo * occupations).dot(coeff_ab_mo.T)
+    expected = lowdin_populations(coeff_ab_mo, occupations, olp_ab_ab, 6, ab_atom_indices)
+    assert np.allclose(lowdin_populations_density(density, olp_ab_ab, 6, ab_atom_indices), expected)
+    assert np.allclose(
+        lowdin_populations_density(
+            np.array([density] * 2), np.array([olp_ab_ab] * 2), 6, ab_atom_indices
+        ),
+        [expected] * 2,
+    )
+
+
+def test_orbital_contributions():
+    """Test orbtools.mulliken.mulliken_orbital_contributions and lowdin_orbital_contributions."""
+    current_dir = os.path.dirname(__file__)
+    coeff_ab_mo = np.load(os.path.join(current_dir, "naclo4_coeff_ab_mo.npy"))
+    olp_ab_ab = np.load(os.path.join(current_dir, "naclo4_olp_ab_ab.npy"))
+    occupations = np.load(os.path.join(current_dir, "naclo4_occupations.npy"))
+    ab_atom_indices = np.load(os.path.join(current_dir, "naclo4_ab_atom_indices.npy"))
+    sweep_occupations = np.random.rand(124, 3) * 2
+
+    for contributions_func, populations_func in [
+        (mulliken_orbital_contributions, mulliken_populations),
+        (lowdin_orbital_contributions, lowdin_populations),
+    ]:
+        contributions = contributions_func(coeff_ab_mo, olp_ab_ab, 6, ab_atom_indices)
+        assert contributions.shape == (6, 124)
+        assert np.allclose(np.sum(contributions, axis=0), 1)
+        assert np.allclose(
+            contributions.dot(occupations),
+            populations_func(coeff_ab_mo, occupations, olp_ab_ab, 6, ab_atom_indices),
+        )
+        for i in range(3):
+            assert np.allclose(
+                contributions.dot(sweep_occupations)[:, i],
+                populations_func(
+                    coeff_ab_mo, sweep_occupations[:, i], olp_ab_ab, 6, ab_atom_indices
+                ),
+            )
+        with pytest.raises(TypeError):
+            contributions_func(coeff_ab_mo.tolist(), olp_ab_ab, 6, ab_atom_indices)
+        with pytest.raises(ValueError):
+            contributions_func(coeff_ab_mo * 2, olp_ab_ab, 6, ab_atom_indices)
+        with pytest.raises(ValueError):
+            contributions_func(coeff_ab_mo, olp_ab_ab, 6, ab_atom_indices[:-1])
+
+
+def test_overlap_populations():
+    """Test orbtools.mulliken.overlap_populations and orbtools.mulliken.mayer_bond_orders."""
+    current_dir = os.path.dirname(__file__)
+    coeff_ab_mo = np.load(os.path.join(current_dir, "naclo4_coeff_ab_mo.npy"))
+    olp_ab_ab = np.load(os.path.join(current_dir, "naclo4_olp_ab_ab.npy"))
+    olp_aao_ab = np.load(os.path.join(current_dir, "naclo4_olp_aao_ab.npy"))
+    occupations = np.load(os.path.join(current_dir, "naclo4_occupations.npy"))
+    ab_atom_indices = np.load(os.path.join(current_dir, "naclo4_ab_atom_indices.npy"))
+    qab_atom_indices = np.load(os.path.join(current_dir, "naclo4_qab_atom_indices.npy"))
+    density = (coeff_ab_mo * occupations).dot(coeff_ab_mo.T)
+
+    # atomic basis
+    olp_pops = overlap_populations(density, olp_ab_ab, 6, ab_atom_indices)
+    assert olp_pops.shape == (6, 6)
+    assert np.allclose(olp_pops, olp_pops.T)
+    assert np.allclose(
+        np.sum(olp_pops, axis=1),
+        mulliken_populations(coeff_ab_mo, occupations, olp_ab_ab, 6, ab_atom_indices),
+    )
+    bond_orders = mayer_bond_orders(density, olp_ab_ab, 6, ab_atom_indices)
+    density_olp = density.dot(olp_ab_ab)
+    for atom_a in range(6):
+        for atom_b in range(6):
+            indices_a = ab_atom_indices == atom_a
+            indices_b = ab_atom_indices == atom_b
+            assert np.isclose(
+                olp_pops[atom_a, atom_b],
+                np.sum((density * olp_ab_ab)[indices_a][:, indices_b]),
+            )
+            assert np.isclose(
+                bond_orders[atom_a, atom_b],
+                np.sum(
+                    density_olp[indices_a][:, indices_b] * density_olp[indices_b][:, indices_a].T
+                ),
+            )
+    # closed shell: sum of the bond orders is twice the number of electrons
+    assert np.isclose(np.sum(bond_orders), 2 * np.sum(occupations))
+    # Cl-O bond orders are the same by symmetry
+    assert np.isclose(bond_orders[1, 2], bond_orders[1, 5], atol=1e-3)
+
+    # stack and sparse output
+    assert np.allclose(
+        overlap_populations(np.array([density] * 2), olp_ab_ab, 6, ab_atom_indices),
+        [olp_pops] * 2,
+    )
+    sparse_bond_orders = mayer_bond_orders(density, olp_ab_ab, 6, ab_atom_indices, drop_tol=0.1)
+    assert scipy.sparse.issparse(sparse_bond_orders)
+    assert np.allclose(
+        sparse_bond_orders.toarray(), np.where(np.abs(bond_orders) > 0.1, bond_orders, 0)
+    )
+    assert sparse_bond_orders.nnz == np.sum(np.abs(bond_orders) > 0.1)
+    sparse_list = overlap_populations(
+        np.array([density] * 2), olp_ab_ab, 6, ab_atom_indices, drop_tol=0
+    )
+    assert len(sparse_list) == 2 and np.allclose(sparse_list[1].toarray(), olp_pops)
+    # basis functions that are not sorted by atom, reduced in blocks of rows
+    perm = np.random.permutation(ab_atom_indices.size)
+    set_memory_budget(2000)
+    try:
+        assert np.allclose(
+            overlap_populations(
+                np.array([density[np.ix_(perm, perm)]] * 2),
+                olp_ab_ab[np.ix_(perm, perm)],
+                6,
+                ab_atom_indices[perm],
+            ),
+            [olp_pops] * 2,
+        )
+        assert np.allclose(
+            mayer_bond_orders(
+                density[np.ix_(perm, perm)], olp_ab_ab[np.ix_(perm, perm)], 6, ab_atom_indices[perm]
+            ),
+            bond_orders,
+        )
+    finally:
+        set_memory_budget(None)
+
+    # QUAMBO basis
+    indices_span = occupations > 0
+    coeff_ab_quambo = quambo(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span)
+    olp_quambo_quambo = coeff_ab_quambo.T.dot(olp_ab_ab).dot(coeff_ab_quambo)
+    coeff_quambo_omo = project(
+        olp_quambo_quambo, coeff_ab_quambo.T.dot(olp_ab_ab).dot(coeff_ab_mo[:, indices_span])
+    )
+    density_quambo = (coeff_quambo_omo * occupations[indices_span]).dot(coeff_quambo_omo.T)
+    olp_pops = overlap_populations(density_quambo, olp_quambo_quambo, 6, qab_atom_indices)
+    assert np.allclose(
+        np.sum(olp_pops, axis=1),
+        mulliken_populations(
+            coeff_quambo_omo, occupations[indices_span], olp_quambo_quambo, 6, qab_atom_indices
+        ),
+    )
+    bond_orders = mayer_bond_orders(density_quambo, olp_quambo_quambo, 6, qab_atom_indices)
+    assert np.isclose(np.sum(bond_orders), 2 * np.sum(occupations))
+
+    with pytest.raises(TypeError):
+        overlap_populations(density, olp_ab_ab, 6, ab_atom_indices, drop_tol="0.1")
+    with pytest.raises(ValueError):
+        mayer_bond_orders(density, olp_ab_ab, 6, ab_atom_indices, drop_tol=-1)
+    with pytest.raises(ValueError):
+        mayer_bond_orders(density, olp_ab_ab, 5, ab_atom_indices)
+
+
+def test_populations_memory_budget():
+    """Test the memory budget of orbtools.mulliken.mulliken_populations and its density variant."""
+    current_dir = os.path.dirname(__file__)
+    coeff_ab_mo = np.load(os.path.join(current_dir, "naclo4_coeff_ab_mo.npy"))
+    olp_ab_ab = np.load(os.path.join(current_dir, "naclo4_olp_ab_ab.npy"))
+    occupations = np.load(os.path.join(current_dir, "naclo4_occupations.npy"))
+    ab_atom_indices = np.load(os.path.join(current_dir, "naclo4_ab_atom_indices.npy"))
+    density = (coeff_ab_mo * occupations).dot(coeff_ab_mo.T)
+    atom_weights = np.random.rand(6, 124, 124)
+    atom_weights += np.swapaxes(atom_weights, 1, 2)
+    atom_weights /= np.sum(atom_weights, axis=0)
+
+    for weights in [None, atom_weights]:
+        expected = mulliken_populations(
+            coeff_ab_mo, occupations, olp_ab_ab, 6, ab_atom_indices, atom_weights=weights
+        )
+        # one row per block, a few rows per block, and everything in one block
+        for memory_budget in [1, 20000, 10 ** 9]:
+            assert np.allclose(
+                mulliken_populations(
+                    coeff_ab_mo,
+                    occupations,
+                    olp_ab_ab,
+                    6,
+                    ab_atom_indices,
+                    atom_weights=weights,
+                    memory_budget=memory_budget,
+                ),
+                expected,
+                rtol=0,
+                atol=1e-12,
+            )
+            assert np.allclose(
+                mulliken_populations_density(
+                    np.array([density, 2 * density]),
+                    olp_ab_ab,
+                    6,
+                    ab_atom_indices,
+                    atom_weights=weights,
+                    memory_budget=memory_budget,
+                ),
+                [expected, 2 * expected],
+                rtol=0,
+                atol=1e-12,
+            )
+
+    with pytest.raises(TypeError):
+        mulliken_populations(
+            coeff_ab_mo, occupations, olp_ab_ab, 6, ab_atom_indices, memory_budget=1e6
+        )
+    with pytest.raises(ValueError):
+        mulliken_populations_density(density, olp_ab_ab, 6, ab_atom_indices, memory_budget=0)
+    with pytest.raises(ValueError):
+        mulliken_populations_density(
+            density + np.triu(density), olp_ab_ab, 6, ab_atom_indices, memory_budget=20000
+        )
@@ -1,5 +1,6 @@
 """Tests for orbtools.orthogonalization."""
 import numpy as np
+from orbtools.cache import clear_cache, factorizations
 import orbtools.orthogonalization as orth
 import pytest
 
@@ -9,7 +10,7 @@ def test_eigh():
     with pytest.raises(TypeError):
         orth.eigh(np.random.rand(3, 3).tolist())
     with pytest.raises(TypeError):
-        orth.eigh(np.random.rand(3, 3, 3))
+        orth.eigh(np.random.rand(3))
     with pytest.raises(ValueError):
         orth.eigh(np.random.rand(3, 5))
     with pytest.raises(ValueError):
@@ -41,6 +42,52 @@ def test_eigh():
     matrix = matrix + matrix.T
     eigval, eigvec = orth.eigh(matrix)
     assert np.allclose((eigvec * eigval).dot(eigvec.T), matrix)
+    # drivers and largest eigenvalues
+    for driver in orth.EIGH_DRIVERS:
+        eigval_driver, eigvec_driver = orth.eigh(matrix, driver=driver)
+        assert np.allclose(eigval_driver, eigval)
+        assert np.allclose((eigvec_driver * eigval_driver).dot(eigvec_driver.T), matrix)
+        eigval_top, eigvec_top = orth.eigh(matrix, num_top=5, driver=driver)
+        assert np.allclose(eigval_top, eigval[:5])
+        assert np.allclose(np.abs(eigvec_top.T.dot(eigvec[:, :5])), np.identity(5))
+    matrix = np.random.rand(300, 300)
+    matrix = matrix + matrix.T
+    eigval, eigvec = orth.eigh(matrix)
+    eigval_top, eigvec_top = orth.eigh(matrix.copy(), num_top=10, overwrite=True)
+    assert np.allclose(eigval_top, eigval[:10])
+    assert np.allclose(np.abs(eigvec_top.T.dot(eigvec[:, :10])), np.identity(10))
+    assert np.allclose(orth.eigh(matrix, num_top=300)[0], eigval)
+    assert orth.eigh(matrix, num_top=0)[1].shape == (300, 0)
+    with pytest.raises(TypeError):
+        orth.eigh(matrix, num_top=1.0)
+    with pytest.raises(ValueError):
+        orth.eigh(matrix, num_top=-1)
+    with pytest.raises(ValueError):
+        orth.eigh(matrix, driver="gesdd")
+    # stack of matrices
+    matrices = np.random.rand(4, 3, 6, 6)
+    matrices = matrices + np.swapaxes(matrices, -1, -2)
+    matrices[0, 1] = np.diag([1.0, 2, 0, 0, -3, 4])
+    eigval, eigvec, mask = orth.eigh(matrices)
+    assert eigval.shape == (4, 3, 6) and eigvec.shape == (4, 3, 6, 6) and mask.shape == (4, 3, 6)
+    assert np.allclose(eigval[0, 1], [4, 2, 1, -3, 0, 0])
+    assert np.all(mask[0, 1] == [True, True, True, True, False, False])
+    assert np.allclose(eigvec[0, 1, :, 4:], 0)
+    for i in range(4):
+        for j in range(3):
+            eigval_ref, eigvec_ref = orth.eigh(matrices[i, j])
+            num_kept = eigval_ref.size
+            assert np.sum(mask[i, j]) == num_kept
+            assert np.allclose(eigval[i, j, :num_kept], eigval_ref)
+            assert np.allclose(np.abs(eigvec[i, j, :, :num_kept]), np.abs(eigvec_ref))
+    assert orth.eigh(matrices, num_top=2)[0].shape == (4, 3, 2)
+    matrices[0, 0] = np.zeros((6, 6))
+    matrices[0, 1] = np.zeros((6, 6))
+    assert orth.eigh(matrices[0, :2])[0].shape == (2, 0)
+    with pytest.raises(ValueError):
+        orth.eigh(matrices, driver="evr")
+    with pytest.raises(ValueError):
+        orth.eigh(np.random.rand(2, 3, 3))
 
 
 def test_svd():
@@ -48,7 +95,7 @@ def test_svd():
     with pytest.raises(TypeError):
         orth.svd(np.random.rand(3, 3).tolist())
     with pytest.raises(TypeError):
-        orth.svd(np.random.rand(3, 3, 3))
+        orth.svd(np.random.rand(3))
     matrix = np.array(
         [
             [0.20090975, 0.97054546, 0.28661335, 0.07573257, 0.3917035, 0.75842177],
@@ -105,3 +152,164 @@ def test_power_symmetric():
     matrix = matrix + matrix.T
     with pytest.raises(ValueError):
         orth.power_symmetric(matrix, 0.5)
+    # stack of matrices
+    matrices = np.random.rand(4, 3, 6, 6)
+    matrices = np.matmul(matrices, np.swapaxes(matrices, -1, -2))
+    for power in [2, -1, 0.5, -0.5]:
+        assert np.allclose(
+            orth.power_symmetric(matrices, power),
+            [[orth.power_symmetric(matrix, power) for matrix in row] for row in matrices],
+        )
+    # singular matrices in the stack
+    matrices[0, 0] = np.diag([2.0, 1, 1, 1, 1, 0])
+    assert np.allclose(orth.power_symmetric(matrices, -1)[0, 0], np.diag([0.5, 1, 1, 1, 1, 0]))
+    with pytest.raises(ValueError):
+        orth.power_symmetric(matrices - 2 * np.identity(6), 0.5)
+
+
+def test_power_symmetric_newton_schulz(capsys):
+    """Test orbtools.orthogonalization.power_symmetric with the Newton-Schulz iteration."""
+    clear_cache()
+    matrix = np.random.rand(40, 40)
+    matrix = matrix.dot(matrix.T) + 10 * np.identity(40)
+    for power in [0.5, -0.5, -1]:
+        assert np.allclose(
+            orth.power_symmetric(matrix, power, method="newton_schulz"),
+            orth.power_symmetric(matrix, power),
+        )
+    assert capsys.readouterr().out == ""
+    sqrt = orth.power_symmetric(matrix, 0.5, method="newton_schulz", tol=1e-14)
+    assert np.allclose(sqrt, sqrt.T)
+    assert np.allclose(sqrt.dot(sqrt), matrix)
+    inverse = orth.power_symmetric(matrix, -1, method="newton_schulz", tol=1e-14)
+    assert np.allclose(inverse.dot(matrix), np.identity(40))
+    # both square roots are computed together
+    clear_cache()
+    orth.power_symmetric(matrix, 0.5, method="newton_schulz")
+    key = factorizations.key(matrix, 1e-9)
+    assert factorizations.lookup(key, ("power", -0.5, "newton_schulz")) is not None
+    assert factorizations.lookup(key, ("power", -0.5)) is None
+
+    # ill conditioned matrix
+    clear_cache()
+    matrix = np.diag([1.0, 1e-8, 2.0])
+    assert np.allclose(
+        orth.power_symmetric(matrix, -0.5, method="newton_schulz"), np.diag([1, 1e4, 2 ** -0.5])
+    )
+    assert "condition number" in capsys.readouterr().out
+    # not positive definite
+    matrix = np.diag([1.0, -1.0, 2.0])
+    assert np.allclose(
+        orth.power_symmetric(matrix, -1, method="newton_schulz"), np.diag([1, -1, 0.5])
+    )
+    assert "not positive definite" in capsys.readouterr().out
+    with pytest.raises(ValueError):
+        orth.power_symmetric(matrix, 0.5, method="newton_schulz")
+    # not converged
+    matrix = np.diag([1.0, 0.01, 2.0])
+    assert np.allclose(
+        orth.power_symmetric(matrix, -1, method="newton_schulz", max_iter=2),
+        np.diag([1, 100, 0.5]),
+    )
+    assert "did not converge within 2 iterations" in capsys.readouterr().out
+
+    with pytest.raises(ValueError):
+        orth.power_symmetric(matrix, 0.5, method="pade")
+    with pytest.raises(ValueError):
+        orth.power_symmetric(matrix, 2, method="newton_schulz")
+    with pytest.raises(ValueError):
+        orth.power_symmetric(np.array([matrix, matrix]), 0.5, method="newton_schulz")
+    with pytest.raises(TypeError):
+        orth.power_symmetric(matrix.tolist(), 0.5, method="newton_schulz")
+    with pytest.raises(ValueError):
+        orth.power_symmetric(np.random.rand(3, 4), 0.5, method="newton_schulz")
+    with pytest.raises(ValueError):
+        orth.power_symmetric(np.random.rand(3, 3) + np.diag([0, 1, 0]), 0.5, method="newton_schulz")
+    with pytest.raises(TypeError):
+        orth.power_symmetric(matrix, 0.5, method="newton_schulz", tol="1e-10")
+    with pytest.raises(ValueError):
+        orth.power_symmetric(matrix, 0.5, method="newton_schulz", tol=0)
+    with pytest.raises(TypeError):
+        orth.power_symmetric(matrix, 0.5, method="newton_schulz", max_iter=10.0)
+    with pytest.raises(ValueError):
+        orth.power_symmetric(matrix, 0.5, method="newton_schulz", max_iter=0)
+    clear_cache()
+
+
+def test_svd_stack():
+    """Test orbtools.orthogonalization.svd with a stack of matrices."""
+    matrices = np.random.rand(5, 4, 7)
+    matrices[2, 3] = matrices[2, 2]
+    u, sigma, vdagger, mask = orth.svd(matrices)
+    assert u.shape == (5, 4, 4) and sigma.shape == (5, 4) and vdagger.shape == (5, 4, 7)
+    assert np.all(mask[:2]) and np.all(mask[3:]) and np.sum(mask[2]) == 3
+    assert np.allclose(u[2, :, 3], 0) and sigma[2, 3] == 0 and np.allclose(vdagger[2, 3], 0)
+    assert np.allclose(np.matmul(u * sigma[:, None, :], vdagger), matrices)
+    for matrix, sigma_matrix in zip(matrices, sigma):
+        sigma_ref = orth.svd(matrix)[1]
+        assert np.allclose(sigma_matrix[: sigma_ref.size], sigma_ref)
+    u, sigma, vdagger, mask = orth.svd(matrices, num_top=2)
+    assert u.shape == (5, 4, 2) and sigma.shape == (5, 2) and vdagger.shape == (5, 2, 7)
+    with pytest.raises(ValueError):
+        orth.svd(matrices, driver="gram")
+
+
+def test_svd_num_top():
+    """Test orbtools.orthogonalization.svd with a subset of the singular values."""
+    for shape in [(30, 40), (300, 250)]:
+        matrix = np.random.rand(*shape)
+        u, sigma, vdagger = orth.svd(matrix)
+        assert np.allclose((u * sigma).dot(vdagger), matrix)
+        for driver in orth.SVD_DRIVERS:
+            u_top, sigma_top, vdagger_top = orth.svd(matrix, num_top=4, driver=driver)
+            assert np.allclose(sigma_top, sigma[:4])
+            assert np.allclose(np.abs(u_top.T.dot(u[:, :4])), np.identity(4))
+            assert np.allclose(np.abs(vdagger_top.dot(vdagger[:4].T)), np.identity(4))
+            assert np.allclose(u_top.dot(u_top.T).dot(matrix), (u * sigma)[:, :4].dot(vdagger[:4]))
+        u_top, sigma_top, vdagger_top = orth.svd(matrix.copy(), num_top=4, overwrite=True)
+        assert np.allclose(sigma_top, sigma[:4])
+        assert np.allclose(np.abs(vdagger_top.dot(vdagger[:4].T)), np.identity(4))
+    # singular values that cannot be resolved from the Gram matrix
+    u = np.linalg.qr(np.random.rand(300, 250))[0]
+    vdagger = np.linalg.qr(np.random.rand(250, 250))[0]
+    sigma = np.logspace(0, -12, 250)
+    matrix = (u * sigma).dot(vdagger)
+    sigma_top = orth.svd(matrix, num_top=249, driver="gram", threshold=0)[1]
+    assert np.allclose(sigma_top, sigma[:249], rtol=1e-3, atol=0)
+    with pytest.raises(TypeError):
+        orth.svd(matrix, num_top="1")
+    with pytest.raises(ValueError):
+        orth.svd(matrix, num_top=-1)
+    with pytest.raises(ValueError):
+        orth.svd(matrix, driver="evr")
+
+
+def test_truncated_svd(capsys):
+    """Test orbtools.orthogonalization.truncated_svd."""
+    u = np.linalg.qr(np.random.rand(60, 40))[0]
+    vdagger = np.linalg.qr(np.random.rand(200, 40))[0].T
+    sigma = np.exp(-np.arange(40) / 2)
+    matrix = (u * sigma).dot(vdagger)
+    for method in ["randomized", "lanczos"]:
+        for mat, u_ref, vdagger_ref in [(matrix, u, vdagger), (matrix.T, vdagger.T, u.T)]:
+            u_top, sigma_top, vdagger_top = orth.truncated_svd(mat, 5, method=method)
+            assert np.allclose(sigma_top, sigma[:5])
+            assert np.allclose(np.abs(u_top.T.dot(u_ref[:, :5])), np.identity(5))
+            assert np.allclose(np.abs(vdagger_top.dot(vdagger_ref[:5].T)), np.identity(5))
+        # all singular values
+        assert np.allclose(orth.truncated_svd(matrix, 40, method=method, threshold=0)[1], sigma)
+        assert orth.truncated_svd(matrix, 0, method=method)[1].size == 0
+    # inaccurate singular values are recomputed
+    capsys.readouterr()
+    sigma_top = orth.truncated_svd(matrix, 20, num_oversamples=0, num_iter=0, rtol=1e-12)[1]
+    assert "Full SVD is used instead" in capsys.readouterr().out
+    assert np.allclose(sigma_top, sigma[:20])
+    # errors
+    with pytest.raises(TypeError):
+        orth.truncated_svd(matrix.tolist(), 5)
+    with pytest.raises(TypeError):
+        orth.truncated_svd(matrix, None)
+    with pytest.raises(ValueError):
+        orth.truncated_svd(matrix, -1)
+    with pytest.raises(ValueError):
+        orth.truncated_svd(matrix, 5, method="gram")
@@ -3,11 +3,24 @@ import os
 
 import numpy as np
 from orbtools.mulliken import mulliken_populations
-from orbtools.quasi import _check_input, make_mmo, project, quambo, quao
+from orbtools import quasi
+from orbtools.quasi import (
+    _check_input,
+    make_mmo,
+    make_mmo_sweep,
+    normalize_projections,
+    project,
+    QuasiAtomicBuilder,
+    quambo,
+    quambo_sweep,
+    quao,
+    quao_sweep,
+    solve_projection,
+)
 import pytest
 
 
-def test_project():
+def test_project(capsys):
     """Test the orbtools.quasi.project."""
     olp_1 = np.identity(10)
     # (trivial) projecting onto same space
@@ -33,7 +46,22 @@ def test_project():
     olp_1 = np.identity(10)
     olp_1_2 = np.hstack([np.identity(10)] * 2)
     assert np.allclose(project(olp_1, olp_1_2), np.hstack([np.identity(10)] * 2))
+    # general overlap (cholesky) agrees with the inverse from the eigendecomposition
+    coeff_1 = np.random.rand(10, 10) + 3 * np.identity(10)
+    olp_1 = normalize(np.identity(10), coeff_1)
+    olp_1 = olp_1.T.dot(olp_1)
+    olp_1_2 = np.random.rand(10, 4)
+    coeff_1_proj = np.linalg.solve(olp_1, olp_1_2)
+    assert np.allclose(project(olp_1, olp_1_2), normalize(olp_1, coeff_1_proj))
+    # rank of the projections
+    capsys.readouterr()
+    project(olp_1, np.hstack([olp_1_2, olp_1_2[:, :1] * 2]))
+    assert "1 linearly dependent projections" in capsys.readouterr().out
+    project(olp_1, np.hstack([olp_1_2, olp_1_2[:, :1] * 2]), validate="off")
+    assert capsys.readouterr().out == ""
     # errors
+    olp_1 = np.identity(10)
+    olp_1_2 = np.hstack([np.identity(10)] * 2)
     with pytest.raises(TypeError):
         project(olp_1.tolist(), olp_1_2)
     with pytest.raises(TypeError):
@@ -46,6 +74,8 @@ def test_project():
         project(olp_1, olp_1_2.reshape(10, 20, 1))
     with pytest.raises(ValueError):
         project(olp_1, olp_1_2.T)
+    with pytest.raises(ValueError):
+        project(np.triu(np.ones((10, 10))), olp_1_2)
 
 
 def normalize(olp, coeff):
@@ -53,6 +83,41 @@ def normalize(olp, coeff):
     return coeff * norm ** (-0.5)
 
 
+def test_solve_projection():
+    """Test orbtools.quasi.solve_projection."""
+    coeff_1 = np.random.rand(10, 10) + 3 * np.identity(10)
+    olp_1 = coeff_1.T.dot(coeff_1)
+    olp_1_2 = np.random.rand(10, 4)
+    assert np.allclose(solve_projection(olp_1, olp_1_2), np.linalg.solve(olp_1, olp_1_2))
+    # singular overlap (pseudoinverse)
+    olp_1 = np.identity(20)
+    olp_1[:10, 10:] = np.identity(10)
+    olp_1[10:, :10] = np.identity(10)
+    olp_1_2 = np.vstack([np.identity(10)] * 2)
+    assert np.allclose(olp_1.dot(solve_projection(olp_1, olp_1_2)), olp_1_2)
+
+
+def test_normalize_projections(capsys):
+    """Test orbtools.quasi.normalize_projections."""
+    olp_1 = np.identity(4)
+    coeff_1_proj = np.array([[2.0, 0, 1], [0, 0, 1], [0, 0, 0], [0, 0, 0]])
+    olp_proj_proj = coeff_1_proj.T.dot(olp_1).dot(coeff_1_proj)
+    assert np.allclose(
+        normalize_projections(coeff_1_proj, olp_proj_proj),
+        [[1, 2 ** -0.5], [0, 2 ** -0.5], [0, 0], [0, 0]],
+    )
+    # input is not modified
+    assert coeff_1_proj[0, 0] == 2
+    assert capsys.readouterr().out == ""
+    # linearly dependent projections
+    coeff_1_proj = np.array([[1.0, 2], [1, 2], [0, 0], [0, 0]])
+    olp_proj_proj = coeff_1_proj.T.dot(olp_1).dot(coeff_1_proj)
+    normalize_projections(coeff_1_proj, olp_proj_proj)
+    assert "1 linearly dependent projections" in capsys.readouterr().out
+    normalize_projections(coeff_1_proj, olp_proj_proj, validate="off")
+    assert capsys.readouterr().out == ""
+
+
 def test_check_input():
     """Test the orbtools.quasi._check_input."""
     # olp_ab_ab
@@ -224,6 +289,13 @@ def test_quambo_old_code():
     coeff_ab_quambo = np.load(os.path.join(current_dir, "naclo4_coeff_ab_quambo.npy"))
     olp_aao_ab = np.load(os.path.join(current_dir, "naclo4_olp_aao_ab.npy"))
     assert np.allclose(coeff_ab_quambo, quambo(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span))
+    for svd_method in ["randomized", "lanczos"]:
+        assert np.allclose(
+            coeff_ab_quambo,
+            quambo(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span, svd_method=svd_method),
+        )
+    with pytest.raises(ValueError):
+        quambo(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span, svd_method="gram")
 
 
 def test_quao_old_code():
@@ -245,6 +317,18 @@ def test_quao_old_code():
     assert np.allclose(
         coeff_ab_quao, quao(olp_ab_ab, olp_aao_ab, olp_aao_aao, coeff_ab_mo, indices_span)
     )
+    for svd_method in ["randomized", "lanczos"]:
+        assert np.allclose(
+            coeff_ab_quao,
+            quao(
+                olp_ab_ab,
+                olp_aao_ab,
+                olp_aao_aao,
+                coeff_ab_mo,
+                indices_span,
+                svd_method=svd_method,
+            ),
+        )
 
 
 def test_quambo():
@@ -311,3 +395,93 @@ def test_quao():
     assert np.allclose(
         partial_pop, np.array([0.967, 2.498, -0.819, -0.914, -0.914, -0.819]), atol=1e-3
     )
+
+
+def test_sweep():
+    """Test orbtools.quasi.make_mmo_sweep, quambo_sweep, and quao_sweep."""
+    current_dir = os.path.dirname(__file__)
+    coeff_ab_mo = np.load(os.path.join(current_dir, "naclo4_coeff_ab_mo.npy"))
+    olp_ab_ab = np.load(os.path.join(current_dir, "naclo4_olp_ab_ab.npy"))
+    olp_aao_ab = np.load(os.path.join(current_dir, "naclo4_olp_aao_ab.npy"))
+    olp_aao_aao = np.load(os.path.join(current_dir, "naclo4_olp_aao_aao.npy"))
+    occupations = np.load(os.path.join(current_dir, "naclo4_occupations.npy"))
+    indices_span = occupations > 0
+    dims = [32, None, 30, 40]
+
+    coeffs = make_mmo_sweep(olp_aao_ab, coeff_ab_mo, indices_span, dims)
+    for dim, coeff in zip([32, 35, 30, 40], coeffs):
+        coeff_ref = make_mmo(olp_aao_ab, coeff_ab_mo, indices_span, dim_mmo=dim)
+        assert coeff.shape == coeff_ref.shape
+        # same space (signs of the singular vectors are arbitrary)
+        assert np.allclose(np.abs(coeff.T.dot(olp_ab_ab).dot(coeff_ref)), np.identity(dim))
+
+    coeffs = quambo_sweep(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span, dims)
+    for dim, coeff in zip(dims, coeffs):
+        assert np.allclose(coeff, quambo(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span, dim=dim))
+    coeffs = quao_sweep(olp_ab_ab, olp_aao_ab, olp_aao_aao, coeff_ab_mo, indices_span, dims)
+    for dim, coeff in zip(dims, coeffs):
+        assert np.allclose(
+            coeff, quao(olp_ab_ab, olp_aao_ab, olp_aao_aao, coeff_ab_mo, indices_span, dim=dim)
+        )
+
+    with pytest.raises(TypeError):
+        quambo_sweep(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span, 32)
+    with pytest.raises(TypeError):
+        quambo_sweep(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span, [])
+    with pytest.raises(TypeError):
+        quambo_sweep(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span, [32.0])
+    with pytest.raises(ValueError):
+        quao_sweep(olp_ab_ab, olp_aao_ab, olp_aao_aao, coeff_ab_mo, indices_span, [32, 29])
+    with pytest.raises(ValueError):
+        make_mmo_sweep(olp_aao_ab, coeff_ab_mo, indices_span, [125])
+
+
+def test_quasi_atomic_builder(monkeypatch):
+    """Test orbtools.quasi.QuasiAtomicBuilder."""
+    current_dir = os.path.dirname(__file__)
+    coeff_ab_mo = np.load(os.path.join(current_dir, "naclo4_coeff_ab_mo.npy"))
+    olp_ab_ab = np.load(os.path.join(current_dir, "naclo4_olp_ab_ab.npy"))
+    olp_aao_ab = np.load(os.path.join(current_dir, "naclo4_olp_aao_ab.npy"))
+    olp_aao_aao = np.load(os.path.join(current_dir, "naclo4_olp_aao_aao.npy"))
+    occupations = np.load(os.path.join(current_dir, "naclo4_occupations.npy"))
+    indices_span = occupations > 0
+
+    builder = QuasiAtomicBuilder(olp_aao_aao)
+    olp_inv_sqrt = builder.olp_aao_aao_inv_sqrt
+    assert np.allclose(olp_inv_sqrt.dot(olp_aao_aao).dot(olp_inv_sqrt), np.identity(35))
+    assert np.allclose(
+        builder.quao(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span),
+        quao(olp_ab_ab, olp_aao_ab, olp_aao_aao, coeff_ab_mo, indices_span),
+    )
+    assert np.allclose(
+        builder.quambo(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span, dim=36),
+        quambo(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span, dim=36),
+    )
+
+    # overlap of the atomic basis functions is only validated once
+    num_checks = []
+    is_psd = quasi._is_positive_semidefinite
+    monkeypatch.setattr(
+        quasi,
+        "_is_positive_semidefinite",
+        lambda matrix, level: num_checks.append(level) or is_psd(matrix, level),
+    )
+    builder.quao(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span)
+    builder.quambo(olp_ab_ab.copy(), olp_aao_ab, coeff_ab_mo, indices_span)
+    assert "full" not in num_checks
+    builder.validate = "cheap"
+    builder.quao(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span)
+    builder.quao(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span)
+    assert num_checks.count("cheap") == 1
+    # modified overlap is validated again
+    olp_ab_ab[0, 1] += 0.1
+    with pytest.raises(ValueError):
+        builder.quao(olp_ab_ab, olp_aao_ab, coeff_ab_mo, indices_span)
+    with pytest.raises(ValueError):
+        builder.quambo(olp_ab_ab[:-1, :-1], olp_aao_ab, coeff_ab_mo, indices_span)
+    # reference overlap is checked once
+    with pytest.raises(ValueError):
+        QuasiAtomicBuilder(2 * olp_aao_aao)
+    with pytest.raises(TypeError):
+        QuasiAtomicBuilder(olp_aao_aao.tolist())
+    QuasiAtomicBuilder(2 * olp_aao_aao, validate="off")
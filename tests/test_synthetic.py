@@ -0,0 +1,147 @@
+"""Test orbtools.synthetic."""
+import numpy as np
+from orbtools.quasi import quao
+from orbtools.synthetic import format_scaling_report, gaussian_overlap, make_system, scaling_report
+import pytest
+
+
+def test_gaussian_overlap():
+    """Test orbtools.synthetic.gaussian_overlap."""
+    exponents = np.array([0.5, 2.0])
+    centers = np.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0]])
+    olp = gaussian_overlap(exponents, centers, exponents, centers)
+    assert np.allclose(np.diag(olp), 1)
+    assert np.allclose(olp, olp.T)
+    # product of normalized Gaussians integrated on a grid
+    grid = np.linspace(-8, 8, 321)
+    step = grid[1] - grid[0]
+    points = np.stack(np.meshgrid(grid, grid, grid, indexing="ij"), axis=-1)
+    values = [
+        (2 * exponent / np.pi) ** 0.75 * np.exp(-exponent * np.sum((points - center) ** 2, axis=-1))
+        for exponent, center in zip(exponents, centers)
+    ]
+    assert np.isclose(olp[0, 1], np.sum(values[0] * values[1]) * step ** 3, atol=1e-6)
+
+
+def test_make_system():
+    """Test orbtools.synthetic.make_system."""
+    system = make_system(30, ab_per_atom=8, aao_per_atom=4, seed=1)
+    olp_ab_ab = system["olp_ab_ab"]
+    coeff_ab_mo = system["coeff_ab_mo"]
+    assert olp_ab_ab.shape == (240, 240)
+    assert system["olp_aao_ab"].shape == (120, 240)
+    assert system["olp_aao_aao"].shape == (120, 120)
+    assert coeff_ab_mo.shape == (240, 240)
+    assert system["num_atoms"] == 30
+    assert np.array_equal(system["ab_atom_indices"], np.repeat(np.arange(30), 8))
+    assert np.array_equal(system["aao_atom_indices"], np.repeat(np.arange(30), 4))
+    assert system["atom_coords"].shape == (30, 3)
+
+    # normalized, positive definite, and local overlaps
+    for olp in [olp_ab_ab, system["olp_aao_aao"]]:
+        assert np.allclose(np.diag(olp), 1)
+        assert np.allclose(olp, olp.T)
+        assert np.min(np.linalg.eigvalsh(olp)) > 1e-6
+    distances = np.linalg.norm(
+        system["atom_coords"][:, None] - system["atom_coords"][None, :], axis=-1
+    )
+    far = distances[np.ix_(system["ab_atom_indices"], system["ab_atom_indices"])] > 10
+    assert np.all(np.abs(olp_ab_ab[far]) < 1e-4)
+    # orthonormal molecular orbitals, sorted by energy
+    assert np.allclose(coeff_ab_mo.T.dot(olp_ab_ab).dot(coeff_ab_mo), np.identity(240))
+    assert np.all(np.diff(system["mo_energies"]) >= 0)
+    assert np.sum(system["occupations"]) == 120
+    assert np.array_equal(system["indices_span"], np.arange(240) < 60)
+
+    # reproducible with a seed
+    other = make_system(30, ab_per_atom=8, aao_per_atom=4, seed=1)
+    assert np.array_equal(other["olp_ab_ab"], olp_ab_ab)
+    assert np.array_equal(other["coeff_ab_mo"], coeff_ab_mo)
+    assert not np.allclose(
+        make_system(30, ab_per_atom=8, aao_per_atom=4, seed=2)["olp_ab_ab"], olp_ab_ab
+    )
+
+    # inputs of the analyses
+    system = make_system(8, seed=0, num_occupied=10)
+    assert np.sum(system["indices_span"]) == 10
+    coeff_ab_quao = quao(
+        system["olp_ab_ab"],
+        system["olp_aao_ab"],
+        system["olp_aao_aao"],
+        system["coeff_ab_mo"],
+        system["indices_span"],
+    )
+    assert coeff_ab_quao.shape == (80, 40)
+
+    # given positions of the atoms
+    atom_coords = system["atom_coords"] + 0.1
+    moved = make_system(8, seed=0, atom_coords=atom_coords)
+    assert np.allclose(moved["atom_coords"], atom_coords)
+    assert np.allclose(moved["olp_ab_ab"], system["olp_ab_ab"])
+    atom_coords[0] += 1.0
+    assert not np.allclose(
+        make_system(8, seed=0, atom_coords=atom_coords)["olp_ab_ab"], moved["olp_ab_ab"]
+    )
+
+    with pytest.raises(TypeError):
+        make_system(0)
+    with pytest.raises(TypeError):
+        make_system(2.0)
+    with pytest.raises(TypeError):
+        make_system(2, ab_per_atom=True)
+    with pytest.raises(TypeError):
+        make_system(2, num_occupied=-1)
+    with pytest.raises(ValueError):
+        make_system(2, ab_per_atom=4, aao_per_atom=5)
+    with pytest.raises(ValueError):
+        make_system(2, num_occupied=11)
+    with pytest.raises(TypeError):
+        make_system(2, atom_coords=[[0.0, 0.0, 0.0]] * 2)
+    with pytest.raises(ValueError):
+        make_system(2, atom_coords=np.zeros((3, 3)))
+
+
+def test_scaling_report():
+    """Test orbtools.synthetic.scaling_report and orbtools.synthetic.format_scaling_report."""
+    report = scaling_report(
+        [60, 120], ab_per_atom=6, aao_per_atom=3, analyses=["quao", "mulliken_populations"]
+    )
+    assert len(report["records"]) == 4
+    record = report["records"][0]
+    assert record["analysis"] == "quao"
+    assert (record["num_ab"], record["num_mo"], record["num_atoms"], record["num_aao"]) == (
+        60,
+        60,
+        10,
+        30,
+    )
+    assert record["time"] > 0
+    assert record["peak_bytes"] > 0
+    assert record["input_bytes"] == 8 * (60 * 60 * 2 + 30 * 60 + 30 * 30)
+    assert "make_mmo" in record["stages"]
+    assert set(report["fits"]) == {"quao", "mulliken_populations"}
+    prefactor, exponent = report["fits"]["quao"]["peak_bytes"]
+    assert prefactor > 0 and exponent > 0
+    assert [(item["analysis"], item["num_ab"]) for item in report["extrapolations"]] == [
+        ("quao", 10000),
+        ("quao", 20000),
+        ("quao", 50000),
+        ("mulliken_populations", 10000),
+        ("mulliken_populations", 20000),
+        ("mulliken_populations", 50000),
+    ]
+    assert np.isclose(report["extrapolations"][0]["peak_bytes"], prefactor * 10000 ** exponent)
+
+    table = format_scaling_report(report)
+    assert "quao" in table and "mulliken_populations" in table and "50000" in table
+
+    # a single size cannot be fit
+    report = scaling_report([60], ab_per_atom=6, analyses=["lowdin_populations"], targets=[100])
+    assert report["fits"]["lowdin_populations"] == {"time": None, "peak_bytes": None}
+    assert report["extrapolations"][0]["time"] is None
+    assert "-" in format_scaling_report(report)
+
+    with pytest.raises(ValueError):
+        scaling_report([60], analyses=["mayer_bond_orders"])
+    with pytest.raises(TypeError):
+        scaling_report([0])
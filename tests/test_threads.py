@@ -0,0 +1,48 @@
+"""Test orbtools.threads."""
+import os
+
+from orbtools import threads
+import pytest
+
+
+def test_blas_threads():
+    """Test orbtools.threads.blas_threads, set_blas_threads, and get_blas_threads."""
+    num_threads = threads.get_blas_threads()
+    assert num_threads is None or num_threads > 0
+    with threads.blas_threads(2):
+        assert threads.get_blas_threads() == 2
+        with threads.blas_threads(1):
+            assert threads.get_blas_threads() == 1
+        assert threads.get_blas_threads() == 2
+        with threads.blas_threads(None):
+            assert threads.get_blas_threads() == 2
+    assert threads.get_blas_threads() == num_threads
+
+    # limit of the process is restored by the enclosing context
+    with threads.blas_threads(2):
+        threads.set_blas_threads(1)
+        assert threads.get_blas_threads() == 1
+    assert threads.get_blas_threads() == num_threads
+
+    with pytest.raises(TypeError):
+        threads.set_blas_threads(0)
+    with pytest.raises(TypeError):
+        threads.set_blas_threads(1.0)
+    with pytest.raises(TypeError):
+        with threads.blas_threads(True):
+            pass
+
+
+def test_blas_threads_environment(monkeypatch, capsys):
+    """Test orbtools.threads.blas_threads without a library that can be controlled."""
+    monkeypatch.setattr(threads, "threadpoolctl", None)
+    monkeypatch.setattr(threads, "_openblas_functions", [])
+    for name in threads.BLAS_THREAD_VARIABLES:
+        monkeypatch.delenv(name, raising=False)
+    assert threads.get_blas_threads() is None
+    with threads.blas_threads(3):
+        assert "WARNING" in capsys.readouterr().out
+        assert os.environ["OPENBLAS_NUM_THREADS"] == "3"
+        assert threads.get_blas_threads() == 3
+    assert "OPENBLAS_NUM_THREADS" not in os.environ
+    assert threads.get_blas_threads() is None
@@ -0,0 +1,171 @@
+"""Test orbtools.tracing."""
+from concurrent.futures import ThreadPoolExecutor
+import json
+import os
+import threading
+import tracemalloc
+
+import numpy as np
+from orbtools import tracing
+from orbtools.mulliken import lowdin_populations
+from orbtools.orthogonalization import power_symmetric
+from orbtools.quasi import quao
+import pytest
+
+
+def test_span():
+    """Test orbtools.tracing.span and orbtools.tracing.traced."""
+    tracing.clear()
+    assert not tracing.is_enabled()
+    assert tracing.span("stage") is tracing.span("other")
+    power_symmetric(np.identity(3), -0.5)
+    assert tracing.get_spans() == []
+
+    with tracing.trace() as spans:
+        assert tracing.is_enabled()
+        with tracing.span("outer", flops=10, matrix=np.zeros((2, 3))):
+            with tracing.span("inner"):
+                pass
+        power_symmetric(np.identity(3), -0.5)
+        # invalid inputs are reported by the function itself
+        with pytest.raises(TypeError):
+            power_symmetric([[1.0]], -0.5)
+    assert not tracing.is_enabled()
+    names = [record.name for record in spans]
+    assert names[:2] == ["inner", "outer"]
+    assert "power_symmetric" in names
+    inner, outer = spans[:2]
+    assert (inner.depth, outer.depth) == (1, 0)
+    assert outer.start <= inner.start
+    assert outer.duration >= inner.duration >= 0
+    assert outer.shapes == {"matrix": (2, 3)}
+    assert outer.flops == 10 and inner.flops is None
+    assert outer.peak_bytes is None
+    record = [record for record in spans if record.name == "power_symmetric"][0]
+    assert record.shapes["matrix"] == (3, 3)
+    assert record.flops == tracing.eigh_flops(3) + tracing.matmul_flops(3, 3, 3)
+    assert tracing.get_spans() == spans
+    tracing.clear()
+    assert tracing.get_spans() == []
+
+
+def test_trace_nested():
+    """Test orbtools.tracing.trace within another trace."""
+    tracing.clear()
+    was_tracing = tracemalloc.is_tracing()
+    with tracing.trace() as outer:
+        with tracing.trace(memory=True) as inner:
+            with tracing.span("inner"):
+                np.ones(1000)
+        assert tracing.is_enabled()
+        assert tracemalloc.is_tracing() == was_tracing
+        with tracing.span("outer"):
+            pass
+    assert not tracing.is_enabled()
+    assert [record.name for record in inner] == ["inner"]
+    assert inner[0].peak_bytes >= 8000
+    assert [record.name for record in outer] == ["inner", "outer"]
+    # memory is no longer traced after the inner context
+    assert outer[1].peak_bytes is None
+    tracing.clear()
+
+
+def test_trace_threads():
+    """Test orbtools.tracing.trace of spans that overlap across threads."""
+    tracing.clear()
+    barrier = threading.Barrier(2)
+
+    def work(_):
+        """Allocate an array within a span while the other thread does the same."""
+        with tracing.span("overlapping"):
+            barrier.wait()
+            np.ones(1000)
+            barrier.wait()
+
+    with tracing.trace(memory=True) as spans:
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            list(executor.map(work, range(2)))
+        with tracing.span("alone"):
+            np.ones(1000)
+    assert len({record.thread for record in spans if record.name == "overlapping"}) == 2
+    # peaks of tracemalloc include the allocations of the other thread
+    assert all(record.peak_bytes is None for record in spans if record.name == "overlapping")
+    assert [record.peak_bytes >= 8000 for record in spans if record.name == "alone"] == [True]
+    tracing.clear()
+
+
+def test_trace_analyses(tmp_path):
+    """Test tracing of orbtools.quasi.quao and orbtools.mulliken.lowdin_populations."""
+    current_dir = os.path.dirname(__file__)
+    names = ["coeff_ab_mo", "olp_ab_ab", "olp_aao_ab", "olp_aao_aao", "occupations"]
+    arrays = {
+        name: np.load(os.path.join(current_dir, "naclo4_{}.npy".format(name))) for name in names
+    }
+    ab_atom_indices = np.load(os.path.join(current_dir, "naclo4_ab_atom_indices.npy"))
+    indices_span = arrays["occupations"] > 0
+
+    tracing.clear()
+    with tracing.trace(memory=True) as spans:
+        quao(
+            arrays["olp_ab_ab"],
+            arrays["olp_aao_ab"],
+            arrays["olp_aao_aao"],
+            arrays["coeff_ab_mo"],
+            indices_span,
+        )
+        lowdin_populations(
+            arrays["coeff_ab_mo"], arrays["occupations"], arrays["olp_ab_ab"], 6, ab_atom_indices
+        )
+    names = {record.name for record in spans}
+    assert {
+        "quao",
+        "quao.validate",
+        "quao.orthogonalize_aao",
+        "make_mmo",
+        "make_mmo.overlaps",
+        "svd",
+        "project_aao",
+        "project_aao.overlaps",
+        "project",
+        "project.solve",
+        "lowdin_populations",
+        "lowdin_populations.validate",
+        "power_symmetric",
+    } <= names
+    assert all(record.peak_bytes is not None and record.peak_bytes >= 0 for record in spans)
+    record = [record for record in spans if record.name == "quao"][0]
+    assert record.depth == 0
+    assert record.shapes["olp_ab_ab"] == arrays["olp_ab_ab"].shape
+    assert record.shapes["coeff_ab_mo"] == arrays["coeff_ab_mo"].shape
+    # the enclosing span holds at least the peaks of its stages
+    assert record.peak_bytes >= max(
+        other.peak_bytes for other in spans if other.name == "make_mmo.overlaps"
+    )
+    record = [record for record in spans if record.name == "make_mmo.overlaps"][0]
+    num_aao, num_ab = arrays["olp_aao_ab"].shape
+    assert record.flops == tracing.matmul_flops(num_aao, num_ab, arrays["coeff_ab_mo"].shape[1])
+
+    summary = tracing.summary(spans)
+    assert summary["quao"]["count"] == 1
+    assert summary["project"]["count"] >= 1
+    assert summary["quao"]["total_time"] >= summary["make_mmo"]["total_time"]
+    assert np.isclose(
+        summary["project"]["mean_time"],
+        summary["project"]["total_time"] / summary["project"]["count"],
+    )
+    assert summary["svd"]["flops"] > 0
+    assert summary["quao.validate"]["flops"] is None
+
+    tracing.export_chrome_trace(str(tmp_path / "trace.json"), spans)
+    with open(str(tmp_path / "trace.json")) as f:
+        events = json.load(f)["traceEvents"]
+    assert len(events) == len(spans)
+    assert all(event["ph"] == "X" for event in events)
+    assert {event["name"] for event in events} == names
+
+    tracing.export_json(str(tmp_path / "spans.json"))
+    with open(str(tmp_path / "spans.json")) as f:
+        data = json.load(f)
+    assert len(data["spans"]) == len(spans)
+    assert data["summary"]["quao"]["count"] == 1
+    tracing.clear()
@@ -0,0 +1,140 @@
+"""Tests for orbtools.validation."""
+import os
+
+import numpy as np
+from orbtools import validation
+from orbtools.mulliken import lowdin_populations, mulliken_populations
+from orbtools.quasi import _check_input, quao
+import pytest
+
+
+def test_validation_level():
+    """Test orbtools.validation.set_validation_level and orbtools.validation.validation_level."""
+    assert validation.get_validation_level() == "full"
+    with validation.validation_level("cheap"):
+        assert validation.get_validation_level() == "cheap"
+        with validation.validation_level("off"):
+            assert validation.get_validation_level() == "off"
+        assert validation.get_validation_level() == "cheap"
+    assert validation.get_validation_level() == "full"
+
+    validation.set_validation_level("off")
+    assert validation.get_validation_level() == "off"
+    validation.set_validation_level("full")
+    assert validation.get_validation_level() == "full"
+
+    with pytest.raises(ValueError):
+        validation.set_validation_level("none")
+    with pytest.raises(ValueError):
+        with validation.validation_level(False):
+            pass
+    assert validation.get_validation_level() == "full"
+
+
+def test_resolve_level():
+    """Test orbtools.validation.resolve_level."""
+    assert validation.resolve_level(None) == "full"
+    with validation.validation_level("off"):
+        assert validation.resolve_level(None) == "off"
+        assert validation.resolve_level("cheap") == "cheap"
+    with pytest.raises(ValueError):
+        validation.resolve_level("fast")
+
+
+def test_is_hermitian():
+    """Test orbtools.validation.is_hermitian."""
+    matrix = np.random.rand(20, 20)
+    matrix += matrix.T
+    for level in validation.LEVELS:
+        assert validation.is_hermitian(matrix, level)
+        assert validation.is_hermitian(np.array([matrix, 2 * matrix]), level)
+    matrix[3, 5] += 0.1
+    assert not validation.is_hermitian(matrix, "full")
+    assert not validation.is_hermitian(matrix, "cheap")
+    assert validation.is_hermitian(matrix, "off")
+    for memory_budget in [1, 1000]:
+        assert not validation.is_hermitian(matrix, "full", memory_budget=memory_budget)
+        matrix[5, 3] += 0.1
+        assert validation.is_hermitian(matrix, "full", memory_budget=memory_budget)
+        assert validation.is_hermitian(np.array([matrix] * 2), "full", memory_budget=memory_budget)
+        matrix[5, 3] -= 0.1
+
+
+def test_is_positive_semidefinite_cholesky():
+    """Test orbtools.validation.is_positive_semidefinite_cholesky."""
+    vecs = np.random.rand(10, 4)
+    assert validation.is_positive_semidefinite_cholesky(vecs.dot(vecs.T))
+    assert validation.is_positive_semidefinite_cholesky(np.zeros((3, 3)))
+    assert not validation.is_positive_semidefinite_cholesky(np.diag([1.0, 1.0, -0.1]))
+
+
+def test_is_normalized():
+    """Test orbtools.validation.is_normalized."""
+    olp = np.identity(10)
+    coeff = np.identity(10)
+    for level in validation.LEVELS:
+        assert validation.is_normalized(coeff, olp, level)
+    assert validation.is_normalized(coeff, olp, "full", memory_budget=16)
+    coeff *= 2
+    assert not validation.is_normalized(coeff, olp, "full")
+    assert not validation.is_normalized(coeff, olp, "full", memory_budget=16)
+    assert not validation.is_normalized(coeff, olp, "cheap")
+    assert validation.is_normalized(coeff, olp, "off")
+
+
+def test_check_input_levels():
+    """Test the validation levels in orbtools.quasi._check_input."""
+    olp_ab_ab = np.identity(4)
+    olp_ab_ab[0, 1] = 0.5
+    with pytest.raises(ValueError):
+        _check_input(olp_ab_ab=olp_ab_ab, validate="cheap")
+    _check_input(olp_ab_ab=olp_ab_ab, validate="off")
+
+    olp_ab_ab = np.identity(4)
+    olp_ab_ab[0, 1] = olp_ab_ab[1, 0] = 2
+    with pytest.raises(ValueError):
+        _check_input(olp_ab_ab=olp_ab_ab, validate="cheap")
+    _check_input(olp_ab_ab=olp_ab_ab, validate="off")
+
+    with pytest.raises(ValueError):
+        _check_input(olp_ab_ab=np.identity(4), coeff_ab_mo=2 * np.identity(4), validate="cheap")
+    with validation.validation_level("off"):
+        _check_input(olp_ab_ab=np.identity(4), coeff_ab_mo=2 * np.identity(4))
+    # type checks are not affected by the level
+    with pytest.raises(TypeError):
+        _check_input(olp_ab_ab=np.identity(4).tolist(), validate="off")
+
+
+def test_levels_results():
+    """Test that the validation levels do not change the results."""
+    current_dir = os.path.dirname(__file__)
+    coeff_ab_mo = np.load(os.path.join(current_dir, "naclo4_coeff_ab_mo.npy"))
+    olp_ab_ab = np.load(os.path.join(current_dir, "naclo4_olp_ab_ab.npy"))
+    olp_aao_ab = np.load(os.path.join(current_dir, "naclo4_olp_aao_ab.npy"))
+    olp_aao_aao = np.load(os.path.join(current_dir, "naclo4_olp_aao_aao.npy"))
+    occupations = np.load(os.path.join(current_dir, "naclo4_occupations.npy"))
+    ab_atom_indices = np.load(os.path.join(current_dir, "naclo4_ab_atom_indices.npy"))
+    indices_span = occupations > 0
+
+    ref_quao = quao(olp_ab_ab, olp_aao_ab, olp_aao_aao, coeff_ab_mo, indices_span)
+    ref_mulliken = mulliken_populations(coeff_ab_mo, occupations, olp_ab_ab, 6, ab_atom_indices)
+    ref_lowdin = lowdin_populations(coeff_ab_mo, occupations, olp_ab_ab, 6, ab_atom_indices)
+    for level in ["cheap", "off"]:
+        assert np.allclose(
+            quao(olp_ab_ab, olp_aao_ab, olp_aao_aao, coeff_ab_mo, indices_span, validate=level),
+            ref_quao,
+        )
+        with validation.validation_level(level):
+            assert np.allclose(
+                mulliken_populations(coeff_ab_mo, occupations, olp_ab_ab, 6, ab_atom_indices),
+                ref_mulliken,
+            )
+            assert np.allclose(
+                lowdin_populations(coeff_ab_mo, occupations, olp_ab_ab, 6, ab_atom_indices),
+                ref_lowdin,
+            )
+
+    with pytest.raises(ValueError):
+        mulliken_populations(
+            coeff_ab_mo, occupations, olp_ab_ab, 6, ab_atom_indices, validate="everything"
+        )
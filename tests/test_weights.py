@@ -0,0 +1,167 @@
+"""Test orbtools.weights."""
+import os
+
+import numpy as np
+from orbtools.mulliken import (
+    lowdin_populations,
+    mulliken_populations,
+    mulliken_populations_batch,
+    mulliken_populations_density,
+)
+from orbtools.weights import (
+    as_weight_scheme,
+    BickelhauptWeights,
+    DenseWeights,
+    FunctionWeights,
+    MullikenWeights,
+    PairFractionWeights,
+    sum_by_atom,
+)
+import pytest
+
+
+def _load():
+    """Load the NaClO4 test data."""
+    current_dir = os.path.dirname(__file__)
+    coeff_ab_mo = np.load(os.path.join(current_dir, "naclo4_coeff_ab_mo.npy"))
+    olp_ab_ab = np.load(os.path.join(current_dir, "naclo4_olp_ab_ab.npy"))
+    occupations = np.load(os.path.join(current_dir, "naclo4_occupations.npy"))
+    ab_atom_indices = np.load(os.path.join(current_dir, "naclo4_ab_atom_indices.npy"))
+    return coeff_ab_mo, olp_ab_ab, occupations, ab_atom_indices
+
+
+def test_sum_by_atom():
+    """Test orbtools.weights.sum_by_atom."""
+    values = np.arange(10, dtype=float).reshape(2, 5)
+    ab_atom_indices = np.array([0, 2, 0, 1, 2])
+    assert np.allclose(sum_by_atom(values, ab_atom_indices, 4), [[2, 3, 5, 0], [12, 8, 15, 0]])
+
+
+def test_schemes():
+    """Test that the schemes in orbtools.weights match their dense weights."""
+    coeff_ab_mo, olp_ab_ab, occupations, ab_atom_indices = _load()
+    density = (coeff_ab_mo * occupations).dot(coeff_ab_mo.T)
+    rng = np.random.default_rng(0)
+    function_weights = rng.random((6, 124))
+    function_weights /= np.sum(function_weights, axis=0)
+    fractions = rng.random((124, 124))
+    fractions = fractions / (fractions + fractions.T)
+    schemes = [
+        MullikenWeights(),
+        FunctionWeights(function_weights),
+        PairFractionWeights(fractions),
+        BickelhauptWeights.from_density(density),
+    ]
+
+    ref_mulliken = mulliken_populations(coeff_ab_mo, occupations, olp_ab_ab, 6, ab_atom_indices)
+    for scheme in schemes:
+        atom_weights = scheme.dense(ab_atom_indices, 6)
+        assert atom_weights.shape == (6, 124, 124)
+        assert np.allclose(atom_weights, np.swapaxes(atom_weights, 1, 2))
+        assert np.allclose(np.sum(atom_weights, axis=0), 1)
+        DenseWeights(atom_weights).check(6, 124, "full")
+        scheme.check(6, 124, "full")
+        values = olp_ab_ab * density
+        assert np.allclose(
+            scheme.reduce(values[:50], ab_atom_indices, 6, rows=slice(0, 50))
+            + scheme.reduce(values[50:], ab_atom_indices, 6, rows=slice(50, None)),
+            scheme.reduce(values, ab_atom_indices, 6),
+        )
+
+        ref = mulliken_populations(
+            coeff_ab_mo, occupations, olp_ab_ab, 6, ab_atom_indices, atom_weights=atom_weights
+        )
+        pops = mulliken_populations(
+            coeff_ab_mo, occupations, olp_ab_ab, 6, ab_atom_indices, atom_weights=scheme
+        )
+        assert np.allclose(pops, ref)
+        assert np.isclose(np.sum(pops), np.sum(occupations))
+        assert np.allclose(
+            mulliken_populations_density(
+                np.array([density, 2 * density]), olp_ab_ab, 6, ab_atom_indices, atom_weights=scheme
+            ),
+            [ref, 2 * ref],
+        )
+        assert np.allclose(
+            mulliken_populations_batch(
+                np.array([coeff_ab_mo, coeff_ab_mo]),
+                np.array([occupations, occupations]),
+                olp_ab_ab,
+                6,
+                ab_atom_indices,
+                atom_weights=scheme,
+            ),
+            [ref, ref],
+        )
+        assert np.allclose(
+            lowdin_populations(
+                coeff_ab_mo, occupations, olp_ab_ab, 6, ab_atom_indices, atom_weights=scheme
+            ),
+            lowdin_populations(
+                coeff_ab_mo, occupations, olp_ab_ab, 6, ab_atom_indices, atom_weights=atom_weights
+            ),
+        )
+    assert np.allclose(
+        mulliken_populations(
+            coeff_ab_mo,
+            occupations,
+            olp_ab_ab,
+            6,
+            ab_atom_indices,
+            atom_weights=MullikenWeights(),
+        ),
+        ref_mulliken,
+    )
+
+    # Bickelhaupt fractions: pairs on the same atom are split evenly
+    bickelhaupt = BickelhauptWeights(np.array([1.0, 3.0, 0.0, 0.0]))
+    assert np.allclose(
+        bickelhaupt.get_fractions(np.array([0, 1, 1, 0])),
+        [[0.5, 0.25, 1, 0.5], [0.75, 0.5, 0.5, 1], [0, 0.5, 0.5, 0.5], [0.5, 0, 0.5, 0.5]],
+    )
+
+
+def test_schemes_input():
+    """Test the checks of the schemes in orbtools.weights."""
+    assert isinstance(as_weight_scheme(None), MullikenWeights)
+    scheme = FunctionWeights(np.ones((1, 3)))
+    assert as_weight_scheme(scheme) is scheme
+    assert isinstance(as_weight_scheme(np.ones((1, 3, 3))), DenseWeights)
+    with pytest.raises(TypeError):
+        as_weight_scheme(np.ones((3, 3)))
+    with pytest.raises(TypeError):
+        as_weight_scheme([[[1.0]]])
+
+    with pytest.raises(TypeError):
+        FunctionWeights(np.ones(3))
+    with pytest.raises(ValueError):
+        FunctionWeights(np.ones((2, 3))).check(2, 4, "full")
+    with pytest.raises(ValueError):
+        FunctionWeights(np.ones((2, 3))).check(2, 3, "full")
+    FunctionWeights(np.ones((2, 3))).check(2, 3, "off")
+
+    with pytest.raises(TypeError):
+        PairFractionWeights(np.ones((2, 2), dtype=complex))
+    with pytest.raises(ValueError):
+        PairFractionWeights(np.full((2, 2), 0.5)).check(1, 3, "full")
+    with pytest.raises(ValueError):
+        PairFractionWeights(np.ones((2, 2))).check(1, 2, "full")
+    PairFractionWeights(np.full((2, 2), 0.5)).check(1, 2, "full")
+
+    with pytest.raises(TypeError):
+        BickelhauptWeights(np.ones((2, 2)))
+    with pytest.raises(ValueError):
+        BickelhauptWeights(np.ones(2)).check(1, 3, "full")
+    with pytest.raises(ValueError):
+        BickelhauptWeights(-np.ones(2)).check(1, 2, "full")
+
+    coeff_ab_mo, olp_ab_ab, occupations, ab_atom_indices = _load()
+    with pytest.raises(ValueError):
+        mulliken_populations(
+            coeff_ab_mo,
+            occupations,
+            olp_ab_ab,
+            6,
+            ab_atom_indices,
+            atom_weights=FunctionWeights(np.ones((6, 124))),
+        )